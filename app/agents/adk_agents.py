@@ -1,8 +1,11 @@
-import datetime
 from google.adk.agents import Agent
 
-from tools.adk_tools import submit_final_completed_inspection_tool, fetch_history_tool, update_report_tool, capture_photo_tool
+from tools.adk_tools import (
+    submit_final_completed_inspection_tool, fetch_history_tool, update_report_tool, capture_photo_tool,
+    set_details_tool, record_component_tool, set_section_tool, remaining_items_tool, trends_tool,
+)
 from tools.vision_tools import locate_zone
+from tools.admission import AdmittedGemini
 
 # 1. EXHAUSTIVE KEY LISTS (Matching generator.py exactly)
 GROUND_KEYS = [
@@ -29,33 +32,19 @@ CAB_INTERIOR_KEYS = [
     "cab_air_filter", "gauges_indicators_switches", "overall_cab_interior"
 ]
 
-# 2. HELPER TO BUILD THE INITIAL STATE
-def get_empty_section(keys):
-    """Initializes every key with a default GREEN status and empty comment."""
-    return {key: {"status": "GREEN", "comments": ""} for key in keys}
-
-FULL_REPORT_TEMPLATE = {
-    "header": {
-        "serial_number": None, 
-        "inspector": None, 
-        "date": str(datetime.date.today()), 
-        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-        "machine_hours": 0
-    },
-    "sections": {
-        "GROUND": get_empty_section(GROUND_KEYS),
-        "ENGINE": get_empty_section(ENGINE_KEYS),
-        "CAB_EXTERIOR": get_empty_section(CAB_EXTERIOR_KEYS),
-        "CAB_INTERIOR": get_empty_section(CAB_INTERIOR_KEYS)
-    },
-    "general_comments": "",
-    "primary_status": "GREEN"
-}
+# 2. COMPACT KEY REFERENCE FOR THE PROMPT
+# The report itself lives in the session state (tools/inspection_state.py); the model only
+# needs the key names to call the tools, not a rendered copy of the whole report.
+COMPONENT_KEY_REFERENCE = "\n".join(
+    f"        {section}: {', '.join(keys)}"
+    for section, keys in (("GROUND", GROUND_KEYS), ("ENGINE", ENGINE_KEYS),
+                          ("CAB_EXTERIOR", CAB_EXTERIOR_KEYS), ("CAB_INTERIOR", CAB_INTERIOR_KEYS))
+)
 
 # 3. DEFINE THE ADK AGENT
 generator_agent = Agent(
     name="GeneratorAgent",
-    model="gemini-2.5-flash",
+    model=AdmittedGemini(model="gemini-2.5-flash"),  # LLM calls go through admission control
     instruction=f"""
         ROLE: Expert CAT 950 Wheel Loader Inspection Assistant.
 
@@ -68,54 +57,54 @@ generator_agent = Agent(
         - Never speak the exact dictionary keys to the user (e.g., ask about "the tires" instead of "tires_wheels_stem_caps_lug_nuts").
 
         CONVERSATION FLOW:
-        1. INTAKE: Start by naturally asking for the Serial Number and Inspector Name. Once you have both, explicitly hand control over to the technician. Say something short and close to: "Got it. Proceed or ask to be guided." Do NOT ask about specific parts yet.
-        2. FOLLOW THE TECHNICIAN: Allow the technician to report items in any order. Acknowledge their input quickly and naturally (e.g., "Got it, tires are good. What's next?").
-        3. BULK APPROVALS: If the technician says "The whole Ground section is good" or "Cab is all OK", immediately mark all items in that specific section as GREEN and conversationally confirm it.
-        4. GENTLE GUIDANCE: If the technician pauses, asks what's next, or loses their place, guide them to the nearest un-checked item in the GROUND, ENGINE, CAB_EXTERIOR, or CAB_INTERIOR sections.
+        1. INTAKE: Start by naturally asking for the Serial Number and Inspector Name. Record them with `set_inspection_details` as soon as you hear them. Once you have both, explicitly hand control over to the technician. Say something short and close to: "Got it. Proceed or ask to be guided." Do NOT ask about specific parts yet.
+        2. FOLLOW THE TECHNICIAN: Allow the technician to report items in any order. Record each one immediately with `record_component_status` and acknowledge quickly and naturally (e.g., "Got it, tires are good. What's next?").
+        3. BULK APPROVALS: If the technician says "The whole Ground section is good" or "Cab is all OK", call `set_section_status` for that section with GREEN and conversationally confirm it.
+        4. GENTLE GUIDANCE: If the technician pauses, asks what's next, or loses their place, call `get_remaining_items` and guide them to the nearest un-checked item.
         5. STATUS MAPPING & CLARIFICATION:
             - 'Pass/Good/OK' -> GREEN.
             - 'Monitor/Seeping/Worn' -> YELLOW. (You MUST conversationally ask for a brief comment/reason).
             - 'Fail/Broken/Leaking' -> RED. (You MUST conversationally ask for a brief comment/reason).
-        6. WRAP UP: If the user says "Finished" or "Done", check your internal tracker. 
+           Record the status right away; when the reason arrives, call `record_component_status` again with the same status and the comment.
+        6. WRAP UP: If the user says "Finished" or "Done", call `get_remaining_items`.
             - If items are still missing, conversationally remind them: "We still need to check the engine oil and the wipers. How do those look?"
-            - If all sections are 100% complete, ask for any final general comments and an overall primary status for the machine.
+            - If nothing is missing, ask for any final general comments and an overall primary status for the machine, record them with `set_inspection_details`, then call `submit_final_completed_inspection`.
 
         STRICT DATA CONSTRAINTS:
-        - Maintain an internal 'InspectionReport' matching the template below.
-        - DO NOT invent, rename, or add any dictionary keys. 
+        - The session keeps the report. You never write or send the report yourself; only use the tools.
+        - Use ONLY the component keys below. DO NOT invent, rename, or add any keys.
         - If the technician mentions a part that does not perfectly match a key, map it to the closest existing key or 'overall_machine' / 'overall_cab_interior'.
-        - When calling 'submit_final_completed_inspection', you MUST ensure 'primary_status' and 'general_comments' are placed at the absolute root level of the dictionary, not inside 'header' or 'sections'.
-        - The 'primary_status' value MUST be explicitly formatted as exactly 'GREEN', 'YELLOW', or 'RED'.
-        
-        PHOTO TRACKING RULE: 
-        When you call `capture_defect_photo`, it will return a public URL. You MUST maintain an internal dictionary matching the component keys to these URLs. 
-        When you finally call `submit_final_completed_inspection`, pass this entire dictionary into the 'photo_links' argument.
-        
+        - Statuses (including 'primary_status') MUST be exactly 'GREEN', 'YELLOW', or 'RED'.
+
+        PHOTO TRACKING RULE:
+        Call `capture_defect_photo` with the component key when a component is marked YELLOW or RED. The photo is attached to the report automatically.
+
         TOOL EXECUTION RULES (CRITICAL):
-        - NEVER call `submit_final_completed_inspection` to "save progress". 
-        - DO NOT call `submit_final_completed_inspection` until the technician indicates they are "Finished" or "Done" AND you have verified that all required fields are filled.
-        
+        - `submit_final_completed_inspection` takes no arguments. NEVER call it to "save progress"; every recording tool already saves.
+        - DO NOT call `submit_final_completed_inspection` until the technician indicates they are "Finished" or "Done".
+
         ERROR HANDLING (CRITICAL):
-        - If the 'submit_final_completed_inspection' tool returns an error (success: false), you MUST read the exact error message.
-        - If the error is about your JSON structure (e.g., 'primary_status' is missing from the root level), silently fix your payload format and call the tool again immediately.
-        - If the error states that you need to ask the technician for missing information, DO NOT retry the tool. Apologize to the technician, ask them for the specific missing information, wait for their reply, and THEN call the tool again.
-        SCHEMA TEMPLATE:
-        {FULL_REPORT_TEMPLATE}
+        - If a tool returns an error (success: false), read the exact error message.
+        - If it lists remaining items or items needing a comment, DO NOT retry. Ask the technician for that specific information, record it, and THEN call the tool again.
+
+        COMPONENT KEYS:
+{COMPONENT_KEY_REFERENCE}
     """,
-    tools=[submit_final_completed_inspection_tool, locate_zone, capture_photo_tool]
+    tools=[set_details_tool, record_component_tool, set_section_tool, remaining_items_tool,
+           submit_final_completed_inspection_tool, locate_zone, capture_photo_tool]
 )
 
 reviewer_agent = Agent(
     name="ReviewerAgent",
-    model="gemini-2.5-flash",
+    model=AdmittedGemini(model="gemini-2.5-flash"),  # LLM calls go through admission control
     instruction="""
         ROLE: Expert CAT Fleet Analyst and Data Reviewer.
         
         GOAL: Help fleet managers review historical inspection data, identify maintenance trends, and generate formal executive summaries.
         
         CORE CAPABILITIES:
-        1. When asked about a machine, immediately use the 'fetch_machine_history' tool using its Serial Number.
-        2. Analyze the history for degrading conditions (e.g., a component moving from GREEN to YELLOW over time).
+        1. For trends, degradations, recurring issues or "how is this machine doing" questions, use the 'analyze_machine_trends' tool with its Serial Number. It already computes transitions, streaks, days in state and hours since last GREEN over the whole history; do not recompute them.
+        2. Use 'fetch_machine_history' only when you need the raw content of the latest reports (exact comments, timestamps for an update, or a full report).
         3. If the user asks to update a past report, identify the exact 'timestamp' of that report from the fetched history, and use the 'update_past_report' tool with that specific timestamp and changes.
         
         REPORT GENERATION PROTOCOL:
@@ -146,5 +135,5 @@ reviewer_agent = Agent(
         - YELLOW -> MONITOR
         - RED -> FAIL
     """,
-    tools=[fetch_history_tool, update_report_tool]
+    tools=[trends_tool, fetch_history_tool, update_report_tool]
 )
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Benchmark: a shift-start surge of review traffic against live voice STT, with admission control.
+
+Usage (from the repo root, with the fake model server running):
+    python -m app.benchmarks.fake_gemini_server --port 8090 --latency-s 0.8 &
+    python -m app.benchmarks.bench_admission --base-url http://127.0.0.1:8090 --reviews 200 --voice 20
+
+Fires --reviews background calls (10 tenants) and, while they queue, --voice live STT calls
+through GeminiSTTBackend on the async client. Reports voice latency, how many calls of each
+priority were admitted or shed, and the peak concurrency the model server saw.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import urllib.request
+
+from google import genai
+from google.genai import types
+
+from app.tools.stt import GeminiSTTBackend, pcm_to_wav_bytes
+from app.tools.admission import AdmissionController, Overloaded
+
+
+async def call(backend, controller, tenant, priority, audio, latencies):
+    start = time.perf_counter()
+    with controller.context(tenant, priority):
+        try:
+            await backend.transcribe(audio)
+        except Overloaded:
+            return "shed"
+    latencies.append(time.perf_counter() - start)
+    return "ok"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return 1000 * values[min(len(values) - 1, int(len(values) * q))] if values else float("nan")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8090")
+    parser.add_argument("--reviews", type=int, default=200)
+    parser.add_argument("--voice", type=int, default=20)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    client = genai.Client(api_key="fake", http_options=types.HttpOptions(base_url=args.base_url))
+    controller = AdmissionController(max_concurrency=args.max_concurrency)
+    backend = GeminiSTTBackend(client)
+    backend.admission = controller
+    audio = pcm_to_wav_bytes(b"\x00\x00" * 16000)
+
+    review_latencies, voice_latencies = [], []
+    reviews = [asyncio.create_task(call(backend, controller, f"fleet-{i % 10}", "review", audio, review_latencies))
+               for i in range(args.reviews)]
+    await asyncio.sleep(0.1)  # the surge is queued before the technicians start talking
+    voices = [asyncio.create_task(call(backend, controller, f"tech-{i}", "voice", audio, voice_latencies))
+              for i in range(args.voice)]
+    review_results = await asyncio.gather(*reviews)
+    voice_results = await asyncio.gather(*voices)
+
+    with urllib.request.urlopen(f"{args.base_url}/stats") as response:
+        server = json.loads(response.read())
+    print(f"voice : {voice_results.count('ok')} ok / {voice_results.count('shed')} shed, "
+          f"p50 {percentile(voice_latencies, 0.5):.0f} ms, p95 {percentile(voice_latencies, 0.95):.0f} ms")
+    print(f"review: {review_results.count('ok')} ok / {review_results.count('shed')} shed, "
+          f"p50 {percentile(review_latencies, 0.5):.0f} ms")
+    print(f"model server peak concurrency: {server['peak_in_flight']} (limit {args.max_concurrency})")
+    print(json.dumps(controller.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
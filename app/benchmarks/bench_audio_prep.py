@@ -0,0 +1,76 @@
+"""
+Benchmark: raw WAV upload vs. the trimmed + compressed STT upload.
+
+Usage (from the repo root, with a 16 kHz mono recording of a technician utterance):
+    python -m app.benchmarks.bench_audio_prep path/to/utterance.wav --upload-kbps 256
+
+Uses LocalSTTBackend, so it needs no API key: latency = fixed round trip
++ per-second-of-audio cost + upload time at --upload-kbps.
+"""
+
+import argparse
+import asyncio
+import time
+import wave
+
+import numpy as np
+import torch
+
+from app.tools.audio_prep import AudioPreparer
+from app.tools.stt import LocalSTTBackend, pcm_to_wav_bytes
+
+
+def load_pcm(path: str) -> bytes:
+    with wave.open(path, "rb") as wav_file:
+        if wav_file.getframerate() != 16000 or wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+            raise SystemExit("Expected 16 kHz mono 16-bit WAV")
+        return wav_file.readframes(wav_file.getnframes())
+
+
+async def timed(backend, audio, mime_type):
+    start = time.perf_counter()
+    await backend.transcribe(audio, mime_type=mime_type)
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("wav_path")
+    parser.add_argument("--upload-kbps", type=float, default=256.0)
+    parser.add_argument("--pad-silence-s", type=float, default=1.0,
+                        help="extra leading/trailing silence, like an open mic before/after speaking")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pcm = load_pcm(args.wav_path)
+    pad = np.zeros(int(16000 * args.pad_silence_s), dtype=np.int16).tobytes()
+    pcm = pad + pcm + pad
+
+    model, utils = torch.hub.load(repo_or_dir="snakers4/silero-vad", model="silero_vad")
+    get_speech_timestamps = utils[0]
+    backend = LocalSTTBackend(upload_kbps=args.upload_kbps)
+
+    rows = []
+    for fmt in ("wav", "flac"):
+        preparer = AudioPreparer(model, get_speech_timestamps, audio_format=fmt)
+        prep_s, stt_s = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            audio, mime_type = preparer.prepare(pcm)
+            prep_s.append(time.perf_counter() - start)
+            if audio is None:
+                raise SystemExit("No speech detected in the recording")
+            stt_s.append(await timed(backend, audio, mime_type))
+        rows.append((f"trimmed {preparer.audio_format}", len(audio), np.median(prep_s), np.median(stt_s)))
+
+    wav = pcm_to_wav_bytes(pcm)
+    baseline = [await timed(backend, wav, "audio/wav") for _ in range(args.repeat)]
+    rows.insert(0, ("raw wav (baseline)", len(wav), 0.0, np.median(baseline)))
+
+    print(f"{'variant':<22}{'bytes':>10}{'prep ms':>10}{'stt ms':>10}{'total ms':>10}")
+    for name, size, prep, stt in rows:
+        print(f"{name:<22}{size:>10}{prep * 1000:>10.1f}{stt * 1000:>10.1f}{(prep + stt) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
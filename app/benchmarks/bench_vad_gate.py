@@ -0,0 +1,73 @@
+"""
+Benchmark: VAD cost and end-of-speech detection with and without the EnergyGate.
+
+Usage (from the repo root, with a 16 kHz mono recording of a technician utterance):
+    python -m app.benchmarks.bench_vad_gate path/to/utterance.wav --walk-s 20
+
+The recording is surrounded by --walk-s seconds of low-level noise (the technician
+walking between components) and streamed through BatchedVADScheduler in 100 ms chunks.
+The gated run should report the same start/end events with far fewer model windows.
+"""
+
+import argparse
+import asyncio
+import time
+import wave
+
+import numpy as np
+import torch
+
+from app.tools.vad import BatchedVADScheduler, EnergyGate
+
+CHUNK_BYTES = 3200  # 100 ms of 16 kHz int16
+
+
+def load_pcm(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wav_file:
+        if wav_file.getframerate() != 16000 or wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+            raise SystemExit("Expected 16 kHz mono 16-bit WAV")
+        return np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+
+
+async def run(model, pcm: bytes, gate: EnergyGate):
+    scheduler = BatchedVADScheduler(model, max_wait_ms=0, gate=gate)
+    stream = scheduler.open_stream()
+    events = []
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for i in range(0, len(pcm), CHUNK_BYTES):
+        stream.audio.write(pcm[i:i + CHUNK_BYTES])
+        # The ring buffer just wraps around; only the VAD events matter here
+        events += [e for e in await scheduler.process(stream) if "start" in e or "end" in e]
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    return events, scheduler.windows - scheduler.gated, scheduler.windows, cpu, wall
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("wav_path")
+    parser.add_argument("--walk-s", type=float, default=20.0)
+    parser.add_argument("--noise-dbfs", type=float, default=-60.0)
+    args = parser.parse_args()
+
+    speech = load_pcm(args.wav_path)
+    rng = np.random.default_rng(0)
+    walk = rng.normal(0, 32768 * 10 ** (args.noise_dbfs / 20), int(16000 * args.walk_s)).astype(np.int16)
+    pcm = np.concatenate([walk, speech, walk, speech, walk]).tobytes()
+
+    torch.set_num_threads(1)
+    model, _ = torch.hub.load(repo_or_dir="snakers4/silero-vad", model="silero_vad")
+
+    results = {}
+    for name, gate in (("ungated", EnergyGate(enabled=False)), ("gated", EnergyGate())):
+        results[name] = await run(model, pcm, gate)
+        events, inferred, total, cpu, wall = results[name]
+        print(f"{name:<9} model windows {inferred:>6}/{total:<6} cpu {cpu * 1000:8.1f} ms  "
+              f"wall {wall * 1000:8.1f} ms  events {events}")
+
+    same = results["gated"][0] == results["ungated"][0]
+    speedup = results["ungated"][3] / max(results["gated"][3], 1e-9)
+    print(f"events identical: {same}   VAD CPU reduction: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
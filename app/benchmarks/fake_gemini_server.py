@@ -0,0 +1,73 @@
+"""
+Local fake of the Gemini generateContent API, for load tests without quota or network.
+
+Usage (from the repo root):
+    python -m app.benchmarks.fake_gemini_server --port 8090 --latency-s 0.8
+    GOOGLE_GEMINI_BASE_URL=http://127.0.0.1:8090 GEMINI_API_KEY=fake python app/main.py
+
+google-genai (and therefore ADK) honours GOOGLE_GEMINI_BASE_URL, so STT, TTS and both agents
+talk to this server. Every call sleeps --latency-s and answers with a short text; GET /stats
+reports the calls served and the peak number of concurrent requests it saw.
+"""
+
+import argparse
+import asyncio
+import json
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Fake Gemini")
+settings = {"latency_s": 0.8, "text": "OK."}
+stats = {"calls": 0, "in_flight": 0, "peak_in_flight": 0}
+
+
+def _response() -> dict:
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": settings["text"]}]},
+            "finishReason": "STOP",
+        }],
+        "usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 1, "totalTokenCount": 2},
+    }
+
+
+async def _serve():
+    stats["calls"] += 1
+    stats["in_flight"] += 1
+    stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(settings["latency_s"])
+    finally:
+        stats["in_flight"] -= 1
+
+
+@app.post("/{api_version}/models/{model_action}")
+async def generate(api_version: str, model_action: str, request: Request):
+    await request.body()
+    await _serve()
+    if model_action.endswith(":streamGenerateContent"):
+        async def sse():
+            yield f"data: {json.dumps(_response())}\n\n"
+        return StreamingResponse(sse(), media_type="text/event-stream")
+    return _response()
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-s", type=float, default=0.8)
+    parser.add_argument("--text", default="OK.")
+    args = parser.parse_args()
+    settings.update(latency_s=args.latency_s, text=args.text)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,16 @@
+import os
 import threading
 import uvicorn
-from fastapi import FastAPI, UploadFile, File
-import shutil
-import os
+from fastapi import FastAPI
+# ADK Web sessions cannot tag their frame uploads, so let them read the anonymous frame
+# (one technician per ADK Web process); must be set before the frame store is imported
+os.environ.setdefault("FRAME_ANONYMOUS_FALLBACK", "1")
+from tools.frame_stream import frames_router
 # 1. Define the tiny Upload Server
+# Only needed next to ADK Web: app/main.py serves POST /upload-frame and /ws/frames itself.
+# Frames land in the in-process frame store, where the agent tools read them.
 upload_api = FastAPI()
-UPLOAD_PATH = "data/stream/current_frame.jpg"
-
-@upload_api.post("/upload-frame")
-async def upload_frame(file: UploadFile = File(...)):
-    os.makedirs(os.path.dirname(UPLOAD_PATH), exist_ok=True)
-    with open(UPLOAD_PATH, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return {"status": "ok"}
+upload_api.include_router(frames_router)
 
 # 2. Run it in a background thread so it doesn't block the ADK
 def run_upload_server():
@@ -21,4 +19,4 @@ def run_upload_server():
 threading.Thread(target=run_upload_server, daemon=False).start()
 
 # 3. Expose the agent for ADK Web
-from agents.agent import root_agent
\ No newline at end of file
+from agents.agent import root_agent
@@ -0,0 +1,57 @@
+"""
+Multi-worker deployment of the FastAPI app:
+
+    gunicorn -c app/gunicorn_conf.py app.main:app
+
+- preload_app + when_ready: app/main.py is imported once in the master and the model registry
+  loads the silero VAD model and the SuperPoint/LightGlue locator there, so they are loaded a
+  single time and shared copy-on-write by every worker instead of being duplicated per process.
+- Per-session state is externalized: ADK sessions live in the shared SQLite store
+  (SESSION_SHARED=1 makes each worker re-read a session another worker has advanced), and
+  Firestore / SQLite connections are opened lazily per process after the fork.
+- Turns of one session are serialized across workers by a per-session lock at the session
+  store, and /chat replies are recorded by request_id there, so a client retry that lands
+  on another worker reuses the first attempt's reply (tools/session_queue.py).
+- WebSocket sessions (/ws/stt, /ws/inspect) are pinned to the worker that accepted them. For
+  several replicas behind a load balancer, route on the session_id (e.g. nginx
+  `hash $arg_session_id consistent;`) so HTTP turns of one inspection hit the same replica.
+- Camera frames are written through to one file per session on tmpfs (FRAME_SHARED_DIR,
+  tools/frame_store.py), so a frame uploaded to one worker is seen by turns on every other.
+- torch runs single-threaded in the master (no thread pool to inherit across the fork); each
+  worker then gets its share of the intra-op threads, so N workers do not oversubscribe the cores.
+"""
+
+import multiprocessing
+import os
+
+# Must be set before the app is preloaded
+os.environ.setdefault("SESSION_SHARED", "1")
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+pythonpath = ".,app"  # main.py imports both `app.*` and `agents.*` / `tools.*`
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    # Runs in the master after preload and before any fork: load the shared models here so
+    # the workers inherit them copy-on-write. Per-process clients (Firestore) load after the fork.
+    # The master stays single-threaded in torch: loading runs no inference except SuperPoint on
+    # anchors missing from the feature cache, and with one thread that never starts an OpenMP /
+    # MKL thread pool, which a forked worker would inherit without its threads and deadlock on.
+    # Build the cache ahead of deploys (python -m app.tools.anchor_cache) to skip even that.
+    import torch
+    from tools.registry import registry
+
+    torch.set_num_threads(1)
+    registry.load_all(include_per_process=False)
+
+
+def post_fork(server, worker):
+    import torch
+
+    torch.set_num_threads(max(1, multiprocessing.cpu_count() // workers))
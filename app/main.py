@@ -12,29 +12,40 @@
 import os
 import io
 import wave
-import re
 import base64
 import asyncio
-import shutil
+import time
 import torch
-import numpy as np
 import uvicorn
-from fastapi import FastAPI, Request, File, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
 from google import genai
 from app.agents.adk_agents import generator_agent, reviewer_agent
 from app.tools.pdf_generator import generate_inspection_pdf, get_sample_inspection_report
-from fastapi.responses import StreamingResponse
+from app.tools.stt import (
+    make_stt_backend, transcribe_segments,
+    PartialTranscriber, SpeculativeTranscriber, speculation_stats,
+)
+from app.tools.vad import BatchedVADScheduler
+from app.tools.audio_prep import AudioPreparer
+from app.tools.audio_codecs import make_decoder
+from app.tools.tts import make_tts_backend
+from app.tools.voice_pipeline import VoicePipeline
+from app.tools.session_store import PersistentSessionService
+from app.tools.agent_events import append_exchange, ensure_session, iter_agent_events, format_sse, format_ndjson
+from app.tools.fast_path import FastPath
+from app.tools.history_compaction import HistoryCompactor
+from app.tools.session_queue import SessionWorkQueue
+from app.tools.review_cache import ReviewCache
+from app.tools.frame_stream import frames_router
+from fastapi.responses import StreamingResponse, JSONResponse
 import json
-import shutil
 
 load_dotenv()
-UPLOAD_PATH = "app/data/stream/current_frame.jpg"
 
 # map GOOGLE_API_KEY → GEMINI_API_KEY
 os.environ["GEMINI_API_KEY"] = os.environ.get("GOOGLE_API_KEY", "")
@@ -42,68 +53,157 @@ _api_key = os.environ.get("GEMINI_API_KEY")
 # Import your agents
 from agents.adk_agents import generator_agent, reviewer_agent
 
+from tools.registry import registry
+from tools.admission import admission, Overloaded
+from tools.adk_tools import get_db
+from tools.firebase_ops import upload_defect_photo_to_storage, get_history_version
+from tools.frame_store import frame_store
+
 app = FastAPI(title="ADK Inspection API")
-model, utils = torch.hub.load(repo_or_dir='snakers4/silero-vad', model='silero_vad')
-(get_speech_timestamps, _, _, VADIterator, _) = utils
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Explicit load shedding: 503 + Retry-After instead of an unbounded wait."""
+    return JSONResponse(exc.as_dict(), status_code=503,
+                        headers={"Retry-After": str(max(1, round(exc.retry_after_s)))})
+
+def load_silero():
+    """silero VAD from the silero-vad package (bundled weights) or the local torch.hub cache; no network."""
+    try:
+        from silero_vad import load_silero_vad, get_speech_timestamps
+        return load_silero_vad(), get_speech_timestamps
+    except ImportError:
+        cached = os.path.join(torch.hub.get_dir(), "snakers4_silero-vad_master")
+        if os.path.isdir(cached):
+            model, utils = torch.hub.load(repo_or_dir=cached, model='silero_vad', source='local')
+        else:
+            model, utils = torch.hub.load(repo_or_dir='snakers4/silero-vad', model='silero_vad')
+        return model, utils[0]
+
+registry.register("silero_vad", load_silero)
+# A second instance for silence trimming, so it never queues behind (or stalls) the live VAD
+registry.register("silero_vad_trim", load_silero)
+# One shared, micro-batched VAD service for every /ws/stt session (per-stream state stays isolated)
+vad_scheduler = BatchedVADScheduler(model_loader=lambda: registry.get("silero_vad")[0])
+# Speech-only, FLAC-encoded uploads to STT (leading/trailing/inner silence trimmed)
+audio_preparer = AudioPreparer(vad_loader=lambda: registry.get("silero_vad_trim"))
+
+@app.on_event("startup")
+async def warm_up_models():
+    # Load heavy models in the background; requests are served (lazily loading) meanwhile
+    if os.environ.get("WARMUP", "1") != "0":
+        asyncio.create_task(registry.warm_up())
 # --- 1. ADK INITIALIZATION ---
 gemini_client = genai.Client(api_key=_api_key)
+# STT_BACKEND=local swaps Gemini for an offline stand-in (tests / latency benchmarks)
+# Every outbound model call (STT, TTS, agent LLM calls) is admitted by one bounded scheduler
+stt_backend = make_stt_backend(gemini_client, admission=admission)
+# TTS_BACKEND=none leaves speech synthesis to the Flutter client
+tts_backend = make_tts_backend(gemini_client, admission=admission)
+
+# SQLite-backed sessions with an LRU hot tier: bounded memory, inspections survive restarts
+session_store = PersistentSessionService()
 
-generator_memory = InMemorySessionService() 
+generator_memory = session_store
 generator_runner = Runner(
     agent=generator_agent,
     session_service=generator_memory, 
     app_name="field_inspector"
 )
 
-reviewer_memory = InMemorySessionService() 
+def upload_component_photo(serial_number: str, component: str, frame_key) -> dict:
+    frame = frame_store.latest(frame_key)
+    if frame is None:
+        return {"success": False, "error": "No camera frame available right now."}
+    get_db()  # makes sure the Firebase app (and its storage bucket) is initialized
+    return upload_defect_photo_to_storage(serial_number, component, frame.data)
+
+# Predictable utterances ("tires good") are applied locally, without an LLM round trip
+fast_path = FastPath(photo_uploader=upload_component_photo)
+
+# Older turns are folded into a state summary once the history passes HISTORY_TOKEN_BUDGET
+history_compactor = HistoryCompactor()
+
+# Turns of one session run in order (across workers too, through the session store's lock);
+# duplicate / abandoned /chat requests never reach the model
+session_queue = SessionWorkQueue(store=session_store)
+
+async def generator_events(runner, user_id: str, session_id: str, text: str):
+    """One generator turn: history compaction, then the fast path, then the agent."""
+    async with session_queue.slot((user_id, session_id)):
+        await history_compactor.maybe_compact(runner, user_id, session_id)
+        async for event in fast_path.iter_events(runner, user_id, session_id, text):
+            yield event
+
+async def generator_text(user_id: str, session_id: str, text: str):
+    """Reply text deltas of a generator turn (for speech output)."""
+    async for event in generator_events(generator_runner, user_id, session_id, text):
+        if event["type"] == "text":
+            yield event["text"]
+
+reviewer_memory = session_store
 reviewer_runner = Runner(
     agent=reviewer_agent,
     session_service=reviewer_memory, 
     app_name="management_analytics"
 )
 
+# Repeated reviewer questions are answered from cache until the machine's history changes
+review_cache = ReviewCache(lambda serial_number: get_history_version(get_db(), serial_number))
+
+async def reviewer_events(runner, user_id: str, session_id: str, text: str):
+    """One reviewer turn, served from the review cache when the underlying history is unchanged."""
+    cached = await review_cache.get(text)
+    if cached is not None:
+        session = await ensure_session(runner, user_id, session_id)
+        await append_exchange(runner, session, text, cached)
+        yield {"type": "text", "text": cached}
+        yield {"type": "final", "text": cached, "cached": True}
+        return
+    tool_calls, final_text = [], ""
+    async for event in iter_agent_events(runner, user_id, session_id, text):
+        if event["type"] == "tool_call":
+            tool_calls.append((event["name"], event["args"]))
+        elif event["type"] == "final":
+            final_text = event["text"]
+        yield event
+    await review_cache.put(text, final_text, tool_calls)
+
 # --- 2. DATA MODELS (For better Flutter integration) ---
 class ChatRequest(BaseModel):
     user_id: str = "default_user"
     session_id: str = "current_inspection"
     text: str = ""
+    request_id: str = ""  # optional idempotency key: client retries reuse it
+    device_id: str = ""  # the client install; the admission tenant (see tenant_of)
+def tenant_of(user_id: str, session_id: str, device_id: str = "") -> str:
+    """
+    Admission tenant of a request: the client's device id, else its session. Not the
+    user_id alone: every technician's app sends "operator" (and every reviewer "manager").
+    """
+    return device_id or f"{user_id}/{session_id}"
+
 class FrameData(BaseModel):
     image_64: str  # The raw base64 string from Flutter
 # --- VOICE ENDPOINTS ---
-async def transcribe_audio_bytes(wav_bytes: bytes) -> str:
-    """Transcribe raw WAV bytes using Gemini API."""
-    try:
-        prompt = "Please accurately transcribe this audio. Reply ONLY with the exact transcript."
-        # Run synchronous Gemini call in a thread so we don't block the WebSocket
-        response = await asyncio.to_thread(
-            gemini_client.models.generate_content,
-            model="gemini-2.5-flash",
-            contents=[prompt, types.Part.from_bytes(data=wav_bytes, mime_type='audio/wav')]
-        )
-        return (response.text or "").strip()
-    except Exception as e:
-        print(f"  ⚠  Gemini STT error: {e}")
-        return ""
-
-# --- 3. ENDPOINTS ---
-@app.post("/upload-frame")
-async def upload_frame(file: UploadFile = File(...)):
+async def transcribe_pcm(pcm_bytes, on_segment=None) -> str:
     """
-    Matches Flutter's http.MultipartRequest.
-    'file' matches the key used in request.files.add
+    Trim raw 16 kHz PCM to its speech, compress it and transcribe it.
+    Long dictations are split at pauses and the segments transcribed in parallel;
+    `on_segment(index, text)` receives each segment in order as it becomes available.
     """
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(UPLOAD_PATH), exist_ok=True)
-    
-    try:
-        # FastAPI's UploadFile provides a file-like object in 'file.file'
-        with open(UPLOAD_PATH, "wb") as buffer:
-            # shutil.copyfileobj is memory-efficient for streaming the file to disk
-            shutil.copyfileobj(file.file, buffer)
-            
-        return {"status": "ok", "filename": file.filename}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    # Trimming runs on its own silero instance and thread, off the batched VAD worker
+    segments = await audio_preparer.run(audio_preparer.prepare_segments, bytes(pcm_bytes))
+    if not segments:
+        return ""  # no speech at all: skip the STT round trip
+    if len(segments) == 1:
+        audio, mime_type = segments[0]
+        return await stt_backend.transcribe(audio, mime_type=mime_type)
+    return await transcribe_segments(stt_backend, segments, on_segment)
+
+# --- 3. ENDPOINTS ---
+# Camera frames: POST /upload-frame and the persistent /ws/frames stream (tools/frame_stream.py)
+app.include_router(frames_router)
 # async def background_automation():
 #     while True:
 #         # 1. Look at your sessions/data
@@ -117,7 +217,25 @@ async def upload_frame(file: UploadFile = File(...)):
 #     # This starts the loop without blocking the API from responding to Flutter
 #     asyncio.create_task(background_automation())
 @app.post("/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
+    # Serialized per session; a retry of a request still queued or running shares its result
+    return await session_queue.submit(
+        (request.user_id, request.session_id), request.text, lambda: chat_turn(request),
+        request_id=request.request_id, abandoned=http_request.is_disconnected,
+    )
+
+async def chat_turn(request: ChatRequest) -> dict:
+    with admission.context(tenant_of(request.user_id, request.session_id, request.device_id), "chat"):
+        return await _chat_turn(request)
+
+async def _chat_turn(request: ChatRequest) -> dict:
+    start = time.perf_counter()
+    await history_compactor.maybe_compact(generator_runner, request.user_id, request.session_id)
+    reply = await fast_path.try_handle(generator_runner, request.user_id, request.session_id, request.text)
+    if reply is not None:
+        fast_path.stats.record("fast", time.perf_counter() - start)
+        return {"status": "success", "message": reply, "session_id": request.session_id}
+
     # Ensure session exists in Generator memory
     session = await generator_runner.session_service.get_session(
         app_name="field_inspector",
@@ -146,6 +264,7 @@ async def chat(request: ChatRequest):
     ):
         if event.is_final_response():
             final_response = event.content.parts[0].text
+    fast_path.stats.record("agent", time.perf_counter() - start)
 
     return {
         "status": "success",
@@ -155,6 +274,10 @@ async def chat(request: ChatRequest):
 
 @app.post("/review")
 async def review(request: ChatRequest):
+    with admission.context(tenant_of(request.user_id, request.session_id, request.device_id), "review"):
+        return await review_turn(request)
+
+async def review_turn(request: ChatRequest) -> dict:
     # Ensure session exists in Reviewer memory
     session = await reviewer_runner.session_service.get_session(
         app_name="management_analytics",
@@ -170,35 +293,86 @@ async def review(request: ChatRequest):
             session_id=request.session_id,
         )
 
-    new_message = types.Content(
-        role="user",
-        parts=[types.Part(text=request.text)]
-    )
-
-    # Run the Reviewer Agent
+    # Run the Reviewer Agent (or answer from the review cache)
     final_analysis = "The reviewer was unable to complete the analysis."
-    async for event in reviewer_runner.run_async(
-        user_id=request.user_id,
-        session_id=request.session_id,
-        new_message=new_message,
-    ):
-        if event.is_final_response():
-            final_analysis = event.content.parts[0].text
+    async for event in reviewer_events(reviewer_runner, request.user_id, request.session_id, request.text):
+        if event["type"] == "final" and event["text"]:
+            final_analysis = event["text"]
 
     return {
         "status": "success",
         "analysis": final_analysis,
         "session_id": request.session_id
     }
+def stream_agent_turn(runner, request: ChatRequest, http_request: Request,
+                      iter_events=iter_agent_events, priority: str = "chat") -> StreamingResponse:
+    """
+    Stream one agent turn as Server-Sent Events (Accept: text/event-stream) or NDJSON
+    (default): text deltas, tool_call / tool_result, then final.
+    """
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+    fmt = format_sse if sse else format_ndjson
+
+    async def body():
+        admission.set_context(tenant_of(request.user_id, request.session_id, request.device_id), priority)
+        await ensure_session(runner, request.user_id, request.session_id)
+        try:
+            async for event in iter_events(runner, request.user_id, request.session_id, request.text):
+                if event["type"] == "final":
+                    event["session_id"] = request.session_id
+                yield fmt(event)
+        except Overloaded as e:
+            yield fmt({"type": "overloaded", **e.as_dict()})
+        except Exception as e:
+            yield fmt({"type": "error", "message": str(e)})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Streaming variant of /chat: first bytes arrive with the first model token."""
+    return stream_agent_turn(generator_runner, request, http_request, generator_events)
+
+@app.post("/review/stream")
+async def review_stream(request: ChatRequest, http_request: Request):
+    """Streaming variant of /review."""
+    return stream_agent_turn(reviewer_runner, request, http_request, reviewer_events, priority="review")
+
+async def query_decoder(websocket: WebSocket):
+    """Decoder for the ?codec= query param; an unsupported codec is reported and falls back to pcm16."""
+    try:
+        return make_decoder(websocket.query_params.get("codec", "pcm16"))
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        return make_decoder("pcm16")
+
 # webscoket for speech conversation:
 @app.websocket("/ws/stt")
 async def websocket_stt_endpoint(websocket: WebSocket):
     await websocket.accept()
+    # Live dictation: highest model priority, tenant = the client's device (or this connection)
+    params = websocket.query_params
+    admission.set_context(tenant_of(params.get("user_id", "live_user"),
+                                    params.get("session_id", f"stt-{id(websocket)}"),
+                                    params.get("device_id", "")), "voice")
     
     # Internal State
     is_recording = False
-    audio_buffer = bytearray()
-    vad_iterator = VADIterator(model)
+    # Preallocated int16 ring buffer (MAX_UTTERANCE_S cap) that also frames the VAD windows
+    vad_stream = vad_scheduler.open_stream()
+    audio_buffer = vad_stream.audio
+    # Streaming mode: {"type": "start", "stream": true} sends "partial" transcripts while talking
+    partials = PartialTranscriber(transcribe_pcm, websocket.send_json)
+    streaming = False
+    # Speculative mode: {"type": "start", "speculative": true} starts STT at the first VAD "pause"
+    speculation = SpeculativeTranscriber(transcribe_pcm)
+    speculative = False
+    # Compressed uplink: {"type": "start", "codec": "adpcm"} (or ?codec=...), decoded back to PCM
+    decoder = await query_decoder(websocket)
 
     print("🔌 STT WebSocket Connected.")
 
@@ -214,130 +388,194 @@ async def websocket_stt_endpoint(websocket: WebSocket):
                 if command.get("type") == "start":
                     print("▶️ Recording Started...")
                     is_recording = True
-                    audio_buffer.clear()
-                    vad_iterator.reset_states()
+                    vad_stream.reset_states()  # also clears audio_buffer
+                    await partials.close()
+                    await speculation.cancel(miss=False)
+                    streaming = bool(command.get("stream", False))
+                    speculative = bool(command.get("speculative", False))
+                    if "codec" in command:
+                        try:
+                            decoder = make_decoder(command["codec"])
+                        except ValueError as e:
+                            await websocket.send_json({"type": "error", "message": str(e)})
+                    await websocket.send_json({"type": "ready", "codec": decoder.name})
+                    partials.interval_s = command.get("partial_interval_ms", 1500) / 1000.0
+                    partials.reset()
                 
                 elif command.get("type") == "stop":
                     print("⏹ Recording Stopped by Client.")
                     is_recording = False
+                    await partials.close()
                     # Optional: Force transcribe what's left in the buffer
                     if len(audio_buffer) > 0:
-                        await process_and_send_transcript(websocket, audio_buffer)
+                        await process_and_send_transcript(websocket, audio_buffer, speculation)
                         audio_buffer.clear()
+                    await speculation.cancel(miss=False)
 
             # --- HANDLE AUDIO BYTES ---
             elif "bytes" in message and is_recording:
-                data = message["bytes"]
-                audio_buffer.extend(data)
+                audio_buffer.write(decoder.decode(message["bytes"]))
 
-                # Convert to float32 for VAD
-                audio_int16 = np.frombuffer(data, dtype=np.int16)
-                audio_float32 = audio_int16.astype(np.float32) / 32768.0
-                
                 # Check for "Natural" silence even if user hasn't hit 'stop'
-                speech_dict = vad_iterator(torch.from_numpy(audio_float32), return_seconds=True)
-                
-                if speech_dict and "end" in speech_dict:
-                    print("🛑 Silence detected. Auto-finalizing...")
+                speech_events = await vad_scheduler.process(vad_stream)
+
+                # The buffer is cut at the VAD's own boundaries: leading silence is dropped at
+                # "start", and the utterance ends exactly at the "end" sample
+                utterance = None
+                for event in speech_events:
+                    if "pause" in event and speculative:
+                        speculation.start(audio_buffer)
+                    elif "resume" in event:
+                        await speculation.cancel()
+                    pcm = vad_stream.cut_at(event)
+                    if pcm is not None:
+                        utterance = pcm
+                        print("🛑 Silence detected. Auto-finalizing...")
+                        break
+                else:
+                    vad_stream.trim_idle()
+                    utterance = vad_stream.take_overflow()
+                    if utterance is not None:
+                        print("🛑 Max utterance length reached. Auto-finalizing...")
+
+                if utterance is not None:
                     is_recording = False # Flip state back to idle
-                    await process_and_send_transcript(websocket, audio_buffer)
+                    await partials.close()
+                    await process_and_send_transcript(websocket, utterance, speculation)
                     audio_buffer.clear()
+                elif streaming:
+                    partials.maybe_emit(audio_buffer)
 
     except WebSocketDisconnect:
         print("🔌 STT Disconnected.")
+    finally:
+        vad_scheduler.close_stream(vad_stream)
+        await partials.close()
+        await speculation.cancel(miss=False)
+
+async def process_and_send_transcript(websocket, buffer, speculation=None):
+    """
+    Helper to wrap, transcribe, and send JSON back. Replaces any earlier partials.
+    If a speculative request is already running for this utterance, its result is used.
+    """
+    async def send_segment(index, text):
+        await websocket.send_json({"type": "segment", "index": index, "text": text, "status": "processing"})
 
-async def process_and_send_transcript(websocket, buffer):
-    """Helper to wrap, transcribe, and send JSON back."""
-    wav_data = await pcm_to_wav(buffer)
-    transcript = await transcribe_audio_bytes(wav_data)
+    try:
+        transcript = await speculation.take() if speculation is not None and speculation.active else None
+        if transcript is None:
+            transcript = await transcribe_pcm(buffer, on_segment=send_segment)
+    except Overloaded as e:
+        await websocket.send_json({"type": "overloaded", **e.as_dict(), "status": "idle"})
+        return
     await websocket.send_json({
         "type": "transcript",
         "text": transcript,
         "status": "idle" # Tell Flutter we are done
     })
-async def pcm_to_wav(pcm_bytes: bytearray, sample_rate=16000) -> bytes:
-    """Helper to wrap raw PCM bytes into a WAV container."""
-    buf = io.BytesIO()
-    with wave.open(buf, "wb") as wav_file:
-        wav_file.setnchannels(1)  # Mono
-        wav_file.setsampwidth(2)  # 16-bit (2 bytes per sample)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_bytes)
-    return buf.getvalue()
+def wav_to_pcm(wav_bytes: bytes) -> bytes:
+    """Helper to unwrap the PCM frames of a WAV upload."""
+    with wave.open(io.BytesIO(wav_bytes), "rb") as wav_file:
+        return wav_file.readframes(wav_file.getnframes())
 
 @app.websocket("/ws/inspect")
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    Full-duplex voice loop. The client streams mic audio as binary frames (codec via ?codec=)
+    and may also send {"type": "text", "text": ...} or {"type": "audio_utterance", "data": <b64 wav>}.
+    The server replies with user_transcript, agent_text_delta, agent_audio, agent_text and
+    barge_in messages; see VoicePipeline.
+    """
     await websocket.accept()
-    audio_buffer = bytearray()
     print("🔌 Voice Client connected.")
     
-    # We will use a fixed user/session for the live connection
-    user_id = "live_user"
-    session_id = "live_inspection"
+    # Compressed uplink via ?codec=ulaw|adpcm|opus, decoded back to 16 kHz PCM
+    decoder = await query_decoder(websocket)
+    vad_stream = vad_scheduler.open_stream()
+    audio_buffer = vad_stream.audio
+
+    # Fixed user/session for the live connection unless the client picks one
+    user_id = websocket.query_params.get("user_id", "live_user")
+    session_id = websocket.query_params.get("session_id", "live_inspection")
+    admission.set_context(tenant_of(user_id, session_id, websocket.query_params.get("device_id", "")), "voice")
 
     # Ensure session exists
-    session = await generator_runner.session_service.get_session(
-        app_name="field_inspector", user_id=user_id, session_id=session_id)
-    if session is None:
-        await generator_runner.session_service.create_session(
-            app_name="field_inspector", user_id=user_id, session_id=session_id)
+    await ensure_session(generator_runner, user_id, session_id)
+
+    pipeline = VoicePipeline(
+        transcribe_pcm,
+        lambda text: generator_text(user_id, session_id, text),
+        tts_backend,
+        websocket.send_json,
+    )
+    pipeline.start()
 
     try:
         while True:
-            # Expecting JSON from Flutter: {"type": "audio_utterance", "data": "<base64_wav>"}
-            data = await websocket.receive_bytes()
-            audio_buffer.extend(data)
-            if len(audio_buffer) > 320000: # 1 second at 16kHz 16-bit
-                # Transcribe the current buffer
-                transcript = await transcribe_pcm_to_text(audio_buffer)
-                
-                if "done" in transcript.lower():
-                    audio_buffer.clear()
-            # message = await websocket.receive_json()
-            # msg_type = message.get("type")
-
-            if msg_type == "audio_utterance":
-                print("🎙 Receiving audio utterance from client...")
-                audio_data = base64.b64decode(message["data"])
-                
-                # 1. Transcribe the audio
-                transcript = await transcribe_audio_bytes(audio_data)
-                if not transcript:
-                    continue
-                
-                print(f"📝 You said: {transcript}")
-                # Send the text back so the UI updates instantly
-                await websocket.send_json({"type": "user_transcript", "text": transcript})
-
-                # 2. Send text to the ADK Generator Agent
-                new_message = types.Content(role="user", parts=[types.Part(text=transcript)])
-                
-                # Using run_async for better performance in the websocket
-                response_parts = []
-                async for event in generator_runner.run_async(
-                    user_id=user_id, session_id=session_id, new_message=new_message
-                ):
-                    if event.content and event.content.parts:
-                        for part in event.content.parts:
-                            if hasattr(part, "text") and part.text:
-                                response_parts.append(part.text)
-                
-                agent_reply = "\n".join(response_parts)
-                print(f"🤖 Agent: {agent_reply}")
-                
-                # Send text back to UI
-                await websocket.send_json({"type": "agent_text", "text": agent_reply})
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
 
-                # # 3. Generate Audio and send back to client
-                # tts_bytes = await generate_tts_bytes(agent_reply)
-                # if tts_bytes:
-                #     await websocket.send_json({
-                #         "type": "agent_audio", 
-                #         "data": base64.b64encode(tts_bytes).decode('utf-8')
-                #     })
+            if message.get("text") is not None:
+                command = json.loads(message["text"])
+                if command.get("type") == "text" and command.get("text"):
+                    await pipeline.barge_in()
+                    pipeline.submit_transcript(command["text"])
+                elif command.get("type") == "audio_utterance":
+                    print("🎙 Receiving audio utterance from client...")
+                    await pipeline.barge_in()
+                    wav_data = base64.b64decode(command["data"])
+                    pipeline.submit_utterance(wav_to_pcm(wav_data))
+                continue
+
+            if message.get("bytes") is None:
+                continue
+            audio_buffer.write(decoder.decode(message["bytes"]))
+            events = await vad_scheduler.process(vad_stream)
+            if any("start" in event for event in events):
+                # Technician started talking again: stop the agent mid-sentence
+                await pipeline.barge_in()
+            # One utterance per "end" (or per cap-length chunk); silence in between is dropped
+            for utterance in vad_stream.cut(events):
+                pipeline.submit_utterance(utterance)
 
     except WebSocketDisconnect:
+        pass
+    finally:
         print("🔌 Voice Client disconnected.")
+        vad_scheduler.close_stream(vad_stream)
+        await pipeline.close()
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: every critical component is loaded. Non-critical ones that are not (Firestore,
+    the zone locator) are listed under "degraded". Per-component status and load time.
+    """
+    body = {"ready": registry.ready, "degraded": registry.degraded, "components": registry.status()}
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Lightweight counters for the voice pipeline."""
+    return {
+        "worker_pid": os.getpid(),
+        "vad": {"batches": vad_scheduler.batches, "windows": vad_scheduler.windows,
+                "gated": vad_scheduler.gated},
+        "stt_speculation": speculation_stats.as_dict(),
+        "stt_audio": audio_preparer.as_dict(),
+        "generator_paths": fast_path.stats.as_dict(),
+        "history_compaction": history_compactor.as_dict(),
+        "session_queue": session_queue.as_dict(),
+        "admission": admission.as_dict(),
+        "review_cache": review_cache.as_dict(),
+        "frames": frame_store.as_dict(),
+    }
 
 # ── PDF GENERATION ENDPOINT ──────────────────────────────────────────────────
 
@@ -389,5 +627,6 @@ async def sample_report():
         return {"status": "error", "message": str(e)}
 
 if __name__ == "__main__":
-    # Start the server using Uvicorn
+    # Start the server using Uvicorn (single process).
+    # Multi-worker: gunicorn -c app/gunicorn_conf.py app.main:app
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,42 +1,146 @@
 import os
 import firebase_admin
 from firebase_admin import credentials, firestore, storage
-from google.adk.tools import FunctionTool
-from tools.firebase_ops import save_inspection_report, get_reports_by_serial, update_inspection_in_db, upload_defect_photo_to_storage
+from google.adk.tools import FunctionTool, ToolContext
+from tools import inspection_state
+from tools.firebase_ops import (
+    save_inspection_report, get_reports_by_serial, get_report_history, update_inspection_in_db,
+    upload_defect_photo_to_storage,
+)
+from tools.trends import analyze_history
+from tools.registry import registry
+from tools.frame_store import frame_store
 import datetime
 import copy
 import json
 
 
-# 1. Initialize Firestore
-if not firebase_admin._apps:
-    cred = credentials.Certificate(os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "service-account.json"))
-    firebase_admin.initialize_app(cred, {
-        'storageBucket': 'cat-inspection-488804.firebasestorage.app' 
-    })
-db = firestore.client()
+# 1. Initialize Firestore (lazily, through the model registry)
+def _init_firestore():
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "service-account.json"))
+        firebase_admin.initialize_app(cred, {
+            'storageBucket': 'cat-inspection-488804.firebasestorage.app' 
+        })
+    return firestore.client()
 
-def submit_final_completed_inspection(report_data: str, photo_links: str = "{}") -> dict:
+# per_process: the client is created after a worker fork, never shared across one.
+# Not critical: inspections, voice and chat run without it; /readyz reports it as degraded.
+registry.register("firestore", _init_firestore, critical=False, per_process=True)
+
+def get_db():
+    """Firestore client for this process, created on first use."""
+    return registry.get("firestore")
+
+# 2. Inspection state tools: the session state holds the authoritative report
+def set_inspection_details(tool_context: ToolContext, serial_number: str = "", inspector: str = "",
+                           machine_hours: float = -1, primary_status: str = "", general_comments: str = "") -> dict:
     """
-    TERMINAL ACTION: Use ONLY ONCE at the end.
-    CRITICAL: You MUST pass 'report_data' and 'photo_links' as valid JSON STRINGS, not objects.
-    'photo_links' should be a JSON string mapping the component key to the public URL.
+    Records report-level details. Only pass the fields you just learned; omitted fields are kept.
+    'primary_status' must be GREEN, YELLOW or RED.
     """
-    try:
-        # Failsafe: Parse the JSON string back into a Python dictionary
-        report_dict = json.loads(report_data) if isinstance(report_data, str) else report_data
-        photo_dict = json.loads(photo_links) if isinstance(photo_links, str) else photo_links
-        
-        return save_inspection_report(db, report_dict, photo_dict)
-    except Exception as e:
-        return {"success": False, "error": f"JSON Parsing Error. Ensure you send a string: {str(e)}"}
+    state = tool_context.state
+    if serial_number:
+        inspection_state.set_header(state, "serial_number", serial_number.strip())
+    if inspector:
+        inspection_state.set_header(state, "inspector", inspector.strip())
+    if machine_hours is not None and machine_hours >= 0:
+        inspection_state.set_header(state, "machine_hours", machine_hours)
+    if primary_status:
+        status = inspection_state.normalize_status(primary_status)
+        if status is None:
+            return {"success": False, "error": "primary_status must be GREEN, YELLOW or RED."}
+        state[f"{inspection_state.PREFIX}primary_status"] = status
+    if general_comments:
+        state[f"{inspection_state.PREFIX}general_comments"] = general_comments
+    return {"success": True}
+
+def record_component_status(tool_context: ToolContext, component: str, status: str, comments: str = "",
+                            section: str = "") -> dict:
+    """
+    Records the status of ONE component. 'component' is an exact key from the key lists,
+    'status' is GREEN, YELLOW or RED. Call it again with 'comments' once the technician gives a reason.
+    """
+    section, component = inspection_state.resolve_component(component, section)
+    if component is None:
+        return {"success": False, "error": "Unknown component key. Use the closest key from the key lists."}
+    status = inspection_state.normalize_status(status)
+    if status is None:
+        return {"success": False, "error": "status must be GREEN, YELLOW or RED."}
+    inspection_state.set_component(tool_context.state, section, component, status, comments)
+    result = {"success": True, "remaining_count": inspection_state.progress(tool_context.state)["remaining_count"]}
+    if status != "GREEN" and not comments:
+        result["needs_comment"] = True
+    return result
+
+def set_section_status(tool_context: ToolContext, section: str, status: str = "GREEN") -> dict:
+    """
+    Bulk-sets every component of a section (GROUND, ENGINE, CAB_EXTERIOR, CAB_INTERIOR).
+    Components already recorded as YELLOW or RED are kept as they are.
+    """
+    section = (section or "").strip().upper().replace(" ", "_")
+    if section not in inspection_state.SECTIONS:
+        return {"success": False, "error": f"section must be one of {list(inspection_state.SECTIONS)}."}
+    status = inspection_state.normalize_status(status)
+    if status is None:
+        return {"success": False, "error": "status must be GREEN, YELLOW or RED."}
+    state = tool_context.state
+    kept = []
+    for key in inspection_state.SECTIONS[section]:
+        current = inspection_state.get_component(state, section, key)
+        if current is not None and current["status"] != "GREEN":
+            kept.append(key)
+            continue
+        inspection_state.set_component(state, section, key, status)
+    return {"success": True, "kept": kept,
+            "remaining_count": inspection_state.progress(state)["remaining_count"]}
+
+def get_remaining_items(tool_context: ToolContext) -> dict:
+    """Lists the components not recorded yet, flagged items missing a comment, and missing details."""
+    state = tool_context.state
+    progress = inspection_state.progress(state)
+    return {
+        "remaining": progress["remaining"],
+        "remaining_count": progress["remaining_count"],
+        "needs_comment": inspection_state.missing_comments(state),
+        "missing_details": [field for field in ("serial_number", "inspector") if not progress["header"][field]],
+    }
+
+def submit_final_completed_inspection(tool_context: ToolContext) -> dict:
+    """
+    TERMINAL ACTION: Use ONLY ONCE at the end. Saves the report recorded in this session.
+    Takes no arguments: record everything with the other tools first.
+    """
+    state = tool_context.state
+    if state.get(f"{inspection_state.PREFIX}report_id"):
+        return {"success": True, "report_id": state.get(f"{inspection_state.PREFIX}report_id")}
+
+    remaining = inspection_state.remaining_items(state)
+    if remaining:
+        return {"success": False, "error": "Ask the technician about the remaining items.", "remaining": remaining}
+    needs_comment = inspection_state.missing_comments(state)
+    if needs_comment:
+        return {"success": False, "error": "Ask the technician for a comment on these items.", "needs_comment": needs_comment}
+
+    result = save_inspection_report(get_db(), inspection_state.build_report(state), inspection_state.photo_links(state))
+    if result.get("success"):
+        state[f"{inspection_state.PREFIX}report_id"] = result["report_id"]
+    return result
 
 def fetch_machine_history(serial_number: str) -> list:
     """Retrieves the last 10 inspection reports for a specific serial number."""
     # Convert the Firestore stream to a list of dicts for the AI
-    reports = get_reports_by_serial(db, serial_number)
+    reports = get_reports_by_serial(get_db(), serial_number)
     return [doc.to_dict() for doc in reports]
 
+def analyze_machine_trends(serial_number: str, component: str = "") -> dict:
+    """
+    Trend analysis of a machine's whole inspection history. For every component that was ever
+    YELLOW or RED: current status, degradations / improvements, streak, days in the current state,
+    machine hours since the last GREEN and trend. Pass 'component' (exact key) to focus on one.
+    """
+    return analyze_history(get_report_history(get_db(), serial_number), component)
+
 def update_past_report(serial_number: str, timestamp: str, updates: str) -> dict:
     """
     Updates specific fields in a historical inspection report.
@@ -45,19 +149,35 @@ def update_past_report(serial_number: str, timestamp: str, updates: str) -> dict
     """
     try:
         updates_dict = json.loads(updates) if isinstance(updates, str) else updates
-        return update_inspection_in_db(db, serial_number, timestamp, updates_dict)
+        return update_inspection_in_db(get_db(), serial_number, timestamp, updates_dict)
     except Exception as e:
         return {"status": "error", "message": f"JSON Parsing Error: {str(e)}"}
 
-def capture_defect_photo(serial_number: str, component_name: str) -> dict:
+def capture_defect_photo(tool_context: ToolContext, component_name: str, serial_number: str = "") -> dict:
     """
     Captures the current camera frame and uploads it to cloud storage.
     Call this IMMEDIATELY when a component is marked as YELLOW or RED.
+    The photo is attached to the component in the report automatically.
     """
-    return upload_defect_photo_to_storage(serial_number, component_name)
+    get_db()  # makes sure the Firebase app (and its storage bucket) is initialized
+    state = tool_context.state
+    serial_number = serial_number or state.get(inspection_state.header_key("serial_number")) or "unknown"
+    frame = frame_store.latest((tool_context.user_id, tool_context.session.id))
+    if frame is None:
+        return {"success": False, "error": "No camera frame available right now."}
+    result = upload_defect_photo_to_storage(serial_number, component_name, frame.data)
+    _, component = inspection_state.resolve_component(component_name)
+    if result.get("success") and component is not None:
+        state[inspection_state.photo_key(component)] = result["url"]
+    return result
 
 # 3. Initialize Tools (No 'name' or 'description' arguments needed)
+set_details_tool = FunctionTool(func=set_inspection_details)
+record_component_tool = FunctionTool(func=record_component_status)
+set_section_tool = FunctionTool(func=set_section_status)
+remaining_items_tool = FunctionTool(func=get_remaining_items)
 submit_final_completed_inspection_tool = FunctionTool(func=submit_final_completed_inspection)
 fetch_history_tool = FunctionTool(func=fetch_machine_history)
 update_report_tool = FunctionTool(func=update_past_report)
+trends_tool = FunctionTool(func=analyze_machine_trends)
 capture_photo_tool = FunctionTool(func=capture_defect_photo) # <-- ADD THIS HERE
\ No newline at end of file
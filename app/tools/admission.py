@@ -0,0 +1,211 @@
+"""
+Admission control and backpressure for outbound model calls (STT, TTS, agent LLM calls).
+
+Every model call goes through `admission.admit()`: a bounded number of calls in flight,
+a per-tenant cap, priority ordering (live voice > chat > background review), a queue
+deadline per priority and explicit load shedding (`Overloaded`) instead of unbounded
+waiting. The tenant and priority come from context variables set once per request with
+`admission.context(...)`, so they follow the request into the ADK runner and its tasks.
+
+Import it as `tools.admission` everywhere so there is exactly one controller per process.
+"""
+
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import itertools
+import os
+import time
+
+from google.adk.models import Gemini
+
+PRIORITIES = {"voice": 0, "chat": 1, "review": 2}
+
+MODEL_MAX_CONCURRENCY = int(os.environ.get("MODEL_MAX_CONCURRENCY", "16"))
+MODEL_TENANT_CONCURRENCY = int(os.environ.get("MODEL_TENANT_CONCURRENCY", "4"))
+MODEL_RESERVED_VOICE = int(os.environ.get("MODEL_RESERVED_VOICE", "2"))
+MODEL_MAX_QUEUE = int(os.environ.get("MODEL_MAX_QUEUE", "64"))
+MODEL_DEADLINES_S = {
+    "voice": float(os.environ.get("MODEL_DEADLINE_VOICE_S", "3")),
+    "chat": float(os.environ.get("MODEL_DEADLINE_CHAT_S", "15")),
+    "review": float(os.environ.get("MODEL_DEADLINE_REVIEW_S", "30")),
+}
+
+_tenant = contextvars.ContextVar("model_tenant", default="anonymous")
+_priority = contextvars.ContextVar("model_priority", default="chat")
+
+
+class Overloaded(Exception):
+    """A model call was shed: the queue is full or its deadline passed before a slot freed."""
+
+    def __init__(self, reason: str, priority: str, retry_after_s: float = 1.0):
+        super().__init__(f"Model capacity exhausted ({reason}, priority {priority})")
+        self.reason = reason
+        self.priority = priority
+        self.retry_after_s = retry_after_s
+
+    def as_dict(self) -> dict:
+        return {"status": "overloaded", "reason": self.reason, "priority": self.priority,
+                "retry_after_s": self.retry_after_s}
+
+
+class _Waiter:
+    def __init__(self, rank, tenant, priority):
+        self.rank = rank  # (priority rank, arrival seq)
+        self.tenant = tenant
+        self.priority = priority
+        self.future = asyncio.get_running_loop().create_future()
+
+    def __lt__(self, other):
+        return self.rank < other.rank
+
+
+class AdmissionController:
+    """
+    - `max_concurrency` calls in flight per process; the last `reserved_voice` slots only
+      admit voice calls, so a review surge can never starve the live loop.
+    - `tenant_limit` calls in flight per tenant (the client device or session, see
+      main.tenant_of); a busy tenant's waiters are skipped, not allowed to block everyone
+      behind them.
+    - Waiters are served by priority, then arrival. A waiter that is not admitted within its
+      priority's deadline is shed; when the queue is full, the lowest-priority waiter is shed
+      to make room for a higher-priority call (otherwise the new call is shed).
+    """
+
+    def __init__(self, max_concurrency: int = MODEL_MAX_CONCURRENCY, tenant_limit: int = MODEL_TENANT_CONCURRENCY,
+                 reserved_voice: int = MODEL_RESERVED_VOICE, max_queue: int = MODEL_MAX_QUEUE,
+                 deadlines_s: dict = None):
+        self.max_concurrency = max_concurrency
+        self.tenant_limit = tenant_limit
+        self.reserved_voice = min(reserved_voice, max_concurrency - 1)
+        self.max_queue = max_queue
+        self.deadlines_s = dict(deadlines_s or MODEL_DEADLINES_S)
+        self.in_flight = 0
+        self._per_tenant = {}
+        self._waiters = []  # sorted by rank
+        self._seq = itertools.count()
+        self.admitted = {p: 0 for p in PRIORITIES}
+        self.shed = {p: 0 for p in PRIORITIES}
+        self.wait_s = {p: 0.0 for p in PRIORITIES}
+
+    @contextlib.contextmanager
+    def context(self, tenant: str, priority: str):
+        """Tag every model call made inside the block (and tasks it spawns)."""
+        tenant_token = _tenant.set(tenant or "anonymous")
+        priority_token = _priority.set(priority if priority in PRIORITIES else "chat")
+        try:
+            yield
+        finally:
+            _tenant.reset(tenant_token)
+            _priority.reset(priority_token)
+
+    def set_context(self, tenant: str, priority: str):
+        """Like `context()`, for the rest of the current task (e.g. one WebSocket connection)."""
+        _tenant.set(tenant or "anonymous")
+        _priority.set(priority if priority in PRIORITIES else "chat")
+
+    @contextlib.asynccontextmanager
+    async def admit(self, tenant: str = None, priority: str = None):
+        tenant = tenant or _tenant.get()
+        priority = priority or _priority.get()
+        start = time.perf_counter()
+        await self._acquire(tenant, priority)
+        self.admitted[priority] += 1
+        self.wait_s[priority] += time.perf_counter() - start
+        try:
+            yield
+        finally:
+            self._release(tenant)
+
+    # --- Internals ---
+
+    def _can_start(self, tenant: str, priority: str) -> bool:
+        capacity = self.max_concurrency if priority == "voice" else self.max_concurrency - self.reserved_voice
+        return self.in_flight < capacity and self._per_tenant.get(tenant, 0) < self.tenant_limit
+
+    def _start(self, tenant: str):
+        self.in_flight += 1
+        self._per_tenant[tenant] = self._per_tenant.get(tenant, 0) + 1
+
+    async def _acquire(self, tenant: str, priority: str):
+        rank = (PRIORITIES[priority], next(self._seq))
+        # Waiters are re-checked on every release, so any that are still queued cannot start now
+        if self._can_start(tenant, priority):
+            self._start(tenant)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            worst = self._waiters[-1]
+            if worst.rank[0] <= rank[0]:
+                self.shed[priority] += 1
+                raise Overloaded("queue_full", priority)
+            self._waiters.pop()
+            self.shed[worst.priority] += 1
+            worst.future.set_exception(Overloaded("preempted", worst.priority))
+
+        waiter = _Waiter(rank, tenant, priority)
+        bisect.insort(self._waiters, waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.deadlines_s[priority])
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.exception():
+                return  # admitted in the same instant the deadline fired
+            self._remove(waiter)
+            self.shed[priority] += 1
+            raise Overloaded("deadline", priority, retry_after_s=self.deadlines_s[priority])
+        except asyncio.CancelledError:
+            self._remove(waiter)
+            if waiter.future.done() and not waiter.future.cancelled() and not waiter.future.exception():
+                self._release(tenant)  # slot was granted to a caller that is gone
+            raise
+
+    def _remove(self, waiter: _Waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        if not waiter.future.done():
+            waiter.future.cancel()
+
+    def _release(self, tenant: str):
+        self.in_flight -= 1
+        remaining = self._per_tenant.get(tenant, 1) - 1
+        if remaining:
+            self._per_tenant[tenant] = remaining
+        else:
+            self._per_tenant.pop(tenant, None)
+        self._dispatch()
+
+    def _dispatch(self):
+        for waiter in list(self._waiters):
+            if self.in_flight >= self.max_concurrency:
+                break
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+            elif self._can_start(waiter.tenant, waiter.priority):
+                self._waiters.remove(waiter)
+                self._start(waiter.tenant)
+                waiter.future.set_result(True)
+
+    def as_dict(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "tenant_limit": self.tenant_limit,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "mean_wait_ms": {p: round(1000 * self.wait_s[p] / n, 1) if (n := self.admitted[p]) else None
+                             for p in PRIORITIES},
+        }
+
+
+admission = AdmissionController()
+
+
+class AdmittedGemini(Gemini):
+    """ADK Gemini model whose every LLM call goes through the shared admission controller."""
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        async with admission.admit():
+            async for response in super().generate_content_async(llm_request, stream=stream):
+                yield response
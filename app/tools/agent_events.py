@@ -0,0 +1,94 @@
+"""Turns ADK runner events into small, client-friendly stream events."""
+
+import json
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+
+async def ensure_session(runner, user_id: str, session_id: str):
+    """Fetch the ADK session, creating it on first use."""
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id)
+    if session is None:
+        print(f"📦 Creating session: {session_id}")
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id=user_id, session_id=session_id)
+    return session
+
+
+async def append_exchange(runner, session, text: str, reply: str, state_delta: dict = None):
+    """
+    Record a turn answered without running the agent (fast path, cache hit) as regular
+    user / agent events, so the agent sees it in its history on the next turn.
+    """
+    invocation_id = f"local-{Event.new_id()}"
+    await runner.session_service.append_event(session, Event(
+        invocation_id=invocation_id, author="user",
+        content=types.Content(role="user", parts=[types.Part(text=text)]),
+    ))
+    await runner.session_service.append_event(session, Event(
+        invocation_id=invocation_id, author=runner.agent.name,
+        content=types.Content(role="model", parts=[types.Part(text=reply)]),
+        actions=EventActions(state_delta=state_delta or {}),
+    ))
+
+
+async def iter_agent_events(runner, user_id: str, session_id: str, text: str):
+    """
+    Run one agent turn with SSE streaming and yield, as they happen:
+        {"type": "text", "text": <delta>}
+        {"type": "tool_call", "name": ..., "args": {...}}
+        {"type": "tool_result", "name": ..., "success": bool | None}
+        {"type": "final", "text": <full final reply>}
+    """
+    new_message = types.Content(role="user", parts=[types.Part(text=text)])
+    streamed = False  # partial deltas already covered the next aggregated event
+    final_text = ""
+    async for event in runner.run_async(
+        user_id=user_id, session_id=session_id, new_message=new_message,
+        run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+    ):
+        if not (event.content and event.content.parts):
+            continue
+        if not event.partial:
+            for call in event.get_function_calls():
+                yield {"type": "tool_call", "name": call.name, "args": dict(call.args or {})}
+            for response in event.get_function_responses():
+                result = response.response if isinstance(response.response, dict) else {}
+                if "success" in result:
+                    success = bool(result["success"])
+                elif "status" in result:
+                    success = result["status"] == "success"
+                else:
+                    success = None
+                yield {"type": "tool_result", "name": response.name, "success": success}
+
+        chunk = "".join(part.text for part in event.content.parts if getattr(part, "text", None))
+        if event.partial:
+            if chunk:
+                streamed = True
+                yield {"type": "text", "text": chunk}
+        else:
+            if chunk and not streamed:
+                yield {"type": "text", "text": chunk}
+            streamed = False
+            if event.is_final_response() and chunk:
+                final_text = chunk
+    yield {"type": "final", "text": final_text}
+
+
+async def iter_agent_text(runner, user_id: str, session_id: str, text: str):
+    """Just the reply text deltas of a turn (for speech output)."""
+    async for event in iter_agent_events(runner, user_id, session_id, text):
+        if event["type"] == "text":
+            yield event["text"]
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def format_ndjson(event: dict) -> str:
+    return json.dumps(event, default=str) + "\n"
@@ -0,0 +1,171 @@
+"""
+On-disk cache of the zone locator's anchor features (SuperPoint keypoints, scores, descriptors).
+
+Layout: <cache dir>/v<CACHE_VERSION>-<extractor config digest>/<image sha256>.npy + .json
+- The .npy holds a float32 [keypoints, 3 + D] array (x, y, score, descriptor) and is
+  loaded memory-mapped, so startup reads no more than the pages the matcher touches.
+- The .json sidecar (image size, keypoint count, source file) is written last and marks
+  the entry complete; both are written to a temp file and renamed into place.
+- Entries are keyed by image content, so renamed anchors are reused, edited ones are
+  re-extracted and a new extractor config or cache format starts a fresh directory.
+
+Build or refresh it offline (from the repo root):
+    python -m app.tools.anchor_cache [--anchor-dir DIR] [--cache-dir DIR] [--prune]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+
+CACHE_VERSION = 1
+EXTRACTOR_CONFIG = {"features": "superpoint", "max_num_keypoints": 1024}
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CACHE_DIR_NAME = re.compile(r"^v\d+-[0-9a-f]{12}$")
+
+DEFAULT_ANCHOR_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "resources", "images", "anchors"))
+ANCHOR_CACHE_DIR = os.environ.get("ANCHOR_CACHE_DIR", os.path.join(DEFAULT_ANCHOR_DIR, ".features"))
+
+
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def config_digest(config: dict = EXTRACTOR_CONFIG) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+
+class AnchorFeatureCache:
+    """Content-addressed store of extracted anchor features for one extractor config."""
+
+    def __init__(self, cache_dir: str = ANCHOR_CACHE_DIR, config: dict = EXTRACTOR_CONFIG):
+        self.root = cache_dir
+        self.path = os.path.join(cache_dir, f"v{CACHE_VERSION}-{config_digest(config)}")
+
+    def _entry(self, digest: str, ext: str) -> str:
+        return os.path.join(self.path, f"{digest}{ext}")
+
+    def load(self, digest: str):
+        """{"keypoints", "scores", "descriptors", "image_size"} as memory-mapped arrays, or None."""
+        try:
+            with open(self._entry(digest, ".json")) as f:
+                meta = json.load(f)
+            # copy-on-write map: zero-copy, and torch.from_numpy gets a writable array
+            packed = np.load(self._entry(digest, ".npy"), mmap_mode="c")
+        except (OSError, ValueError):
+            return None
+        if packed.ndim != 2 or packed.shape[0] != meta.get("keypoints"):
+            return None
+        return {"keypoints": packed[:, :2], "scores": packed[:, 2], "descriptors": packed[:, 3:],
+                "image_size": np.asarray(meta["image_size"], dtype=np.float32)}
+
+    def store(self, digest: str, features: dict, source: str = ""):
+        os.makedirs(self.path, exist_ok=True)
+        packed = np.concatenate([
+            np.asarray(features["keypoints"], dtype=np.float32).reshape(-1, 2),
+            np.asarray(features["scores"], dtype=np.float32).reshape(-1, 1),
+            np.asarray(features["descriptors"], dtype=np.float32),
+        ], axis=1)
+        meta = {"keypoints": int(packed.shape[0]), "source": source,
+                "image_size": [float(v) for v in np.asarray(features["image_size"]).reshape(-1)]}
+        tmp = self._entry(digest, f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, packed)
+        os.replace(tmp, self._entry(digest, ".npy"))
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._entry(digest, ".json"))
+
+    def prune(self, keep: set) -> int:
+        """Delete entries not in `keep` and the v<N>-<config> directories of other versions / configs."""
+        removed = 0
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                # Only directories this cache created: the root may be shared with other files
+                if path != self.path and CACHE_DIR_NAME.match(name) and os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+        if os.path.isdir(self.path):
+            for name in os.listdir(self.path):
+                if name.split(".", 1)[0] not in keep:
+                    os.remove(os.path.join(self.path, name))
+                    removed += 1
+        return removed
+
+
+def extract_features(extractor, path: str, device) -> dict:
+    """SuperPoint features of one image as NumPy arrays (the cache entry format)."""
+    import torch
+    from lightglue.utils import load_image
+
+    image, _, _ = load_image(path)
+    with torch.inference_mode():
+        feats = extractor.extract(image.to(device).unsqueeze(0))
+    return {
+        "keypoints": feats["keypoints"][0].cpu().numpy(),
+        "scores": feats["keypoint_scores"][0].cpu().numpy(),
+        "descriptors": feats["descriptors"][0].cpu().numpy(),
+        "image_size": feats["image_size"][0].cpu().numpy(),
+    }
+
+
+def load_anchor_features(anchor_dir: str, filenames, extractor, device, cache: AnchorFeatureCache = None):
+    """
+    {filename: features} for the anchors that exist on disk, reading each from the cache and
+    extracting (and caching) only those whose content is not there yet.
+    Returns (features, number extracted).
+    """
+    cache = cache or AnchorFeatureCache()
+    features, extracted = {}, 0
+    for filename in filenames:
+        path = os.path.join(anchor_dir, filename)
+        if not os.path.exists(path):
+            continue
+        digest = file_digest(path)
+        feats = cache.load(digest)
+        if feats is None:
+            feats = extract_features(extractor, path, device)
+            try:
+                cache.store(digest, feats, source=filename)
+            except OSError as e:
+                print(f"  ⚠  Anchor cache not writable ({e}); features kept in memory only")
+            extracted += 1
+        features[filename] = feats
+    return features, extracted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the zone locator's anchor feature cache")
+    parser.add_argument("--anchor-dir", default=DEFAULT_ANCHOR_DIR)
+    parser.add_argument("--cache-dir", default=ANCHOR_CACHE_DIR)
+    parser.add_argument("--prune", action="store_true", help="drop entries of images no longer in --anchor-dir")
+    args = parser.parse_args()
+
+    import torch
+    from lightglue import SuperPoint
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    extractor = SuperPoint(max_num_keypoints=EXTRACTOR_CONFIG["max_num_keypoints"]).eval().to(device)
+    cache = AnchorFeatureCache(args.cache_dir)
+    filenames = sorted(f for f in os.listdir(args.anchor_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+    start = time.perf_counter()
+    _, extracted = load_anchor_features(args.anchor_dir, filenames, extractor, device, cache)
+    print(f"✅ {len(filenames)} anchors cached in {cache.path} "
+          f"({extracted} extracted, {len(filenames) - extracted} up to date) in {time.perf_counter() - start:.1f}s")
+    if args.prune:
+        keep = {file_digest(os.path.join(args.anchor_dir, f)) for f in filenames}
+        print(f"🧹 Pruned {cache.prune(keep)} stale cache files")
+
+
+if __name__ == "__main__":
+    main()
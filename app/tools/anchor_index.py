@@ -0,0 +1,49 @@
+"""
+Coarse retrieval stage of the zone locator.
+
+Every anchor frame is summarised by one global descriptor (its SuperPoint descriptors pooled
+into a single unit vector) and the library is a NumPy [anchors x dim] matrix. A query is
+scored against all anchors with one matrix-vector product and only the top-k go on to
+LightGlue verification, so locator latency stays flat as the anchor library grows
+(several machine models, hundreds of anchors, different lighting).
+"""
+
+import os
+
+import numpy as np
+
+ZONE_SHORTLIST_K = int(os.environ.get("ZONE_SHORTLIST_K", "8"))
+
+
+def global_descriptor(descriptors, scores=None) -> np.ndarray:
+    """
+    Pools local descriptors [N, D] (and optional keypoint scores [N]) into a unit vector [D]:
+    score-weighted mean, signed square root (damps bursty repeated texture), L2 norm.
+    """
+    descriptors = np.asarray(descriptors, dtype=np.float32)
+    if descriptors.shape[0] == 0:
+        return np.zeros(descriptors.shape[1], dtype=np.float32)
+    weights = np.ones(descriptors.shape[0], dtype=np.float32) if scores is None else np.asarray(scores, dtype=np.float32)
+    pooled = weights @ descriptors / max(float(weights.sum()), 1e-6)
+    pooled = np.sign(pooled) * np.sqrt(np.abs(pooled))
+    norm = np.linalg.norm(pooled)
+    return pooled / norm if norm > 0 else pooled
+
+
+class AnchorIndex:
+    """Cosine-similarity index over the anchors' global descriptors ([N, D], one row per anchor)."""
+
+    def __init__(self, vectors):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def search(self, query: np.ndarray, k: int = ZONE_SHORTLIST_K) -> np.ndarray:
+        """Row indices of the k most similar anchors, best first (all rows when k >= N)."""
+        n = len(self)
+        if k <= 0 or k >= n:
+            return np.argsort(-(self.vectors @ query), kind="stable")
+        similarity = self.vectors @ query
+        top = np.argpartition(-similarity, k - 1)[:k]
+        return top[np.argsort(-similarity[top], kind="stable")]
@@ -0,0 +1,131 @@
+"""Preallocated int16 ring buffer for the per-session audio path of /ws/stt."""
+
+import os
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+WINDOW_SAMPLES = 512
+INT16_SCALE = np.float32(1.0 / 32768.0)
+MAX_UTTERANCE_S = float(os.environ.get("MAX_UTTERANCE_S", "30"))
+
+
+class PCMRingBuffer:
+    """
+    Fixed-capacity buffer holding the current utterance as int16 samples.
+
+    - `write()` copies a chunk into the preallocated ring (no growth, no per-chunk allocations).
+    - `fill_window()` reframes the audio into exact VAD windows, converting int16 -> float32
+      straight into a caller-provided array.
+    - Once `max_seconds` of audio are buffered the oldest samples are overwritten and `full` is
+      set, so a stuck-open microphone can never grow memory.
+
+    Behaves like the old `bytearray` where it matters: `len()` is the byte length of the
+    buffered utterance, `bytes()` returns it as contiguous PCM, `clear()` empties it.
+
+    Positions (`start`, `end`, `framed`) are absolute sample counts since the buffer was
+    created and never rewind, so a VAD event's sample position stays valid after the buffer
+    is cut: `discard_before(pos)` drops the audio in front of it, `samples(end=pos)` copies
+    the audio up to it.
+    """
+
+    def __init__(self, max_seconds: float = MAX_UTTERANCE_S, sample_rate: int = SAMPLE_RATE,
+                 window_samples: int = WINDOW_SAMPLES):
+        self.capacity = int(max_seconds * sample_rate)
+        self.sample_rate = sample_rate
+        self.window_samples = window_samples
+        self._ring = np.zeros(self.capacity, dtype=np.int16)
+        # Absolute sample positions; ring index is position % capacity
+        self._start = 0      # first buffered sample
+        self._end = 0        # one past the last written sample
+        self._framed = 0     # next sample not yet handed to the VAD
+        self.clear()
+
+    def clear(self):
+        self._start = self._framed = self._end
+        self._odd_byte = None
+        self.full = False
+
+    def __len__(self):
+        return (self._end - self._start) * 2
+
+    def __bytes__(self):
+        return self.samples().tobytes()
+
+    @property
+    def start(self) -> int:
+        return self._start
+
+    @property
+    def end(self) -> int:
+        return self._end
+
+    @property
+    def framed(self) -> int:
+        return self._framed
+
+    @property
+    def seconds(self) -> float:
+        return (self._end - self._start) / self.sample_rate
+
+    @property
+    def pending_windows(self) -> int:
+        return (self._end - self._framed) // self.window_samples
+
+    def write(self, data: bytes) -> int:
+        """Append a chunk of little-endian int16 PCM. Returns the number of samples written."""
+        if self._odd_byte is not None:
+            data = self._odd_byte + data
+            self._odd_byte = None
+        if len(data) % 2:
+            self._odd_byte = data[-1:]
+            data = data[:-1]
+        chunk = np.frombuffer(data, dtype=np.int16)  # zero-copy view of the frame
+        n = len(chunk)
+        if n > self.capacity:
+            chunk = chunk[-self.capacity:]
+            self._end += n - self.capacity
+            n = self.capacity
+
+        pos = self._end % self.capacity
+        first = min(n, self.capacity - pos)
+        self._ring[pos:pos + first] = chunk[:first]
+        if first < n:
+            self._ring[:n - first] = chunk[first:]
+        self._end += n
+
+        if self._end - self._start >= self.capacity:
+            self.full = True
+            self._start = self._end - self.capacity
+            self._framed = max(self._framed, self._start)
+        return n
+
+    def fill_window(self, out: np.ndarray) -> bool:
+        """Write the next complete VAD window into `out` (float32, in place). False if none is ready."""
+        w = self.window_samples
+        if self._end - self._framed < w:
+            return False
+        pos = self._framed % self.capacity
+        first = min(w, self.capacity - pos)
+        np.multiply(self._ring[pos:pos + first], INT16_SCALE, out=out[:first])
+        if first < w:
+            np.multiply(self._ring[:w - first], INT16_SCALE, out=out[first:])
+        self._framed += w
+        return True
+
+    def discard_before(self, position: int):
+        """Drop the buffered audio in front of absolute sample `position`."""
+        self._start = min(max(self._start, int(position)), self._end)
+        self._framed = max(self._framed, self._start)
+        if self._end - self._start < self.capacity:
+            self.full = False
+
+    def samples(self, start: int = None, end: int = None) -> np.ndarray:
+        """Contiguous int16 copy of the buffered audio in [start, end) (default: all of it)."""
+        start = self._start if start is None else min(max(int(start), self._start), self._end)
+        end = self._end if end is None else min(max(int(end), start), self._end)
+        n = end - start
+        pos = start % self.capacity
+        if pos + n <= self.capacity:
+            return self._ring[pos:pos + n].copy()
+        return np.concatenate([self._ring[pos:], self._ring[:n - (self.capacity - pos)]])
@@ -0,0 +1,135 @@
+"""
+Streaming decoders for compressed audio sent over the voice WebSockets.
+
+The client picks a codec in its `start` command (or the `?codec=` query param) and
+the server decodes every binary frame back into the 16 kHz mono int16 PCM that the
+VAD / STT pipeline already expects. One decoder instance per session, since the
+codecs carry state from frame to frame.
+
+    pcm16  raw little-endian 16-bit PCM (default, 256 kbps)
+    ulaw   G.711 mu-law, 8 bits/sample (128 kbps)
+    adpcm  IMA ADPCM, 4 bits/sample, state continues across frames (64 kbps)
+    opus   one raw Opus packet per frame, no Ogg container (~16-24 kbps, needs opuslib
+           and the libopus system library; not offered when either is missing)
+"""
+
+import numpy as np
+
+try:
+    import audioop  # stdlib up to Python 3.12
+except ImportError:
+    audioop = None
+
+try:
+    import opuslib
+except Exception:  # not installed, or installed without libopus (opuslib raises a bare Exception)
+    opuslib = None
+
+SAMPLE_RATE = 16000
+
+
+class PCM16Decoder:
+    name = "pcm16"
+
+    def decode(self, data: bytes) -> bytes:
+        return data
+
+
+class ULawDecoder:
+    name = "ulaw"
+
+    _table = None
+
+    def decode(self, data: bytes) -> bytes:
+        if audioop is not None:
+            return audioop.ulaw2lin(data, 2)
+        if ULawDecoder._table is None:
+            ULawDecoder._table = _ulaw_table()
+        return ULawDecoder._table[np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+
+class IMAADPCMDecoder:
+    name = "adpcm"
+
+    def __init__(self):
+        self.state = None  # (predicted sample, step index), carried across frames
+
+    def decode(self, data: bytes) -> bytes:
+        if audioop is not None:
+            pcm, self.state = audioop.adpcm2lin(data, 2, self.state)
+            return pcm
+        pcm, self.state = _adpcm_decode(data, self.state)
+        return pcm
+
+
+class OpusDecoder:
+    name = "opus"
+    MAX_FRAME_SAMPLES = SAMPLE_RATE * 120 // 1000  # longest Opus packet is 120 ms
+
+    def __init__(self):
+        self.decoder = opuslib.Decoder(SAMPLE_RATE, 1)
+
+    def decode(self, data: bytes) -> bytes:
+        return self.decoder.decode(data, self.MAX_FRAME_SAMPLES)
+
+
+DECODERS = {
+    "pcm16": PCM16Decoder,
+    "ulaw": ULawDecoder,
+    "adpcm": IMAADPCMDecoder,
+}
+if opuslib is not None:
+    DECODERS["opus"] = OpusDecoder
+
+
+def make_decoder(codec: str = "pcm16"):
+    """Fresh per-session decoder for `codec`. Raises ValueError for unsupported codecs."""
+    codec = (codec or "pcm16").lower()
+    if codec not in DECODERS:
+        raise ValueError(f"Unsupported codec '{codec}'. Supported: {', '.join(DECODERS)}")
+    return DECODERS[codec]()
+
+
+# --- Pure NumPy / Python fallbacks for interpreters without audioop ---
+
+def _ulaw_table() -> np.ndarray:
+    u = ~np.arange(256, dtype=np.uint8)
+    exponent = (u >> 4) & 0x07
+    mantissa = u & 0x0F
+    magnitude = ((mantissa.astype(np.int32) << 3) + 0x84) << exponent
+    sample = magnitude - 0x84
+    return np.where(u & 0x80, -sample, sample).astype(np.int16)
+
+
+_IMA_STEPS = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767,
+]
+_IMA_INDEX = [-1, -1, -1, -1, 2, 4, 6, 8]
+
+
+def _adpcm_decode(data: bytes, state):
+    """Same bit layout as audioop.adpcm2lin (high nibble first)."""
+    value, index = state if state is not None else (0, 0)
+    out = np.empty(len(data) * 2, dtype=np.int16)
+    n = 0
+    for byte in data:
+        for code in (byte >> 4, byte & 0x0F):
+            step = _IMA_STEPS[index]
+            delta = step >> 3
+            if code & 4:
+                delta += step
+            if code & 2:
+                delta += step >> 1
+            if code & 1:
+                delta += step >> 2
+            value = value - delta if code & 8 else value + delta
+            value = max(-32768, min(32767, value))
+            index = max(0, min(88, index + _IMA_INDEX[code & 7]))
+            out[n] = value
+            n += 1
+    return out.tobytes(), (value, index)
@@ -0,0 +1,140 @@
+"""Trims silence out of an utterance and compresses it before it is uploaded to STT."""
+
+import asyncio
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from app.tools.stt import pcm_to_wav_bytes
+
+try:
+    import soundfile as sf
+except ImportError:  # FLAC needs libsndfile; fall back to WAV without it
+    sf = None
+
+SAMPLE_RATE = 16000
+AUDIO_FORMAT = os.environ.get("STT_AUDIO_FORMAT", "flac").lower()
+SEGMENT_S = float(os.environ.get("STT_SEGMENT_S", "10"))
+
+
+class AudioPreparer:
+    """
+    Audio preparation stage in front of the STT backend.
+
+    1. Runs silero's `get_speech_timestamps` over the utterance and keeps only the speech
+       regions, joined with `gap_ms` of silence so word boundaries survive.
+    2. Encodes the result as 16-bit FLAC (lossless, roughly half the bytes of WAV for speech),
+       or WAV when STT_AUDIO_FORMAT=wav / soundfile is not installed.
+
+    Long dictations can instead be cut at the VAD-detected pauses into segments of about
+    `SEGMENT_S` seconds of speech (`prepare_segments()`), so they can be transcribed in parallel.
+
+    `prepare()` / `prepare_segments()` are synchronous and use a silero model of their own (not
+    the one BatchedVADScheduler streams live audio through); async callers go through `run()`,
+    which serializes them on the preparer's own worker thread, so trimming a long utterance never
+    delays VAD events of the open sessions.
+    """
+
+    def __init__(self, model=None, get_speech_timestamps=None, gap_ms: int = 150, speech_pad_ms: int = 100,
+                 audio_format: str = AUDIO_FORMAT, sample_rate: int = SAMPLE_RATE, vad_loader=None):
+        # Either the loaded model + function, or `vad_loader() -> (model, get_speech_timestamps)`
+        self._vad = (model, get_speech_timestamps) if model is not None else None
+        self._vad_loader = vad_loader
+        self.gap = np.zeros(int(sample_rate * gap_ms / 1000), dtype=np.int16)
+        self.speech_pad_ms = speech_pad_ms
+        self.audio_format = audio_format if (audio_format != "flac" or sf is not None) else "wav"
+        self.sample_rate = sample_rate
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt-prep")
+        # Running totals for /metrics and benchmarks
+        self.utterances = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def speech_regions(self, samples: np.ndarray) -> list:
+        """[{"start": sample, "end": sample}, ...] for every speech region of an int16 utterance."""
+        if self._vad is None:
+            self._vad = self._vad_loader()
+        model, get_speech_timestamps = self._vad
+        audio = torch.from_numpy(samples.astype(np.float32) / 32768.0)
+        with torch.inference_mode():
+            return get_speech_timestamps(
+                audio, model, sampling_rate=self.sample_rate, speech_pad_ms=self.speech_pad_ms)
+
+    def trim(self, samples: np.ndarray, regions=None) -> np.ndarray:
+        """Keep only the speech regions of an int16 utterance (empty array if there is none)."""
+        if regions is None:
+            regions = self.speech_regions(samples)
+        if not regions:
+            return samples[:0]
+        pieces = []
+        for i, region in enumerate(regions):
+            if i:
+                pieces.append(self.gap)
+            pieces.append(samples[region["start"]:region["end"]])
+        return np.concatenate(pieces)
+
+    def encode(self, samples: np.ndarray):
+        """Returns (audio bytes, mime type)."""
+        if self.audio_format == "flac":
+            buf = io.BytesIO()
+            sf.write(buf, samples, self.sample_rate, format="FLAC", subtype="PCM_16")
+            return buf.getvalue(), "audio/flac"
+        return pcm_to_wav_bytes(samples.tobytes(), self.sample_rate), "audio/wav"
+
+    def prepare(self, pcm_bytes: bytes):
+        """Raw 16 kHz PCM -> (encoded speech-only audio, mime type), or (None, None) if silent."""
+        samples = np.frombuffer(pcm_bytes, dtype=np.int16)
+        speech = self.trim(samples)
+        self.utterances += 1
+        self.bytes_in += len(pcm_bytes) + 44  # what the plain WAV upload used to cost
+        if not len(speech):
+            return None, None
+        audio, mime_type = self.encode(speech)
+        self.bytes_out += len(audio)
+        return audio, mime_type
+
+    def prepare_segments(self, pcm_bytes: bytes, segment_s: float = SEGMENT_S) -> list:
+        """
+        Raw 16 kHz PCM -> [(audio, mime type), ...] in order. Speech regions are grouped
+        while the trimmed group (speech plus the gaps joining it) stays within `segment_s`, so
+        every cut falls in a pause and long pauses do not count; a short utterance gives a
+        single segment and a silent one gives [].
+        """
+        samples = np.frombuffer(pcm_bytes, dtype=np.int16)
+        regions = self.speech_regions(samples)
+        self.utterances += 1
+        self.bytes_in += len(pcm_bytes) + 44
+        max_samples = segment_s * self.sample_rate
+
+        groups, group_samples = [], 0
+        for region in regions:
+            length = region["end"] - region["start"]
+            if groups and group_samples + len(self.gap) + length <= max_samples:
+                groups[-1].append(region)
+                group_samples += len(self.gap) + length
+            else:
+                groups.append([region])
+                group_samples = length
+
+        segments = []
+        for group in groups:
+            audio, mime_type = self.encode(self.trim(samples, group))
+            self.bytes_out += len(audio)
+            segments.append((audio, mime_type))
+        return segments
+
+    async def run(self, fn, *args):
+        """Run `fn(*args)` (e.g. `self.prepare_segments`) on the preparer's worker thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def as_dict(self) -> dict:
+        return {
+            "format": self.audio_format,
+            "utterances": self.utterances,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+        }
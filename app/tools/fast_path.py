@@ -0,0 +1,297 @@
+"""
+Deterministic fast path for predictable technician utterances ("tires good",
+"whole ground section is OK", "engine oil seeping, monitor").
+
+High-confidence utterances are applied to the inspection state directly and answered with a
+canned acknowledgement, skipping the LLM round trip. Anything the parser is not sure about
+falls through to the generator agent unchanged.
+"""
+
+import asyncio
+import os
+import re
+import time
+from collections import deque
+
+from tools import inspection_state
+from app.tools.agent_events import append_exchange, ensure_session, iter_agent_events
+
+FAST_PATH = os.environ.get("FAST_PATH", "1") != "0"
+
+# Spoken phrase -> component key. The first phrase of each key is also its spoken name.
+COMPONENT_SYNONYMS = {
+    "tires_wheels_stem_caps_lug_nuts": ["tires", "tyres", "tire", "wheels", "rims", "lug nuts", "stem caps"],
+    "bucket_cutting_edge_moldboard": ["bucket", "cutting edge", "moldboard", "bucket edge"],
+    "bucket_cylinders_lines_hoses": ["bucket cylinders", "bucket hoses", "bucket lines", "lift cylinders"],
+    "loader_frame_arms": ["loader frame", "loader arms", "lift arms"],
+    "underneath_machine": ["underneath", "under the machine", "undercarriage", "underside"],
+    "transmission_transfer_case": ["transmission", "transfer case"],
+    "steps_handholds": ["steps", "ladder"],
+    "fuel_tank": ["fuel tank"],
+    "differential_final_drive_oil": ["differential", "final drive", "final drive oil", "diff oil"],
+    "air_tank": ["air tank"],
+    "axles_brakes_seals": ["axles", "brakes", "axle seals"],
+    "hydraulic_tank": ["hydraulic tank", "hydraulic oil", "hydraulics"],
+    "transmission_oil": ["transmission oil", "trans oil"],
+    "lights_front_rear": ["lights", "headlights", "tail lights", "work lights"],
+    "battery_compartment": ["battery", "batteries"],
+    "def_tank": ["def tank", "def", "diesel exhaust fluid"],
+    "overall_machine": ["overall machine", "machine overall", "whole machine"],
+    "engine_oil": ["engine oil"],
+    "engine_coolant": ["coolant", "engine coolant", "antifreeze"],
+    "radiator": ["radiator"],
+    "all_hoses_and_lines": ["hoses", "lines", "hoses and lines", "engine hoses"],
+    "fuel_filters_water_separator": ["fuel filters", "fuel filter", "water separator"],
+    "all_belts": ["belts", "belt", "fan belt"],
+    "air_filter": ["air filter", "engine air filter"],
+    "overall_engine_compartment": ["engine compartment", "engine bay"],
+    "handholds": ["cab handholds", "grab handles"],
+    "rops": ["rops", "rollover structure"],
+    "fire_extinguisher": ["fire extinguisher", "extinguisher"],
+    "windshield_windows": ["windshield", "windows", "glass"],
+    "wipers_washers": ["wipers", "washers", "wiper", "washer fluid"],
+    "doors": ["doors", "door"],
+    "seat": ["seat", "operator seat"],
+    "seat_belt_mounting": ["seat belt", "seatbelt"],
+    "horn_alarm_lights": ["horn", "backup alarm", "alarm", "warning lights", "beacon"],
+    "mirrors": ["mirrors", "mirror"],
+    "cab_air_filter": ["cab air filter", "cab filter"],
+    "gauges_indicators_switches": ["gauges", "indicators", "switches", "dashboard", "dash"],
+    "overall_cab_interior": ["overall cab", "overall cab interior"],
+}
+# Phrases that name more than one component: never guessed
+AMBIGUOUS_PHRASES = ["handholds", "oil", "filter", "filters", "tank", "tanks", "cylinders"]
+
+SECTION_SYNONYMS = {
+    "GROUND": ["ground", "ground level", "walkaround"],
+    "ENGINE": ["engine"],
+    "CAB_EXTERIOR": ["cab exterior", "outside of the cab", "outside the cab"],
+    "CAB_INTERIOR": ["cab interior", "inside of the cab", "inside the cab"],
+}
+SECTION_GROUPS = {"cab": ["CAB_EXTERIOR", "CAB_INTERIOR"]}
+SECTION_NAMES = {"GROUND": "ground", "ENGINE": "engine", "CAB_EXTERIOR": "cab exterior",
+                 "CAB_INTERIOR": "cab interior"}
+
+# Status phrases; the descriptive ones (not in BARE_STATUS_WORDS) become the item's comment.
+STATUS_PHRASES = {
+    "GREEN": ["good", "ok", "okay", "fine", "pass", "passed", "passes", "green", "clean", "great",
+              "looks good", "no issues", "no problems", "checks out", "all set"],
+    "YELLOW": ["monitor", "yellow", "seeping", "weeping", "worn", "wearing", "low", "dirty", "minor wear",
+               "a little low"],
+    "RED": ["fail", "failed", "fails", "red", "broken", "leaking", "leaks", "cracked", "damaged", "missing",
+            "not working", "bad"],
+}
+BARE_STATUS_WORDS = {"good", "ok", "okay", "fine", "pass", "passed", "passes", "green", "great", "checks out",
+                     "looks good", "all set", "monitor", "yellow", "fail", "failed", "fails", "red", "bad"}
+
+BULK_WORDS = {"whole", "entire", "everything", "section", "all"}
+FILLER_WORDS = {
+    "the", "is", "are", "was", "were", "look", "looks", "looking", "and", "it", "its", "they", "theyre",
+    "them", "that", "those", "this", "a", "an", "to", "on", "of", "be", "seem", "seems", "so", "also",
+    "both", "pretty", "very", "really", "yeah", "yep", "mark", "marked", "as", "set", "check", "checked",
+    "out", "i", "we", "have", "has", "got", "condition", "in", "please", "too", "just", "now",
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _phrase_table():
+    """(phrase tokens, kind, value) sorted longest first, so 'cab air filter' beats 'air filter'."""
+    # ambiguous phrases first: on equal length they win over a component key of the same name
+    table = [(tuple(p.split()), "ambiguous", p) for p in AMBIGUOUS_PHRASES]
+    for key, phrases in COMPONENT_SYNONYMS.items():
+        table += [(tuple(p.split()), "component", key) for p in phrases]
+        table.append((tuple(key.split("_")), "component", key))
+    for section, phrases in SECTION_SYNONYMS.items():
+        table += [(tuple(p.split()), "section", [section]) for p in phrases]
+    table += [(tuple(p.split()), "section", sections) for p, sections in SECTION_GROUPS.items()]
+    for status, phrases in STATUS_PHRASES.items():
+        table += [(tuple(p.split()), "status", (status, p)) for p in phrases]
+    # dedupe while keeping the longest-first order stable
+    seen, unique = set(), []
+    for entry in sorted(table, key=lambda e: -len(e[0])):
+        marker = (entry[0], entry[1], str(entry[2]))
+        if marker not in seen:
+            seen.add(marker)
+            unique.append(entry)
+    return unique
+
+
+class UtteranceParser:
+    """
+    Rule-based intent / slot parser over the component key lists and the synonym tables.
+
+    `parse(text)` returns one of
+        {"intent": "component", "components": [(section, key), ...], "status": ..., "comment": ...}
+        {"intent": "section", "sections": [...], "status": "GREEN"}
+    or None when the utterance is not a high-confidence match: every word must be either a
+    known phrase or filler, so anything extra ("tires good but the left front is cut") goes
+    to the agent.
+    """
+
+    def __init__(self):
+        self.table = _phrase_table()
+
+    def parse(self, text: str):
+        tokens = _WORD_RE.findall((text or "").lower().replace("'", ""))
+        if not tokens or len(tokens) > 16:
+            return None
+        components, sections, statuses, comments = [], [], set(), []
+        bulk = False
+        i = 0
+        while i < len(tokens):
+            match = next((e for e in self.table if tuple(tokens[i:i + len(e[0])]) == e[0]), None)
+            if match is None:
+                word = tokens[i]
+                if word in BULK_WORDS:
+                    bulk = True
+                elif word not in FILLER_WORDS:
+                    return None  # unknown content word: not confident
+                i += 1
+                continue
+            phrase, kind, value = match
+            if kind == "ambiguous":
+                return None
+            if kind == "component" and value not in components:
+                components.append(value)
+            elif kind == "section":
+                sections += [s for s in value if s not in sections]
+            elif kind == "status":
+                status, status_phrase = value
+                statuses.add(status)
+                if status_phrase not in BARE_STATUS_WORDS:
+                    comments.append(status_phrase)
+            i += len(phrase)
+
+        if len(statuses) != 1:
+            return None
+        status = statuses.pop()
+        if components and not sections:
+            return {
+                "intent": "component",
+                "components": [(inspection_state.COMPONENT_SECTION[key], key) for key in components],
+                "status": status,
+                "comment": ", ".join(comments).capitalize() if status != "GREEN" else "",
+            }
+        if sections and not components and bulk and status == "GREEN":
+            return {"intent": "section", "sections": sections, "status": status}
+        return None
+
+
+def spoken_name(key: str) -> str:
+    return COMPONENT_SYNONYMS.get(key, [key.replace("_", " ")])[0]
+
+
+def _join(names) -> str:
+    names = list(names)
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + " and " + names[-1]
+
+
+class PathStats:
+    """Turn counts and latency per path ("fast" / "agent")."""
+
+    def __init__(self, window: int = 500):
+        self.counts = {"fast": 0, "agent": 0}
+        self.total_s = {"fast": 0.0, "agent": 0.0}
+        self.recent = {"fast": deque(maxlen=window), "agent": deque(maxlen=window)}
+
+    def record(self, path: str, seconds: float):
+        self.counts[path] += 1
+        self.total_s[path] += seconds
+        self.recent[path].append(seconds)
+
+    def as_dict(self) -> dict:
+        turns = sum(self.counts.values())
+        out = {"turns": turns, "hit_rate": round(self.counts["fast"] / turns, 3) if turns else 0.0}
+        for path, count in self.counts.items():
+            recent = sorted(self.recent[path])
+            out[path] = {
+                "turns": count,
+                "mean_ms": round(1000 * self.total_s[path] / count, 1) if count else None,
+                "p50_ms": round(1000 * recent[len(recent) // 2], 1) if recent else None,
+                "p95_ms": round(1000 * recent[int(len(recent) * 0.95)], 1) if recent else None,
+            }
+        return out
+
+
+class FastPath:
+    """
+    Applies parsed utterances to the generator session and answers them without the LLM.
+
+    The user utterance and the canned reply are appended to the session as regular events
+    (the state change rides on the reply's state_delta), so the agent sees the exchange in its
+    history and the persistent session store records the update like any tool call.
+    `photo_uploader(serial_number, component, frame_key)` is called for YELLOW / RED items
+    (frame_key is the session's (user_id, session_id) in the frame store), mirroring the
+    agent's capture_defect_photo step.
+    """
+
+    def __init__(self, parser: UtteranceParser = None, photo_uploader=None, enabled: bool = FAST_PATH):
+        self.parser = parser or UtteranceParser()
+        self.photo_uploader = photo_uploader
+        self.enabled = enabled
+        self.stats = PathStats()
+
+    async def try_handle(self, runner, user_id: str, session_id: str, text: str):
+        """The canned reply if the utterance was handled locally, else None."""
+        if not self.enabled:
+            return None
+        parsed = self.parser.parse(text)
+        if parsed is None:
+            return None
+        session = await ensure_session(runner, user_id, session_id)
+        state = session.state
+        if state.get(f"{inspection_state.PREFIX}report_id"):
+            return None  # already submitted: let the agent explain
+
+        delta = {}
+        if parsed["intent"] == "section":
+            for section in parsed["sections"]:
+                for key in inspection_state.SECTIONS[section]:
+                    current = inspection_state.get_component(state, section, key)
+                    if current is None or current["status"] == "GREEN":
+                        inspection_state.set_component(delta, section, key, "GREEN")
+            reply = f"Got it, {_join(SECTION_NAMES[s] for s in parsed['sections'])} all good. What's next?"
+        else:
+            status, comment = parsed["status"], parsed["comment"]
+            for section, key in parsed["components"]:
+                inspection_state.set_component(delta, section, key, status, comment)
+            names = _join(spoken_name(key) for _, key in parsed["components"])
+            if status == "GREEN":
+                reply = f"Got it, {names} good. What's next?"
+            else:
+                label = "monitor" if status == "YELLOW" else "fail"
+                await self._attach_photos(state, parsed["components"], delta, (user_id, session_id))
+                if comment:
+                    reply = f"Noted, {names} marked {label}: {comment.lower()}. What's next?"
+                else:
+                    reply = f"Noted, {names} marked {label}. What's the reason?"
+
+        await append_exchange(runner, session, text, reply, state_delta=delta)
+        return reply
+
+    async def iter_events(self, runner, user_id: str, session_id: str, text: str):
+        """iter_agent_events with the fast path in front, timing each turn per path."""
+        start = time.perf_counter()
+        reply = await self.try_handle(runner, user_id, session_id, text)
+        if reply is not None:
+            self.stats.record("fast", time.perf_counter() - start)
+            yield {"type": "text", "text": reply}
+            yield {"type": "final", "text": reply, "fast_path": True}
+            return
+        async for event in iter_agent_events(runner, user_id, session_id, text):
+            yield event
+        self.stats.record("agent", time.perf_counter() - start)
+
+    async def _attach_photos(self, state, components, delta, frame_key):
+        if self.photo_uploader is None:
+            return
+        serial_number = state.get(inspection_state.header_key("serial_number")) or "unknown"
+        for _, key in components:
+            try:
+                result = await asyncio.to_thread(self.photo_uploader, serial_number, key, frame_key)
+            except Exception as e:
+                print(f"  ⚠  Fast path photo upload failed: {e}")
+                continue
+            if result.get("success"):
+                delta[inspection_state.photo_key(key)] = result["url"]
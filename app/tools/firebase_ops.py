@@ -96,6 +96,7 @@ def save_inspection_report(db, report_data: dict, photo_links: dict) -> dict:
         doc_ref.set(clean_report)
         if photo_links:
             db.collection('report_photos').document(doc_ref.id).set(photo_links)
+        bump_history_version(db, clean_report["header"]["serial_number"])
         return {"success": True, "report_id": doc_ref.id}
         
     except Exception as e:
@@ -112,6 +113,18 @@ def get_reports_by_serial(db, serial_number: str) -> list:
     )
     return reports
 
+def get_report_history(db, serial_number: str, limit: int = 2000) -> list:
+    """Header and sections of up to `limit` most recent reports for a serial (trend analysis)."""
+    reports = (
+        db.collection("inspection_reports")
+        .where("header.serial_number", "==", serial_number)
+        .order_by("header.timestamp", direction=firestore.Query.DESCENDING)
+        .select(["header", "sections"])  # skip comments/photos payload we do not need
+        .limit(limit)
+        .stream()
+    )
+    return [doc.to_dict() for doc in reports]
+
 def update_inspection_in_db(db, serial_number: str, timestamp: str, updates: dict) -> dict:
     """
     Finds a specific inspection report by serial number and precise timestamp, 
@@ -142,6 +155,7 @@ def update_inspection_in_db(db, serial_number: str, timestamp: str, updates: dic
             }
             
         doc_ref.update(updates)
+        bump_history_version(db, serial_number)
         
         return {
             "status": "success", 
@@ -154,25 +168,49 @@ def update_inspection_in_db(db, serial_number: str, timestamp: str, updates: dic
             "message": f"Database error: {str(e)}"
         }
     
-def upload_defect_photo_to_storage(serial_number: str, component_name: str) -> dict:
-    """Grabs the latest photo from data/stream and uploads to Firebase Storage."""
-    current_dir = os.path.dirname(os.path.abspath(__file__)) 
-    stream_dir = os.path.abspath(os.path.join(current_dir, "..", "data","stream")) 
-    
-    # Point directly to the exact file Flutter saves
-    source_path = os.path.join(stream_dir, "current_frame.jpg")  
-    
-    if not os.path.exists(source_path):
-        return {"success": False, "error": "No camera frame available right now."}
+def upload_defect_photo_to_storage(serial_number: str, component_name: str, image_bytes: bytes = None) -> dict:
+    """
+    Uploads a defect photo to Firebase Storage: `image_bytes` (the session's latest frame from
+    the in-memory frame store) or, without them, the latest photo in data/stream.
+    """
+    source_path = None
+    if image_bytes is None:
+        current_dir = os.path.dirname(os.path.abspath(__file__)) 
+        stream_dir = os.path.abspath(os.path.join(current_dir, "..", "data","stream")) 
+        
+        # Point directly to the exact file Flutter saves
+        source_path = os.path.join(stream_dir, "current_frame.jpg")  
+        
+        if not os.path.exists(source_path):
+            return {"success": False, "error": "No camera frame available right now."}
     try:
         bucket = storage.bucket()
         blob_name = f"inspections/{serial_number}/{int(time.time())}_{component_name}.jpg"
         blob = bucket.blob(blob_name)
-        blob.upload_from_filename(source_path)
+        if image_bytes is not None:
+            blob.upload_from_string(image_bytes, content_type="image/jpeg")
+        else:
+            blob.upload_from_filename(source_path)
         # os.remove(source_path)
         
         # Make it public and return the exact URL
         blob.make_public()
         return {"success": True, "url": blob.public_url}
     except Exception as e:
-        return {"success": False, "error": str(e)}
\ No newline at end of file
+        return {"success": False, "error": str(e)}
+
+#History version stamps (invalidate cached reviewer answers)
+def bump_history_version(db, serial_number: str):
+    """Increments the serial's history version. Call after every write to its reports."""
+    try:
+        db.collection("machine_history_versions").document(serial_number).set(
+            {"version": firestore.Increment(1), "updated": firestore.SERVER_TIMESTAMP}, merge=True
+        )
+    except Exception as e:
+        # The report write itself succeeded; cached reviews of this serial expire by TTL instead
+        print(f"  ⚠  Could not bump history version for {serial_number}: {e}")
+
+def get_history_version(db, serial_number: str) -> int:
+    """Current history version of a serial (0 if its reports were never written through us)."""
+    snapshot = db.collection("machine_history_versions").document(serial_number).get()
+    return (snapshot.to_dict() or {}).get("version", 0) if snapshot.exists else 0
@@ -0,0 +1,279 @@
+"""
+Store of the latest camera frame per inspection session.
+
+`/upload-frame` (and the frame WebSocket) put the encoded JPEG here instead of writing
+app/data/stream/current_frame.jpg; the zone locator and the defect photo upload read it back.
+A put swaps in a new immutable `Frame`, so readers always see a whole frame and concurrent
+technicians never overwrite each other. The decoded image tensor is built lazily, once per
+frame, and shared by every reader.
+
+Multi-worker (FRAME_SHARED=1, on by default with SESSION_SHARED=1): a frame uploaded to one
+worker must be visible to turns served by another, so every put is also written to one file
+per session in FRAME_SHARED_DIR (tmpfs by default), through a temp file and a rename. A
+reader keeps serving its in-memory copy while the file is unchanged and re-reads it only
+when another worker has replaced it. Read timestamps are shared the same way, so frame
+pacing (tools/frame_stream.py) sees the reads of every worker.
+
+Freshness: a read only returns a frame received in the last FRAME_MAX_AGE_S seconds, so a
+defect photo or zone lookup never uses a picture of something the technician has walked
+away from; FRAME_TTL_S only bounds how long an idle session's frame is kept around.
+
+Sessions never see each other's frames. Frames uploaded without a session id are stored
+under ANONYMOUS and only read back by anonymous readers, unless FRAME_ANONYMOUS_FALLBACK=1
+(single-technician ADK Web setups, see app/data_stream.py) lets every session use them.
+
+Import it as `tools.frame_store` everywhere so main.py and the agent tools share one store.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+FRAME_TTL_S = float(os.environ.get("FRAME_TTL_S", "600"))
+FRAME_MAX_AGE_S = float(os.environ.get("FRAME_MAX_AGE_S", "15"))
+FRAME_ANONYMOUS_FALLBACK = os.environ.get("FRAME_ANONYMOUS_FALLBACK", "0") == "1"
+FRAME_STORE_MAX_SESSIONS = int(os.environ.get("FRAME_STORE_MAX_SESSIONS", "256"))
+FRAME_SHARED = os.environ.get("FRAME_SHARED", os.environ.get("SESSION_SHARED", "0")) == "1"
+FRAME_SHARED_DIR = os.environ.get(
+    "FRAME_SHARED_DIR", "/dev/shm/inspection-frames" if os.path.isdir("/dev/shm") else "app/data/stream/frames")
+SWEEP_INTERVAL_S = 60.0
+
+# Frames uploaded without a session id (older clients, ADK Web)
+ANONYMOUS = ("", "")
+
+
+def decode_jpeg(data: bytes):
+    """JPEG bytes -> float RGB tensor [3, H, W] in [0, 1], the same image lightglue's load_image gives."""
+    import cv2
+    import numpy as np
+    from lightglue.utils import numpy_image_to_torch
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Frame is not a decodable image")
+    return numpy_image_to_torch(image[..., ::-1])  # BGR -> RGB
+
+
+def _stamp(st) -> tuple:
+    # A rename installs a new inode, so this changes with every put from any worker
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class Frame:
+    """One encoded camera frame plus its lazily decoded tensor."""
+
+    def __init__(self, data: bytes, seq: int, received_at: float = None, stamp: tuple = None):
+        self.data = data
+        self.seq = seq
+        self.received_at = time.time() if received_at is None else received_at
+        self.stamp = stamp  # identity of the shared file this frame was written to / read from
+        self.read = False
+        self._tensor = None
+        self._lock = threading.Lock()
+
+    @property
+    def age_s(self) -> float:
+        return time.time() - self.received_at
+
+    def tensor(self):
+        if self._tensor is None:
+            with self._lock:
+                if self._tensor is None:
+                    self._tensor = decode_jpeg(self.data)
+        return self._tensor
+
+
+class FrameStore:
+    """
+    Latest Frame per (user_id, session_id), LRU-bounded and expired after `ttl_s`; reads only
+    see frames younger than `max_age_s`. Reads are tracked per session (`read_rate`) so frame
+    producers can be paced to them.
+    """
+
+    def __init__(self, ttl_s: float = FRAME_TTL_S, max_sessions: int = FRAME_STORE_MAX_SESSIONS,
+                 shared: bool = FRAME_SHARED, shared_dir: str = FRAME_SHARED_DIR,
+                 max_age_s: float = FRAME_MAX_AGE_S, anonymous_fallback: bool = FRAME_ANONYMOUS_FALLBACK):
+        self.ttl_s = ttl_s
+        self.max_age_s = max_age_s
+        self.anonymous_fallback = anonymous_fallback
+        self.max_sessions = max_sessions
+        self.shared = shared
+        self.shared_dir = shared_dir
+        self._frames = OrderedDict()
+        self._reads = OrderedDict()  # key -> (last read at, EWMA of the interval between reads)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._last_sweep = 0.0
+        self.received = 0
+        self.superseded = 0  # replaced by a newer frame before anyone read them
+        self.decoded = 0
+        self.stale_reads = 0  # a frame existed but was older than max_age_s
+
+    def put(self, key, data: bytes) -> Frame:
+        key = tuple(key or ANONYMOUS)
+        data = bytes(data)
+        stamp = self._write_shared(key, data) if self.shared else None
+        with self._lock:
+            self._seq += 1
+            frame = Frame(data, self._seq, stamp=stamp)
+            previous = self._frames.get(key)
+            if previous is not None and not previous.read and not self._read_since(key, previous.received_at):
+                self.superseded += 1
+            self._remember(key, frame)
+            self.received += 1
+        return frame
+
+    async def aput(self, key, data: bytes) -> Frame:
+        """`put` for async callers: the shared-mode file write and rename run in a thread."""
+        if not self.shared:
+            return self.put(key, data)
+        return await asyncio.to_thread(self.put, key, data)
+
+    def latest(self, key=ANONYMOUS):
+        """The session's latest frame, None if it has none from the last `max_age_s` seconds."""
+        key = tuple(key or ANONYMOUS)
+        candidates = (key, ANONYMOUS) if self.anonymous_fallback and key != ANONYMOUS else (key,)
+        for candidate in candidates:
+            frame = self._current(candidate)
+            if frame is None:
+                continue
+            if frame.age_s > self.max_age_s:
+                self.stale_reads += 1
+                continue
+            frame.read = True
+            self._record_read(key)
+            return frame
+        return None
+
+    def read_rate(self, key) -> tuple:
+        """(reads per second, seconds since the last read) of a session; (0.0, None) if never read."""
+        last = self._last_read(tuple(key or ANONYMOUS))
+        if last is None:
+            return 0.0, None
+        since = time.time() - last[0]
+        return (1.0 / max(last[1], since) if last[1] else 0.0), since
+
+    def tensor(self, key=ANONYMOUS):
+        """Decoded image of the latest frame (decoded at most once per frame), or None."""
+        frame = self.latest(key)
+        if frame is None:
+            return None
+        if frame._tensor is None:
+            self.decoded += 1
+        return frame.tensor()
+
+    def as_dict(self) -> dict:
+        return {"sessions": len(self._frames), "received": self.received,
+                "superseded": self.superseded, "decoded": self.decoded, "stale_reads": self.stale_reads,
+                "shared": self.shared}
+
+    # --- Internals ---
+
+    def _remember(self, key, frame: Frame):
+        self._frames[key] = frame
+        self._frames.move_to_end(key)
+        while len(self._frames) > self.max_sessions:
+            self._frames.popitem(last=False)
+
+    def _current(self, key):
+        with self._lock:
+            frame = self._frames.get(key)
+        if self.shared:
+            frame = self._refresh_shared(key, frame)
+        if frame is not None and frame.age_s > self.ttl_s:
+            with self._lock:
+                if self._frames.get(key) is frame:
+                    self._frames.pop(key, None)
+            return None
+        return frame
+
+    def _path(self, key, ext: str) -> str:
+        name = hashlib.sha1(json.dumps(list(key)).encode()).hexdigest()
+        return os.path.join(self.shared_dir, name + ext)
+
+    def _write_shared(self, key, data: bytes) -> tuple:
+        os.makedirs(self.shared_dir, exist_ok=True)
+        path = self._path(key, ".jpg")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            stamp = _stamp(os.fstat(f.fileno()))
+        os.replace(tmp, path)
+        self._maybe_sweep()
+        return stamp
+
+    def _refresh_shared(self, key, frame):
+        """The in-memory frame while the session's file is unchanged, else the file's frame."""
+        try:
+            st = os.stat(self._path(key, ".jpg"))
+        except FileNotFoundError:
+            return None
+        if frame is not None and frame.stamp == _stamp(st):
+            return frame
+        try:
+            with open(self._path(key, ".jpg"), "rb") as f:
+                data = f.read()
+                st = os.fstat(f.fileno())
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._seq += 1
+            frame = Frame(data, self._seq, received_at=st.st_mtime, stamp=_stamp(st))
+            self._remember(key, frame)
+        return frame
+
+    def _record_read(self, key):
+        now = time.time()
+        last = self._last_read(key)
+        interval = None if last is None else now - last[0]
+        if last is not None and last[1] is not None:
+            interval = 0.7 * last[1] + 0.3 * interval
+        with self._lock:
+            self._reads.pop(key, None)
+            self._reads[key] = (now, interval)
+            while len(self._reads) > self.max_sessions:
+                self._reads.popitem(last=False)
+        if self.shared:
+            try:
+                os.makedirs(self.shared_dir, exist_ok=True)
+                path = self._path(key, ".reads")
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "w") as f:
+                    json.dump([now, interval], f)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"  ⚠  Could not share frame read stats: {e}")
+
+    def _last_read(self, key):
+        if self.shared:
+            try:
+                with open(self._path(key, ".reads")) as f:
+                    return tuple(json.load(f))
+            except (OSError, ValueError):
+                return None
+        return self._reads.get(key)
+
+    def _read_since(self, key, since: float) -> bool:
+        last = self._last_read(key) if self.shared else None
+        return last is not None and last[0] >= since
+
+    def _maybe_sweep(self):
+        """Delete shared files of sessions idle for longer than the TTL."""
+        now = time.time()
+        if now - self._last_sweep < SWEEP_INTERVAL_S:
+            return
+        self._last_sweep = now
+        try:
+            for entry in os.scandir(self.shared_dir):
+                if now - entry.stat().st_mtime > self.ttl_s:
+                    os.remove(entry.path)
+        except OSError:
+            pass
+
+
+frame_store = FrameStore()
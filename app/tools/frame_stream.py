@@ -0,0 +1,130 @@
+"""
+Camera frame ingestion, both feeding the frame store:
+- the persistent `/ws/frames` stream, for the Flutter app's periodic live-camera frames;
+- `POST /upload-frame` (one multipart request per frame), for explicit photos: the response
+  is only sent once the frame is stored, so a turn sent after it always sees that photo.
+
+/ws/frames?user_id=...&session_id=... protocol:
+- client -> server: binary messages holding one or more frames, each a 4-byte big-endian
+  length followed by that many JPEG bytes (a frame may span messages).
+- server -> client: {"type": "frame_config", "fps": ..., "quality": ..., "max_bytes": ...}
+  on connect and whenever the advice changes. The rate follows how often the session's
+  frames are actually read (zone locator, defect photos): twice the read rate while frames
+  are being used, a slow idle rate otherwise.
+Only the newest frame is kept: when a message carries several frames the older ones are
+dropped unread, and a new frame replaces the previous one instead of queueing behind it.
+
+Import the shared store as `tools.frame_store`, so the router and the tools see the same frames.
+"""
+
+import os
+import struct
+import time
+
+from fastapi import APIRouter, File, Form, UploadFile, WebSocket, WebSocketDisconnect
+
+from tools.frame_store import frame_store
+
+# Idle: no more than the app's old fixed capture rate (one frame per 3 s)
+FRAME_IDLE_FPS = float(os.environ.get("FRAME_IDLE_FPS", "0.33"))
+FRAME_MAX_FPS = float(os.environ.get("FRAME_MAX_FPS", "5"))
+FRAME_ACTIVE_WINDOW_S = float(os.environ.get("FRAME_ACTIVE_WINDOW_S", "10"))
+FRAME_QUALITY_ACTIVE = int(os.environ.get("FRAME_QUALITY_ACTIVE", "85"))
+FRAME_QUALITY_IDLE = int(os.environ.get("FRAME_QUALITY_IDLE", "70"))
+FRAME_MAX_BYTES = int(os.environ.get("FRAME_MAX_BYTES", str(4 * 1024 * 1024)))
+FRAME_ADVICE_INTERVAL_S = 1.0
+
+LENGTH = struct.Struct(">I")
+
+frames_router = APIRouter()
+
+
+class FrameUnpacker:
+    """Splits a byte stream of length-prefixed frames; keeps an incomplete tail for the next feed."""
+
+    def __init__(self, max_bytes: int = FRAME_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        self._buffer += data
+        frames, offset = [], 0
+        while len(self._buffer) - offset >= LENGTH.size:
+            (size,) = LENGTH.unpack_from(self._buffer, offset)
+            if size == 0 or size > self.max_bytes:
+                raise ValueError(f"Invalid frame length {size}")
+            if len(self._buffer) - offset - LENGTH.size < size:
+                break
+            start = offset + LENGTH.size
+            frames.append(bytes(self._buffer[start:start + size]))
+            offset = start + size
+        del self._buffer[:offset]
+        return frames
+
+
+def frame_config(key) -> dict:
+    """Frame rate / JPEG quality the client should use for this session right now."""
+    rate, since_read = frame_store.read_rate(key)
+    active = since_read is not None and since_read < FRAME_ACTIVE_WINDOW_S
+    fps = min(FRAME_MAX_FPS, max(FRAME_IDLE_FPS, 2 * rate)) if active else FRAME_IDLE_FPS
+    return {"type": "frame_config", "fps": round(fps, 2),
+            "quality": FRAME_QUALITY_ACTIVE if active else FRAME_QUALITY_IDLE,
+            "max_bytes": FRAME_MAX_BYTES}
+
+
+@frames_router.post("/upload-frame")
+async def upload_frame(file: UploadFile = File(...), user_id: str = Form(""), session_id: str = Form("")):
+    """
+    Matches Flutter's http.MultipartRequest.
+    'file' matches the key used in request.files.add; user_id / session_id (optional fields)
+    select the inspection session the frame belongs to.
+    """
+    try:
+        # Kept in memory as the session's latest frame: no disk round trip, and a reader
+        # (zone locator, defect photo upload) always sees one whole frame
+        frame = await frame_store.aput((user_id, session_id), await file.read())
+        return {"status": "ok", "filename": file.filename, "seq": frame.seq}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+@frames_router.websocket("/ws/frames")
+async def frames_websocket(websocket: WebSocket):
+    await websocket.accept()
+    key = (websocket.query_params.get("user_id", ""), websocket.query_params.get("session_id", ""))
+    unpacker = FrameUnpacker()
+    received = dropped = 0
+    config = frame_config(key)
+    await websocket.send_json(config)
+    advised_at = time.monotonic()
+    print(f"📷 Frame stream connected ({key[0] or 'anonymous'}/{key[1] or '-'})")
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
+            if message.get("bytes") is None:
+                continue
+            try:
+                frames = unpacker.feed(message["bytes"])
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "message": str(e)})
+                await websocket.close(code=1003)
+                break
+            if frames:
+                received += len(frames)
+                dropped += len(frames) - 1
+                await frame_store.aput(key, frames[-1])
+
+            now = time.monotonic()
+            if now - advised_at >= FRAME_ADVICE_INTERVAL_S:
+                advised_at = now
+                advice = frame_config(key)
+                if advice != config:
+                    config = advice
+                    await websocket.send_json(config)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        print(f"📷 Frame stream closed: {received} frames, {dropped} dropped unread in transit")
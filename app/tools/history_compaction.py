@@ -0,0 +1,107 @@
+"""
+History compaction for long inspection sessions.
+
+Once the generator session's event history passes a token budget, everything but the last
+few turns is replaced by a single summary event rendered from the structured inspection
+state. The state is authoritative, so the summary loses nothing the report needs, and the
+prompt stays roughly the same size from the first component to the last.
+"""
+
+import os
+
+from google.adk.events import Event
+from google.genai import types
+
+from tools import inspection_state
+
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "4000"))
+HISTORY_KEEP_TURNS = int(os.environ.get("HISTORY_KEEP_TURNS", "4"))
+
+
+def estimate_tokens(event: Event) -> int:
+    """Rough token count (~4 characters per token) of what an event adds to the prompt."""
+    if not event.content:
+        return 0
+    return len(event.content.model_dump_json(exclude_none=True)) // 4
+
+
+def is_user_turn(event: Event) -> bool:
+    return event.author == "user" and bool(event.content and event.content.parts) \
+        and any(getattr(part, "text", None) for part in event.content.parts)
+
+
+def render_summary(state) -> str:
+    """Compact, model-readable summary of the inspection recorded so far."""
+    progress = inspection_state.progress(state)
+    header = progress["header"]
+    recorded = progress["recorded"]
+    lines = [
+        "[Earlier conversation compacted. Inspection recorded so far:]",
+        f"Serial number: {header['serial_number'] or 'not given'}; inspector: {header['inspector'] or 'not given'}"
+        + (f"; machine hours: {header['machine_hours']}" if header["machine_hours"] is not None else "") + ".",
+        f"Recorded: {recorded['GREEN']} GREEN, {recorded['YELLOW']} YELLOW, {recorded['RED']} RED.",
+    ]
+    if progress["flagged"]:
+        lines.append("Flagged: " + "; ".join(f"{key} {note}" for key, note in progress["flagged"].items()) + ".")
+    pending = inspection_state.missing_comments(state)
+    if pending:
+        lines.append("Still waiting for a comment on: " + ", ".join(pending) + ".")
+    photos = inspection_state.photo_links(state)
+    if photos:
+        lines.append("Photos attached: " + "; ".join(f"{key} {url}" for key, url in photos.items()) + ".")
+    if progress["remaining"]:
+        lines.append(f"Remaining ({progress['remaining_count']}): " + "; ".join(
+            f"{section}: {', '.join(keys)}" for section, keys in progress["remaining"].items()) + ".")
+    else:
+        lines.append("All components recorded.")
+    primary_status = state.get(f"{inspection_state.PREFIX}primary_status")
+    if primary_status:
+        lines.append(f"Primary status: {primary_status}.")
+    if state.get(f"{inspection_state.PREFIX}report_id"):
+        lines.append("The report has already been submitted.")
+    return "\n".join(lines)
+
+
+class HistoryCompactor:
+    """
+    `maybe_compact(runner, user_id, session_id)` runs before each generator turn: a cheap
+    size estimate, and only when over `budget_tokens`, a rewrite of the history through the
+    session service's `replace_history`. Cuts happen at user-turn boundaries, so tool call /
+    response pairs are never split.
+    """
+
+    def __init__(self, budget_tokens: int = HISTORY_TOKEN_BUDGET, keep_turns: int = HISTORY_KEEP_TURNS):
+        self.budget_tokens = budget_tokens
+        self.keep_turns = keep_turns
+        self.compactions = 0
+        self.events_dropped = 0
+
+    async def maybe_compact(self, runner, user_id: str, session_id: str) -> bool:
+        service = runner.session_service
+        if not self.budget_tokens or not hasattr(service, "replace_history"):
+            return False
+        session = await service.get_session(app_name=runner.app_name, user_id=user_id, session_id=session_id)
+        if session is None or sum(estimate_tokens(e) for e in session.events) <= self.budget_tokens:
+            return False
+
+        turn_starts = [i for i, event in enumerate(session.events) if is_user_turn(event)]
+        if len(turn_starts) <= self.keep_turns:
+            return False
+        upto = turn_starts[-self.keep_turns] if self.keep_turns else len(session.events)
+        if upto <= 1:
+            return False  # only a previous summary in front of the kept turns
+
+        summary = Event(
+            invocation_id=f"compaction-{Event.new_id()}",
+            author=runner.agent.name,
+            content=types.Content(role="model", parts=[types.Part(text=render_summary(session.state))]),
+        )
+        await service.replace_history(session, upto, summary)
+        self.compactions += 1
+        self.events_dropped += upto
+        print(f"🗜  Compacted {upto} events of session {session_id}")
+        return True
+
+    def as_dict(self) -> dict:
+        return {"budget_tokens": self.budget_tokens, "keep_turns": self.keep_turns,
+                "compactions": self.compactions, "events_dropped": self.events_dropped}
@@ -0,0 +1,131 @@
+"""
+Authoritative inspection report state, kept in the ADK session state.
+
+Every field is its own flat state key ("inspection.sections.GROUND.fuel_tank", ...), so each
+tool call records a tiny state delta and the model never has to carry the whole report.
+The helpers work on any mapping with get / __setitem__ (ADK's State or a plain dict).
+"""
+
+import datetime
+
+from tools.firebase_ops import GROUND_KEYS, ENGINE_KEYS, CAB_EXTERIOR_KEYS, CAB_INTERIOR_KEYS
+
+SECTIONS = {
+    "GROUND": GROUND_KEYS,
+    "ENGINE": ENGINE_KEYS,
+    "CAB_EXTERIOR": CAB_EXTERIOR_KEYS,
+    "CAB_INTERIOR": CAB_INTERIOR_KEYS,
+}
+# component key -> section (CAB_EXTERIOR "handholds" vs GROUND "steps_handholds" are distinct keys)
+COMPONENT_SECTION = {key: section for section, keys in SECTIONS.items() for key in keys}
+STATUSES = ("GREEN", "YELLOW", "RED")
+HEADER_FIELDS = ("serial_number", "inspector", "machine_hours")
+
+PREFIX = "inspection."
+
+
+def component_key(section: str, component: str) -> str:
+    return f"{PREFIX}sections.{section}.{component}"
+
+
+def header_key(field: str) -> str:
+    return f"{PREFIX}header.{field}"
+
+
+def photo_key(component: str) -> str:
+    return f"{PREFIX}photos.{component}"
+
+
+def normalize_status(status: str):
+    status = (status or "").strip().upper()
+    return status if status in STATUSES else None
+
+
+def resolve_component(component: str, section: str = ""):
+    """(section, component) for a component key, or (None, None) if it does not exist."""
+    component = (component or "").strip().lower().replace(" ", "_")
+    section = (section or "").strip().upper().replace(" ", "_")
+    if section in SECTIONS and component in SECTIONS[section]:
+        return section, component
+    if component in COMPONENT_SECTION:
+        return COMPONENT_SECTION[component], component
+    return None, None
+
+
+def set_component(state, section: str, component: str, status: str, comments: str = ""):
+    state[component_key(section, component)] = {"status": status, "comments": comments or ""}
+
+
+def get_component(state, section: str, component: str):
+    return state.get(component_key(section, component))
+
+
+def set_header(state, field: str, value):
+    state[header_key(field)] = value
+
+
+def remaining_items(state) -> dict:
+    """{section: [component, ...]} for every component not recorded yet."""
+    remaining = {}
+    for section, keys in SECTIONS.items():
+        missing = [key for key in keys if get_component(state, section, key) is None]
+        if missing:
+            remaining[section] = missing
+    return remaining
+
+
+def missing_comments(state) -> list:
+    """YELLOW/RED components still waiting for a reason."""
+    return [
+        key for section, keys in SECTIONS.items() for key in keys
+        if (item := get_component(state, section, key)) is not None
+        and item["status"] != "GREEN" and not item["comments"]
+    ]
+
+
+def progress(state) -> dict:
+    """Compact summary for the agent and for history compaction."""
+    recorded = {"GREEN": 0, "YELLOW": 0, "RED": 0}
+    flagged = {}
+    for section, keys in SECTIONS.items():
+        for key in keys:
+            item = get_component(state, section, key)
+            if item is None:
+                continue
+            recorded[item["status"]] += 1
+            if item["status"] != "GREEN":
+                flagged[key] = f"{item['status']}: {item['comments'] or '(comment needed)'}"
+    remaining = remaining_items(state)
+    return {
+        "header": {field: state.get(header_key(field)) for field in HEADER_FIELDS},
+        "recorded": recorded,
+        "flagged": flagged,
+        "remaining_count": sum(len(v) for v in remaining.values()),
+        "remaining": remaining,
+    }
+
+
+def build_report(state) -> dict:
+    """The full InspectionReport dict (same shape as before) assembled from the state."""
+    return {
+        "header": {
+            "serial_number": state.get(header_key("serial_number")),
+            "inspector": state.get(header_key("inspector")),
+            "date": str(datetime.date.today()),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "machine_hours": state.get(header_key("machine_hours")) or 0,
+        },
+        "sections": {
+            section: {
+                key: get_component(state, section, key) or {"status": "YELLOW", "comments": "DID NOT RECORD"}
+                for key in keys
+            }
+            for section, keys in SECTIONS.items()
+        },
+        "general_comments": state.get(f"{PREFIX}general_comments") or "",
+        "primary_status": state.get(f"{PREFIX}primary_status"),
+    }
+
+
+def photo_links(state) -> dict:
+    return {key: url for key in COMPONENT_SECTION if (url := state.get(photo_key(key)))}
@@ -0,0 +1,109 @@
+"""
+Lazy registry for heavy models and clients (silero VAD, Firestore, the zone locator).
+
+Nothing is loaded at import time: each component is loaded on first use, or ahead of
+time by `warm_up()` (a background task at app startup) or `load_all()` (the gunicorn
+master, before workers fork). Per-component status and load time back /readyz.
+
+Import it as `tools.registry` everywhere so the agent tools and main.py share one instance.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+
+class Component:
+    def __init__(self, name: str, loader, critical: bool = True, per_process: bool = False):
+        self.name = name
+        self.loader = loader
+        self.critical = critical
+        self.per_process = per_process  # never reuse across a fork (gRPC / DB connections)
+        self.status = "pending"
+        self.error = None
+        self.load_time_s = None
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready" and (not self.per_process or self._pid == os.getpid())
+
+    def get(self):
+        if self.ready:
+            return self._value
+        with self._lock:
+            if not self.ready:
+                self.status = "loading"
+                start = time.perf_counter()
+                try:
+                    self._value = self.loader()
+                except Exception as e:
+                    self.status, self.error = "error", str(e)
+                    print(f"  ⚠  Failed to load {self.name}: {e}")
+                    raise
+                self.load_time_s = time.perf_counter() - start
+                self._pid = os.getpid()
+                self.status, self.error = "ready", None
+                print(f"✅ {self.name} ready in {self.load_time_s:.2f}s")
+        return self._value
+
+    def as_dict(self) -> dict:
+        return {
+            "status": "ready" if self.ready else ("pending" if self.status == "ready" else self.status),
+            "critical": self.critical,
+            "load_time_s": round(self.load_time_s, 3) if self.load_time_s is not None else None,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._components = {}
+
+    def register(self, name: str, loader, critical: bool = True, per_process: bool = False):
+        self._components[name] = Component(name, loader, critical, per_process)
+
+    def get(self, name: str):
+        """Load (once) and return a component. Blocking: from async code use `aget`."""
+        return self._components[name].get()
+
+    async def aget(self, name: str):
+        component = self._components[name]
+        if component.ready:
+            return component.get()
+        return await asyncio.to_thread(component.get)
+
+    def load_all(self, include_per_process: bool = True):
+        for component in self._components.values():
+            if component.per_process and not include_per_process:
+                continue
+            try:
+                component.get()
+            except Exception:
+                pass  # reported through status()
+
+    async def warm_up(self):
+        """Load every component in the background, one at a time, without blocking requests."""
+        for component in list(self._components.values()):
+            try:
+                await asyncio.to_thread(component.get)
+            except Exception:
+                pass
+
+    @property
+    def ready(self) -> bool:
+        return all(c.ready for c in self._components.values() if c.critical)
+
+    @property
+    def degraded(self) -> list:
+        """Non-critical components that are not loaded (yet): the app serves without them."""
+        return [name for name, c in self._components.items() if not c.critical and not c.ready]
+
+    def status(self) -> dict:
+        return {name: c.as_dict() for name, c in self._components.items()}
+
+
+registry = ModelRegistry()
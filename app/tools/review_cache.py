@@ -0,0 +1,100 @@
+"""Cache of reviewer answers, keyed by the normalized question and the machine data version."""
+
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+
+REVIEW_CACHE_SIZE = int(os.environ.get("REVIEW_CACHE_SIZE", "512"))
+REVIEW_CACHE_TTL_S = float(os.environ.get("REVIEW_CACHE_TTL_S", str(24 * 3600)))
+# Tools that read a machine's history (their serial_number is a cache dependency)
+READ_TOOLS = {"fetch_machine_history", "analyze_machine_trends"}
+# Turns that call these tools change data: never cached
+WRITE_TOOLS = {"update_past_report"}
+
+
+def normalize_query(text: str) -> str:
+    """Case, punctuation and whitespace insensitive form of a reviewer question."""
+    text = re.sub(r"[^\w\s-]", " ", (text or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def names_serials(query: str, serials) -> bool:
+    """True when the (normalized) question text itself names every one of the serials."""
+    query = normalize_query(query)
+    return all(re.search(rf"(?<![\w-]){re.escape(normalize_query(serial))}(?![\w-])", query)
+               for serial in serials)
+
+
+class ReviewCache:
+    """
+    Maps a normalized question to the reviewer's answer plus the history version of every
+    serial the answer read (the READ_TOOLS calls of that turn).
+
+    Entries are shared by every user and session, so only self-contained questions are
+    cached: the question text must name each serial the answer read. "Give me an executive
+    summary" or "what about its tires?" depend on which machine the conversation is about
+    and always go to the agent.
+
+    A lookup is a hit only while each of those serials is still at the recorded version;
+    `save_inspection_report` / `update_inspection_in_db` bump the version (firebase_ops), so a
+    new or edited inspection invalidates every cached answer that depends on that machine,
+    across all workers. Answers that read no machine history are not cached.
+
+    `version_of(serial) -> int` is blocking (a Firestore read) and runs in a thread.
+    """
+
+    def __init__(self, version_of, max_entries: int = REVIEW_CACHE_SIZE, ttl_s: float = REVIEW_CACHE_TTL_S):
+        self.version_of = version_of
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()  # query -> (stored_at, answer, {serial: version})
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    async def versions(self, serials) -> dict:
+        serials = sorted(set(serials))
+        values = await asyncio.gather(*(asyncio.to_thread(self.version_of, s) for s in serials))
+        return dict(zip(serials, values))
+
+    async def get(self, query: str):
+        key = normalize_query(query)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, answer, versions = entry
+        if time.monotonic() - stored_at > self.ttl_s or await self.versions(versions) != versions:
+            self._entries.pop(key, None)
+            self.stale += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return answer
+
+    async def put(self, query: str, answer: str, tool_calls: list):
+        """Store the answer of a turn, given its [(tool name, args), ...]."""
+        if not answer or any(name in WRITE_TOOLS for name, _ in tool_calls):
+            return
+        serials = [args.get("serial_number") for name, args in tool_calls
+                   if name in READ_TOOLS and args.get("serial_number")]
+        if not serials or not names_serials(query, serials):
+            return
+        try:
+            versions = await self.versions(serials)
+        except Exception as e:
+            print(f"  ⚠  Review cache: could not read history versions: {e}")
+            return
+        key = normalize_query(query)
+        self._entries[key] = (time.monotonic(), answer, versions)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "stale": self.stale,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None}
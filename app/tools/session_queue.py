@@ -0,0 +1,213 @@
+"""Per-session serialization and request coalescing for generator turns."""
+
+import asyncio
+import contextlib
+import os
+import re
+import time
+from collections import OrderedDict, deque
+
+DEDUP_WINDOW_S = float(os.environ.get("DEDUP_WINDOW_S", "60"))
+# Without a request_id, identical text only merges with the newest entry, sent this recently
+TEXT_DEDUP_WINDOW_S = float(os.environ.get("TEXT_DEDUP_WINDOW_S", "5"))
+
+
+def fingerprint(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+
+class _Entry:
+    def __init__(self, fingerprint, work, abandoned, request_key=None):
+        self.fingerprint = fingerprint
+        self.request_key = request_key
+        self.work = work
+        self.abandoned = [abandoned] if abandoned else []
+        self.submitted_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+        self.running = False
+
+    async def is_obsolete(self) -> bool:
+        """Every caller waiting on this entry has gone away (e.g. a client retry after a timeout)."""
+        if not self.abandoned:
+            return False
+        for check in self.abandoned:
+            if not await check():
+                return False
+        return True
+
+
+class SessionWorkQueue:
+    """
+    One ordered work queue per (user_id, session_id).
+
+    - Ordering: turns of a session run one at a time, in arrival order, so session writes
+      never race. Different sessions run concurrently.
+    - Dedup: a request with the same client `request_id` as one still queued or running waits
+      for that run's result instead of starting another; results are also kept for
+      `dedup_window_s`, so a retry that arrives after the first attempt finished gets the same
+      reply. Without a `request_id`, a request only merges with the newest entry of the queue
+      when that entry has the same normalized text and arrived within `text_dedup_window_s`
+      (a double send), never with an older one: "yes", "tires good", "yes" are three turns.
+    - Obsolescence: when a newer request arrives, queued entries whose callers have all
+      disconnected are cancelled before they reach the model; an entry is checked again
+      right before it starts.
+
+    `slot(key)` takes a place in the same queue for work that cannot be coalesced
+    (streamed turns, the voice loop).
+
+    Across worker processes: with a `store` (PersistentSessionService), each entry runs under
+    the store's cross-process `turn_lock(key)`, and results of requests with a `request_id`
+    are written to the store, so a retry that lands on another worker waits for the first
+    attempt and gets its reply instead of running the turn again.
+    """
+
+    def __init__(self, dedup_window_s: float = DEDUP_WINDOW_S, max_recent: int = 1024,
+                 text_dedup_window_s: float = TEXT_DEDUP_WINDOW_S, store=None):
+        self.store = store
+        self._queues = {}   # key -> deque[_Entry]
+        self._workers = {}  # key -> worker task
+        self._recent = OrderedDict()  # (key, request_id) -> (finished_at, result)
+        self.dedup_window_s = dedup_window_s
+        self.text_dedup_window_s = text_dedup_window_s
+        self.max_recent = max_recent
+        self.submitted = 0
+        self.deduplicated = 0
+        self.cancelled_obsolete = 0
+        self.executed = 0
+
+    async def submit(self, key, text: str, work, request_id: str = "", abandoned=None):
+        """
+        Run `await work()` in the session's queue and return its result.
+        `abandoned` is an optional async () -> bool telling whether the caller has gone away.
+        """
+        self.submitted += 1
+        request_key = fingerprint(request_id) if request_id else None
+        if request_key:
+            cached = self._recent.get((key, request_key))
+            if cached and time.monotonic() - cached[0] <= self.dedup_window_s:
+                self.deduplicated += 1
+                return cached[1]
+        fp = request_key or fingerprint(text)
+
+        entry = self._find_duplicate(self._queues.get(key), fp, by_request_id=bool(request_key))
+        if entry is not None:
+            self.deduplicated += 1
+            if abandoned:
+                entry.abandoned.append(abandoned)
+        else:
+            queue = self._queues.get(key)
+            if queue:
+                await self._drop_obsolete(queue)
+            entry = _Entry(fp, work, abandoned, request_key)
+            self._enqueue(key, entry)
+
+        # shield: one caller going away must not cancel the run the others are waiting for
+        result = await asyncio.shield(entry.future)
+        if request_key:
+            self._remember((key, request_key), result)
+        return result
+
+    @contextlib.asynccontextmanager
+    async def slot(self, key):
+        """Hold the session's turn for the duration of the block."""
+        started = asyncio.Event()
+        released = asyncio.Event()
+
+        async def hold():
+            started.set()
+            await released.wait()
+
+        entry = _Entry(None, hold, None)
+        self._enqueue(key, entry)
+        try:
+            await started.wait()
+            yield
+        finally:
+            released.set()
+            if not entry.running:
+                entry.future.cancel()
+
+    def _find_duplicate(self, queue, fp: str, by_request_id: bool):
+        if not queue:
+            return None
+        if by_request_id:
+            return next((e for e in queue if e.fingerprint == fp and not e.future.done()), None)
+        newest = queue[-1]
+        if (newest.fingerprint == fp and not newest.future.done()
+                and time.monotonic() - newest.submitted_at <= self.text_dedup_window_s):
+            return newest
+        return None
+
+    def _enqueue(self, key, entry: _Entry):
+        # Looked up again here (no await since): the worker drops a drained queue, and an entry
+        # must never land on a deque no worker will run
+        queue = self._queues.setdefault(key, deque())
+        queue.append(entry)
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._run(key, queue))
+
+    async def _drop_obsolete(self, queue):
+        for entry in list(queue):
+            if not entry.running and not entry.future.done() and await entry.is_obsolete():
+                entry.future.cancel()
+                self.cancelled_obsolete += 1
+
+    async def _run(self, key, queue):
+        try:
+            while queue:
+                entry = queue[0]
+                if entry.future.done():
+                    queue.popleft()
+                    continue
+                if await entry.is_obsolete():
+                    entry.future.cancel()
+                    self.cancelled_obsolete += 1
+                    queue.popleft()
+                    continue
+                entry.running = True
+                try:
+                    result = await self._execute(key, entry)
+                except Exception as e:
+                    if not entry.future.done():
+                        entry.future.set_exception(e)
+                else:
+                    if not entry.future.done():
+                        entry.future.set_result(result)
+                finally:
+                    self.executed += 1
+                    queue.popleft()
+        finally:
+            self._workers.pop(key, None)
+            if not queue and self._queues.get(key) is queue:
+                self._queues.pop(key, None)
+
+    async def _execute(self, key, entry: _Entry):
+        if self.store is None:
+            return await entry.work()
+        async with self.store.turn_lock(key):
+            if entry.request_key:
+                # The same request may have run on another worker while this one waited
+                stored = await self.store.get_request_result(key, entry.request_key, self.dedup_window_s)
+                if stored is not None:
+                    self.deduplicated += 1
+                    return stored
+            result = await entry.work()
+            if entry.request_key:
+                await self.store.put_request_result(key, entry.request_key, result)
+            return result
+
+    def _remember(self, recent_key, result):
+        self._recent[recent_key] = (time.monotonic(), result)
+        self._recent.move_to_end(recent_key)
+        while len(self._recent) > self.max_recent:
+            self._recent.popitem(last=False)
+
+    def as_dict(self) -> dict:
+        return {
+            "active_sessions": len(self._workers),
+            "queued": sum(len(q) for q in self._queues.values()),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "cancelled_obsolete": self.cancelled_obsolete,
+            "executed": self.executed,
+        }
@@ -0,0 +1,399 @@
+"""SQLite-backed ADK session service with an in-memory LRU hot tier."""
+
+import asyncio
+import contextlib
+import copy
+import fcntl
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import (
+    BaseSessionService, GetSessionConfig, ListSessionsResponse,
+)
+
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "app/data/sessions.db")
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "256"))
+SESSION_TTL_HOURS = float(os.environ.get("SESSION_TTL_HOURS", "48"))
+# Set when several worker processes share the DB file (see app/gunicorn_conf.py)
+SESSION_SHARED = os.environ.get("SESSION_SHARED", "0") == "1"
+# How long a write waits for another worker's transaction before failing (off the event loop)
+SESSION_DB_BUSY_TIMEOUT_S = float(os.environ.get("SESSION_DB_BUSY_TIMEOUT_S", "2"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name    TEXT NOT NULL,
+    user_id     TEXT NOT NULL,
+    id          TEXT NOT NULL,
+    state       TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name   TEXT NOT NULL,
+    user_id    TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    event      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, seq);
+CREATE INDEX IF NOT EXISTS sessions_by_update ON sessions (update_time);
+CREATE TABLE IF NOT EXISTS request_results (
+    turn_key    TEXT NOT NULL,
+    request_id  TEXT NOT NULL,
+    result      TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (turn_key, request_id)
+);
+"""
+REQUEST_RESULT_TTL_S = 3600.0
+
+
+class PersistentSessionService(BaseSessionService):
+    """
+    Drop-in replacement for InMemorySessionService that survives restarts.
+
+    - Storage: one embedded SQLite file (WAL mode). Events are only ever appended; a
+      session's state is its initial state plus the folded `state_delta`s of its events.
+    - Hot tier: the `cache_size` most recently used sessions stay in memory (LRU), so
+      resident memory is bounded no matter how many inspections a day brings.
+    - TTL: sessions untouched for `ttl_hours` are deleted (checked on a timer, not per call).
+
+    "temp:" state keys are never persisted. "app:" / "user:" keys are kept in the session
+    state like any other key. Every SQLite call runs in a worker thread (`asyncio.to_thread`)
+    under a lock: usually sub-millisecond, but with several workers a write can wait on
+    another process's transaction (up to SESSION_DB_BUSY_TIMEOUT_S), and that wait must never
+    stall the event loop. The hot tier itself is only touched on the event loop.
+
+    Multi-worker: the connection is opened lazily per process (safe to create before a
+    fork), and with `shared=True` a hot session is re-read whenever another worker has
+    appended to it since it was cached. `turn_lock(key)` serializes the turns of a session
+    across worker processes and `get_request_result` / `put_request_result` let a client
+    retry landing on another worker reuse the first attempt's reply (tools/session_queue.py).
+    """
+
+    def __init__(self, db_path: str = SESSION_DB_PATH, cache_size: int = SESSION_CACHE_SIZE,
+                 ttl_hours: float = SESSION_TTL_HOURS, sweep_interval_s: float = 600.0,
+                 shared: bool = SESSION_SHARED):
+        self.db_path = db_path
+        self.shared = shared
+        self._conn = None
+        self._conn_pid = None
+        self._lock_fd = None
+        self._lock_fd_pid = None
+        self._byte_locks = {}  # lock-file offset -> [asyncio.Lock, number of holders and waiters]
+        self._lock = threading.Lock()
+        self._hot = OrderedDict()  # (app_name, user_id, session_id) -> Session
+        self.cache_size = cache_size
+        self.ttl_s = ttl_hours * 3600
+        self.sweep_interval_s = sweep_interval_s
+        self._last_sweep = 0.0
+
+    # --- BaseSessionService API ---
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        await self._maybe_sweep()
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        now = time.time()
+        state = {k: v for k, v in (state or {}).items() if not k.startswith("temp:")}
+
+        def write():
+            with self._lock, self._transaction():
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                    (app_name, user_id, session_id, json.dumps(state, default=str), now, now))
+                self._db.execute(
+                    "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (app_name, user_id, session_id))
+        await asyncio.to_thread(write)
+        session = Session(id=session_id, app_name=app_name, user_id=user_id, state=state,
+                          events=[], last_update_time=now)
+        self._remember(session)
+        return session
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        await self._maybe_sweep()
+        key = (app_name, user_id, session_id)
+        session = self._hot.get(key)
+        if session is not None and self.shared and await asyncio.to_thread(self._is_stale, session):
+            if self._hot.get(key) is session:
+                self._hot.pop(key, None)
+            session = None
+        if session is not None:
+            self._hot.move_to_end(key)
+        else:
+            session = await asyncio.to_thread(self._load, app_name, user_id, session_id)
+            if session is None:
+                return None
+            self._remember(session)
+
+        if config is None:
+            return session
+        events = session.events
+        if config.after_timestamp:
+            events = [e for e in events if e.timestamp >= config.after_timestamp]
+        if config.num_recent_events:
+            events = events[-config.num_recent_events:]
+        return session.model_copy(update={"events": list(events), "state": copy.deepcopy(session.state)})
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        query = "SELECT user_id, id, state, update_time FROM sessions WHERE app_name = ?"
+        args = [app_name]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            args.append(user_id)
+        def read():
+            with self._lock:
+                return self._db.execute(query, args).fetchall()
+        rows = await asyncio.to_thread(read)
+        return ListSessionsResponse(sessions=[
+            Session(id=sid, app_name=app_name, user_id=uid, state=json.loads(state), events=[],
+                    last_update_time=updated)
+            for uid, sid, state, updated in rows
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._hot.pop((app_name, user_id, session_id), None)
+
+        def write():
+            with self._lock, self._transaction():
+                self._delete_rows([(app_name, user_id, session_id)])
+        await asyncio.to_thread(write)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        # Keep the hot copy in sync when the caller holds a filtered copy (GetSessionConfig)
+        key = (session.app_name, session.user_id, session.id)
+        hot = self._hot.get(key)
+        if hot is not None and hot is not session:
+            hot.events.append(event)
+            self._apply_delta(hot.state, event)
+            hot.last_update_time = event.timestamp
+
+        raw = event.model_dump_json(exclude_none=True)
+
+        def write():
+            with self._lock, self._transaction():
+                self._db.execute(
+                    "INSERT INTO events (app_name, user_id, session_id, event) VALUES (?, ?, ?, ?)",
+                    (*key, raw))
+                self._db.execute(
+                    "UPDATE sessions SET update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (event.timestamp, *key))
+        await asyncio.to_thread(write)
+        return event
+
+    async def replace_history(self, session: Session, upto: int, summary: Event) -> None:
+        """
+        Replace `session.events[:upto]` with one `summary` event (history compaction).
+        The session state is folded into the session row first, so nothing recorded by the
+        dropped events' state deltas is lost.
+        """
+        if upto <= 0:
+            return
+        key = (session.app_name, session.user_id, session.id)
+        session = self._hot.get(key, session)
+        dropped = session.events[:upto]
+        summary.timestamp = dropped[-1].timestamp
+        state = {k: v for k, v in session.state.items() if not k.startswith("temp:")}
+        now = time.time()
+        raw = summary.model_dump_json(exclude_none=True)
+
+        def write():
+            with self._lock, self._transaction():
+                seqs = [seq for (seq,) in self._db.execute(
+                    "SELECT seq FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq LIMIT ?",
+                    (*key, upto)).fetchall()]
+                if seqs:
+                    self._db.execute(
+                        "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND seq <= ?",
+                        (*key, seqs[-1]))
+                    # Reuse the last dropped seq so the summary keeps its place before the kept events
+                    self._db.execute(
+                        "INSERT INTO events (seq, app_name, user_id, session_id, event) VALUES (?, ?, ?, ?, ?)",
+                        (seqs[-1], *key, raw))
+                self._db.execute(
+                    "UPDATE sessions SET state = ?, update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (json.dumps(state, default=str), now, *key))
+        await asyncio.to_thread(write)
+        session.events[:upto] = [summary]
+        session.last_update_time = now
+
+    # --- Cross-worker turn serialization ---
+
+    @contextlib.asynccontextmanager
+    async def turn_lock(self, key):
+        """
+        Exclusive per-session lock shared by every worker process (shared=True only): a POSIX
+        record lock on one byte of `<db>.locks`, picked by a hash of the key. The kernel drops
+        it if the worker dies, so a crash can never leave a session locked.
+
+        Record locks belong to the process: a second lockf on a byte the worker already holds
+        succeeds at once, and keys whose hashes collide share a byte. So the byte is only taken
+        under an in-process asyncio.Lock for that offset, which queues every turn of the worker
+        that maps to it. The lock file descriptor is opened once per process and never closed
+        (closing any descriptor of the file would release every lock the process holds on it).
+        """
+        if not self.shared:
+            yield
+            return
+        offset = int.from_bytes(hashlib.sha1(json.dumps(list(key)).encode()).digest()[:6], "big")
+        entry = self._byte_locks.setdefault(offset, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                fd = self._lock_file
+                delay = 0.005
+                while True:
+                    try:
+                        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, offset)
+                        break
+                    except OSError:
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, 0.1)
+                try:
+                    yield
+                finally:
+                    fcntl.lockf(fd, fcntl.LOCK_UN, 1, offset)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._byte_locks[offset]
+
+    @property
+    def _lock_file(self) -> int:
+        if self._lock_fd is None or self._lock_fd_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._lock_fd = os.open(f"{self.db_path}.locks", os.O_RDWR | os.O_CREAT, 0o600)
+            self._lock_fd_pid = os.getpid()
+        return self._lock_fd
+
+    async def get_request_result(self, key, request_id: str, max_age_s: float):
+        """The stored reply of a finished turn with this request_id, or None."""
+        def read():
+            with self._lock:
+                return self._db.execute(
+                    "SELECT result, finished_at FROM request_results WHERE turn_key = ? AND request_id = ?",
+                    (json.dumps(list(key)), request_id)).fetchone()
+        row = await asyncio.to_thread(read)
+        if row is None or time.time() - row[1] > max_age_s:
+            return None
+        return json.loads(row[0])
+
+    async def put_request_result(self, key, request_id: str, result) -> None:
+        def write():
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO request_results VALUES (?, ?, ?, ?)",
+                    (json.dumps(list(key)), request_id, json.dumps(result, default=str), time.time()))
+        await asyncio.to_thread(write)
+
+    # --- Internals ---
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                                   timeout=SESSION_DB_BUSY_TIMEOUT_S)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def _is_stale(self, session: Session) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                (session.app_name, session.user_id, session.id)).fetchone()
+        return row is None or row[0] > session.last_update_time
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    @staticmethod
+    def _apply_delta(state: dict, event: Event):
+        if event.actions and event.actions.state_delta:
+            for k, v in event.actions.state_delta.items():
+                if not k.startswith("temp:"):
+                    state[k] = v
+
+    def _remember(self, session: Session):
+        key = (session.app_name, session.user_id, session.id)
+        self._hot[key] = session
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.cache_size:
+            self._hot.popitem(last=False)
+
+    def _load(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                (app_name, user_id, session_id)).fetchone()
+            if row is None:
+                return None
+            rows = self._db.execute(
+                "SELECT event FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq",
+                (app_name, user_id, session_id)).fetchall()
+        state = json.loads(row[0])
+        events = []
+        for (raw,) in rows:
+            event = Event.model_validate_json(raw)
+            self._apply_delta(state, event)
+            events.append(event)
+        return Session(id=session_id, app_name=app_name, user_id=user_id, state=state,
+                       events=events, last_update_time=row[1])
+
+    def _delete_rows(self, keys):
+        for app_name, user_id, session_id in keys:
+            self._db.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                             (app_name, user_id, session_id))
+            self._db.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                             (app_name, user_id, session_id))
+
+    async def _maybe_sweep(self):
+        now = time.time()
+        if not self.ttl_s or now - self._last_sweep < self.sweep_interval_s:
+            return
+        self._last_sweep = now
+        cutoff = now - self.ttl_s
+
+        def sweep():
+            with self._lock, self._transaction():
+                expired = self._db.execute(
+                    "SELECT app_name, user_id, id FROM sessions WHERE update_time < ?", (cutoff,)).fetchall()
+                self._delete_rows(expired)
+                self._db.execute("DELETE FROM request_results WHERE finished_at < ?", (now - REQUEST_RESULT_TTL_S,))
+            return expired
+        try:
+            expired = await asyncio.to_thread(sweep)
+        except sqlite3.OperationalError as e:
+            print(f"  ⚠  Session sweep skipped: {e}")  # busy: another worker sweeps or writes
+            return
+        for key in expired:
+            self._hot.pop(tuple(key), None)
+        if expired:
+            print(f"🧹 Evicted {len(expired)} stale sessions")
@@ -0,0 +1,292 @@
+"""Speech-to-text backends and streaming helpers for the voice WebSocket endpoints."""
+
+import asyncio
+import contextlib
+import io
+import os
+import time
+import wave
+
+from google.genai import types
+
+try:
+    import soundfile as sf
+except ImportError:
+    sf = None
+
+STT_PROMPT = "Please accurately transcribe this audio. Reply ONLY with the exact transcript."
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2
+
+
+def pcm_to_wav_bytes(pcm_bytes, sample_rate=SAMPLE_RATE) -> bytes:
+    """Wrap raw mono 16-bit PCM bytes into a WAV container."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav_file:
+        wav_file.setnchannels(1)  # Mono
+        wav_file.setsampwidth(BYTES_PER_SAMPLE)  # 16-bit
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(bytes(pcm_bytes))
+    return buf.getvalue()
+
+
+def audio_seconds(audio_bytes: bytes, mime_type: str = "audio/wav") -> float:
+    """Best-effort duration of an audio payload (exact for WAV/FLAC, PCM-equivalent otherwise)."""
+    if mime_type == "audio/wav":
+        try:
+            with wave.open(io.BytesIO(audio_bytes), "rb") as wav_file:
+                return wav_file.getnframes() / float(wav_file.getframerate())
+        except (wave.Error, EOFError):
+            pass
+    elif sf is not None:
+        try:
+            return sf.info(io.BytesIO(audio_bytes)).duration
+        except RuntimeError:
+            pass
+    return len(audio_bytes) / float(SAMPLE_RATE * BYTES_PER_SAMPLE)
+
+
+# --- BACKENDS ---
+
+class STTBackend:
+    """
+    Pluggable speech-to-text interface.
+    Implementations return the plain transcript, or "" when nothing could be recognised.
+    """
+    name = "base"
+    admission = None  # optional AdmissionController (tools/admission.py) gating each request
+
+    async def transcribe(self, audio_bytes: bytes, mime_type: str = "audio/wav") -> str:
+        raise NotImplementedError
+
+    def admitted(self):
+        return self.admission.admit() if self.admission is not None else contextlib.nullcontext()
+
+
+class GeminiSTTBackend(STTBackend):
+    """Transcribes audio with a Gemini model through the google-genai client."""
+    name = "gemini"
+
+    def __init__(self, client, model: str = "gemini-2.5-flash", prompt: str = STT_PROMPT):
+        self.client = client
+        self.model = model
+        self.prompt = prompt
+
+    async def transcribe(self, audio_bytes: bytes, mime_type: str = "audio/wav") -> str:
+        # Overloaded (load shedding) propagates; model errors degrade to an empty transcript
+        async with self.admitted():
+            try:
+                # Native async client: no worker thread held for the length of the request
+                response = await self.client.aio.models.generate_content(
+                    model=self.model,
+                    contents=[self.prompt, types.Part.from_bytes(data=audio_bytes, mime_type=mime_type)]
+                )
+                return (response.text or "").strip()
+            except Exception as e:
+                print(f"  ⚠  Gemini STT error: {e}")
+                return ""
+
+
+class LocalSTTBackend(STTBackend):
+    """
+    Offline stand-in for tests and latency benchmarks.
+    Sleeps for a fixed round trip, a cost per second of audio and (optionally) the
+    upload time at `upload_kbps`, then returns `text` formatted with the audio
+    duration (e.g. "local transcript 2.4s").
+    """
+    name = "local"
+
+    def __init__(self, text: str = "local transcript {seconds:.1f}s",
+                 base_latency_s: float = 0.3, per_audio_second_s: float = 0.05,
+                 upload_kbps: float = 0.0):
+        self.text = text
+        self.base_latency_s = base_latency_s
+        self.per_audio_second_s = per_audio_second_s
+        self.upload_kbps = upload_kbps
+        self.calls = 0
+        self.bytes_received = 0
+
+    async def transcribe(self, audio_bytes: bytes, mime_type: str = "audio/wav") -> str:
+        seconds = audio_seconds(audio_bytes, mime_type)
+        self.calls += 1
+        self.bytes_received += len(audio_bytes)
+        upload_s = len(audio_bytes) * 8 / 1000.0 / self.upload_kbps if self.upload_kbps else 0.0
+        async with self.admitted():
+            await asyncio.sleep(self.base_latency_s + self.per_audio_second_s * seconds + upload_s)
+        return self.text.format(seconds=seconds)
+
+
+def make_stt_backend(client=None, admission=None) -> STTBackend:
+    """Select the STT backend from the STT_BACKEND env var ("gemini" by default, or "local")."""
+    kind = os.environ.get("STT_BACKEND", "gemini").lower()
+    if kind == "local":
+        backend = LocalSTTBackend(
+            base_latency_s=float(os.environ.get("LOCAL_STT_LATENCY_S", "0.3")),
+            upload_kbps=float(os.environ.get("LOCAL_STT_UPLOAD_KBPS", "0")),
+        )
+    elif client is None:
+        raise ValueError("GeminiSTTBackend needs a genai client")
+    else:
+        backend = GeminiSTTBackend(client, model=os.environ.get("STT_MODEL", "gemini-2.5-flash"))
+    backend.admission = admission
+    return backend
+
+
+# --- SEGMENTED TRANSCRIPTION ---
+
+STT_MAX_PARALLEL = int(os.environ.get("STT_MAX_PARALLEL", "4"))
+
+
+async def transcribe_segments(backend: STTBackend, segments: list, on_segment=None,
+                              max_parallel: int = STT_MAX_PARALLEL) -> str:
+    """
+    Transcribe [(audio, mime type), ...] concurrently (at most `max_parallel` requests in
+    flight) and join the results in order. `on_segment(index, text)` is awaited for each
+    segment as soon as it and every segment before it are done.
+    """
+    semaphore = asyncio.Semaphore(max_parallel)
+
+    async def run(audio, mime_type):
+        async with semaphore:
+            return await backend.transcribe(audio, mime_type=mime_type)
+
+    tasks = [asyncio.create_task(run(audio, mime_type)) for audio, mime_type in segments]
+    texts = []
+    try:
+        for index, task in enumerate(tasks):
+            text = await task
+            texts.append(text)
+            if on_segment is not None and text:
+                await on_segment(index, text)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return " ".join(text for text in texts if text)
+
+
+# --- STREAMING PARTIALS ---
+
+class PartialTranscriber:
+    """
+    Emits interim transcripts of a growing utterance while the technician is still talking.
+
+    Call `maybe_emit(buffer)` after every audio chunk: once `interval_s` has passed since the
+    last partial (and no partial is in flight) it snapshots the buffer and transcribes it in the
+    background, sending {"type": "partial", ...}. Call `close()` before sending the final
+    transcript so no stale partial can arrive after it.
+    """
+
+    def __init__(self, transcribe_pcm, send_json, interval_s: float = 1.5, min_audio_s: float = 0.5):
+        self.transcribe_pcm = transcribe_pcm  # async (pcm bytes) -> str
+        self.send_json = send_json
+        self.interval_s = interval_s
+        self.min_bytes = int(min_audio_s * SAMPLE_RATE * BYTES_PER_SAMPLE)
+        self.seq = 0
+        self._last_emit = 0.0
+        self._task = None
+
+    def reset(self):
+        self.seq = 0
+        self._last_emit = time.monotonic()
+
+    def maybe_emit(self, buffer):
+        if self._task is not None and not self._task.done():
+            return
+        if len(buffer) < self.min_bytes:
+            return
+        now = time.monotonic()
+        if now - self._last_emit < self.interval_s:
+            return
+        self._last_emit = now
+        self.seq += 1
+        self._task = asyncio.create_task(self._emit(bytes(buffer), self.seq))
+
+    async def _emit(self, pcm: bytes, seq: int):
+        try:
+            text = await self.transcribe_pcm(pcm)
+        except Exception:
+            return  # partials are best effort (e.g. shed under load): the final transcript still comes
+        if text:
+            await self.send_json({"type": "partial", "text": text, "seq": seq, "status": "recording"})
+
+    async def close(self):
+        """Cancel any in-flight partial so the final transcript is always the last word."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+# --- SPECULATIVE TRANSCRIPTION ---
+
+class SpeculationStats:
+    """Process-wide counters for speculative STT (exposed on /metrics)."""
+
+    def __init__(self):
+        self.started = 0
+        self.hits = 0           # speculative result handed over as the final transcript
+        self.misses = 0         # speech resumed, speculative request cancelled
+        self.head_start_s = 0.0  # total time the STT request ran before silence was confirmed
+
+    def as_dict(self) -> dict:
+        decided = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / decided, 3) if decided else None,
+            "miss_rate": round(self.misses / decided, 3) if decided else None,
+            "avg_head_start_ms": round(1000 * self.head_start_s / self.hits, 1) if self.hits else None,
+        }
+
+
+speculation_stats = SpeculationStats()
+
+
+class SpeculativeTranscriber:
+    """
+    Starts the STT request at the VAD's probable end of speech ("pause"), before the
+    silence is confirmed. `cancel()` it when speech resumes; `take()` the running
+    result once the VAD confirms "end".
+    """
+
+    def __init__(self, transcribe_pcm, stats: SpeculationStats = speculation_stats):
+        self.transcribe_pcm = transcribe_pcm  # async (pcm bytes) -> str
+        self.stats = stats
+        self._task = None
+        self._started_at = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self._task is not None
+
+    def start(self, buffer):
+        if self._task is not None:
+            self._task.cancel()
+        self.stats.started += 1
+        self._started_at = time.monotonic()
+        self._task = asyncio.create_task(self.transcribe_pcm(bytes(buffer)))
+
+    async def cancel(self, miss: bool = True):
+        task, self._task = self._task, None
+        if task is None:
+            return
+        if miss:
+            self.stats.misses += 1
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    async def take(self):
+        """Hand over the speculative transcript, or None if no speculation is running."""
+        task, self._task = self._task, None
+        if task is None:
+            return None
+        self.stats.hits += 1
+        self.stats.head_start_s += time.monotonic() - self._started_at
+        return await task
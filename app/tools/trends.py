@@ -0,0 +1,152 @@
+"""
+Deterministic trend analysis over a machine's inspection history.
+
+The history becomes a components x time status matrix (GREEN=0, YELLOW=1, RED=2) and every
+statistic is a NumPy operation over that matrix, so years of reports cost the same handful
+of array passes. The reviewer agent gets a compact summary instead of raw report JSON.
+"""
+
+import datetime
+import re
+
+import numpy as np
+
+from tools.inspection_state import COMPONENT_SECTION
+
+STATUS_CODES = {"GREEN": 0, "YELLOW": 1, "RED": 2}
+STATUS_NAMES = np.array(["GREEN", "YELLOW", "RED"])
+MISSING = -1
+# Placeholder the report builder fills in for components the technician never covered
+NOT_RECORDED_COMMENT = "DID NOT RECORD"
+_NUMBER = re.compile(r"[-+]?\d+(?:\.\d+)?")
+COMPONENTS = list(COMPONENT_SECTION)
+
+
+def _epoch_s(timestamp) -> float:
+    if isinstance(timestamp, datetime.datetime):
+        return timestamp.timestamp()
+    try:
+        return datetime.datetime.fromisoformat(str(timestamp)).timestamp()
+    except ValueError:
+        return np.nan
+
+
+def _hours(value) -> float:
+    """Machine hours as a float ("1,200 hrs" -> 1200.0), NaN if missing or unparseable."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value or "").replace(",", ""))
+    return float(match.group()) if match else np.nan
+
+
+def status_matrix(reports: list):
+    """
+    (matrix int8 [components x reports], epoch seconds [reports], machine hours [reports])
+    for report dicts sorted oldest first. Components not recorded in a report, including the
+    "DID NOT RECORD" placeholders, are MISSING.
+    """
+    row = {key: i for i, key in enumerate(COMPONENTS)}
+    matrix = np.full((len(COMPONENTS), len(reports)), MISSING, dtype=np.int8)
+    times = np.empty(len(reports))
+    hours = np.empty(len(reports))
+    for t, report in enumerate(reports):
+        header = report.get("header") or {}
+        times[t] = _epoch_s(header.get("timestamp"))
+        hours[t] = _hours(header.get("machine_hours"))
+        for section in (report.get("sections") or {}).values():
+            for key, item in (section or {}).items():
+                item = item if isinstance(item, dict) else {}
+                if item.get("comments") == NOT_RECORDED_COMMENT:
+                    continue
+                code = STATUS_CODES.get(item.get("status"))
+                if code is not None and key in row:
+                    matrix[row[key], t] = code
+    return matrix, times, hours
+
+
+def _forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """Carry the last recorded status over MISSING cells (leading MISSING stays MISSING)."""
+    t = np.arange(matrix.shape[1])
+    last_valid = np.maximum.accumulate(np.where(matrix != MISSING, t, 0), axis=1)
+    return np.take_along_axis(matrix, last_valid, axis=1)
+
+
+def _last_index(mask: np.ndarray) -> np.ndarray:
+    """Per row, the last column where mask is True, or -1."""
+    reversed_hit = mask[:, ::-1].argmax(axis=1)
+    return np.where(mask.any(axis=1), mask.shape[1] - 1 - reversed_hit, -1)
+
+
+def analyze_history(reports: list, component: str = "") -> dict:
+    """
+    Compact trend summary of a machine's history (report dicts, any order):
+    per component that was ever YELLOW/RED: current status, degradation / improvement
+    transitions, current streak length, days in the current state, machine hours since the
+    last GREEN and the share of non-GREEN inspections.
+    """
+    reports = sorted(reports, key=lambda r: _epoch_s((r.get("header") or {}).get("timestamp")))
+    if not reports:
+        return {"reports": 0}
+    matrix, times, hours = status_matrix(reports)
+    filled = _forward_fill(matrix)
+    n = matrix.shape[1]
+
+    recorded = matrix != MISSING
+    steps = np.diff(filled.astype(np.int16), axis=1)
+    valid_steps = (filled[:, 1:] != MISSING) & (filled[:, :-1] != MISSING)
+    degradations = ((steps > 0) & valid_steps).sum(axis=1)
+    improvements = ((steps < 0) & valid_steps).sum(axis=1)
+
+    current = filled[:, -1]
+    streak_start = _last_index(filled != current[:, None]) + 1  # first report of the current run
+    streak = n - streak_start
+    last_green = _last_index(filled == STATUS_CODES["GREEN"])
+    last_change = _last_index(np.pad((steps != 0) & valid_steps, ((0, 0), (1, 0))))
+
+    days_in_state = (times[-1] - times[streak_start]) / 86400.0
+    hours_since_green = np.where(last_green >= 0, hours[-1] - hours[np.maximum(last_green, 0)], np.nan)
+    non_green = ((matrix > 0) & recorded).sum(axis=1)
+    non_green_share = non_green / np.maximum(recorded.sum(axis=1), 1)
+    # Trend is the direction of the most recent change
+    recent_step = np.take_along_axis(np.pad(steps, ((0, 0), (1, 0))), np.maximum(last_change, 0)[:, None], axis=1)[:, 0]
+    trend = np.where(last_change < 0, "stable", np.where(recent_step > 0, "degrading", "improving"))
+
+    latest_sections = reports[-1].get("sections") or {}
+    latest_comments = {key: item.get("comments") for section in latest_sections.values()
+                       for key, item in (section or {}).items() if isinstance(item, dict)}
+
+    rows = np.flatnonzero(non_green > 0)
+    if component:
+        rows = [COMPONENTS.index(component)] if component in COMPONENTS else []
+    components = {}
+    for i in rows:
+        key = COMPONENTS[i]
+        entry = {
+            "status": str(STATUS_NAMES[current[i]]) if current[i] != MISSING else "NOT RECORDED",
+            "streak": int(streak[i]),
+            "days_in_state": round(float(days_in_state[i]), 1) if np.isfinite(days_in_state[i]) else None,
+            "hours_since_green": float(hours_since_green[i]) if np.isfinite(hours_since_green[i]) else None,
+            "degradations": int(degradations[i]),
+            "improvements": int(improvements[i]),
+            "non_green_share": round(float(non_green_share[i]), 2),
+            "trend": str(trend[i]),
+        }
+        if current[i] > 0 and latest_comments.get(key) not in (None, "", NOT_RECORDED_COMMENT):
+            entry["latest_comment"] = latest_comments[key]
+        if last_green[i] < 0:
+            entry["never_green"] = True
+        components[key] = entry
+
+    newly_degraded = [COMPONENTS[i] for i in np.flatnonzero((steps[:, -1] > 0) & valid_steps[:, -1])] if n > 1 else []
+    counts = np.bincount(current[current != MISSING], minlength=3)
+    return {
+        "reports": n,
+        "from": (reports[0].get("header") or {}).get("timestamp"),
+        "to": (reports[-1].get("header") or {}).get("timestamp"),
+        "machine_hours": {"first": None if np.isnan(hours[0]) else float(hours[0]),
+                          "latest": None if np.isnan(hours[-1]) else float(hours[-1])},
+        "current": {"GREEN": int(counts[0]), "YELLOW": int(counts[1]), "RED": int(counts[2])},
+        "newly_degraded": newly_degraded,
+        "always_green": int(((non_green == 0) & recorded.any(axis=1)).sum()),
+        "components": components,
+    }
@@ -0,0 +1,100 @@
+"""Text-to-speech backends and sentence chunking for spoken agent replies."""
+
+import contextlib
+import os
+import re
+
+from google.genai import types
+
+
+class TTSBackend:
+    """
+    Pluggable text-to-speech interface.
+    `synthesize()` returns (audio bytes, mime type), or (b"", None) when nothing was produced.
+    """
+    name = "base"
+    admission = None  # optional AdmissionController (tools/admission.py) gating each request
+
+    async def synthesize(self, text: str):
+        raise NotImplementedError
+
+    def admitted(self):
+        return self.admission.admit() if self.admission is not None else contextlib.nullcontext()
+
+
+class NullTTSBackend(TTSBackend):
+    """No server-side audio: the Flutter client speaks the streamed text itself (flutter_tts)."""
+    name = "none"
+
+    async def synthesize(self, text: str):
+        return b"", None
+
+
+class GeminiTTSBackend(TTSBackend):
+    """Speech synthesis with a Gemini TTS model (24 kHz mono 16-bit PCM)."""
+    name = "gemini"
+
+    def __init__(self, client, model: str = "gemini-2.5-flash-preview-tts", voice: str = "Kore"):
+        self.client = client
+        self.model = model
+        self.voice = voice
+
+    async def synthesize(self, text: str):
+        async with self.admitted():
+            try:
+                response = await self.client.aio.models.generate_content(
+                    model=self.model,
+                    contents=text,
+                    config=types.GenerateContentConfig(
+                        response_modalities=["AUDIO"],
+                        speech_config=types.SpeechConfig(
+                            voice_config=types.VoiceConfig(
+                                prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name=self.voice)
+                            )
+                        ),
+                    ),
+                )
+                return response.candidates[0].content.parts[0].inline_data.data, "audio/L16;rate=24000"
+            except Exception as e:
+                print(f"  ⚠  Gemini TTS error: {e}")
+                return b"", None
+
+
+def make_tts_backend(client=None, admission=None) -> TTSBackend:
+    """Select the TTS backend from the TTS_BACKEND env var ("gemini" by default, or "none")."""
+    kind = os.environ.get("TTS_BACKEND", "gemini").lower()
+    if kind == "none" or client is None:
+        return NullTTSBackend()
+    backend = GeminiTTSBackend(client, model=os.environ.get("TTS_MODEL", "gemini-2.5-flash-preview-tts"),
+                               voice=os.environ.get("TTS_VOICE", "Kore"))
+    backend.admission = admission
+    return backend
+
+
+class SentenceChunker:
+    """Cuts streamed text deltas into speakable pieces at sentence boundaries."""
+
+    _boundary = re.compile(r"(?<=[.!?])\s+")
+
+    def __init__(self, min_chars: int = 12):
+        self.min_chars = min_chars
+        self._pending = ""
+
+    def feed(self, delta: str) -> list:
+        self._pending += delta
+        parts = self._boundary.split(self._pending)
+        self._pending = parts.pop()
+        sentences = []
+        for part in parts:
+            # Merge very short fragments ("OK.") into the following sentence
+            if sentences and len(sentences[-1]) < self.min_chars:
+                sentences[-1] = f"{sentences[-1]} {part}"
+            else:
+                sentences.append(part)
+        if sentences and len(sentences[-1]) < self.min_chars:
+            self._pending = f"{sentences.pop()} {self._pending}"
+        return [s.strip() for s in sentences if s.strip()]
+
+    def flush(self) -> list:
+        rest, self._pending = self._pending.strip(), ""
+        return [rest] if rest else []
@@ -0,0 +1,294 @@
+"""Shared, micro-batched silero VAD inference for all voice WebSocket sessions."""
+
+import asyncio
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+# silero v5 expects exactly WINDOW_SAMPLES (512) samples per call at 16 kHz
+from app.tools.audio_buffer import PCMRingBuffer, MAX_UTTERANCE_S, SAMPLE_RATE, WINDOW_SAMPLES
+
+CONTEXT_SAMPLES = 64
+STATE_SHAPE = (2, 1, 128)
+
+
+class VADStream:
+    """
+    Per-session VAD state: the utterance ring buffer, the silero recurrent
+    state/context and the same start/end state machine as silero's VADIterator.
+    Streams never run inference themselves; they are stepped by BatchedVADScheduler,
+    which reads their pending windows straight out of `audio`.
+
+    Every event also carries "at", its absolute sample position in `audio`, which
+    `cut()` uses to keep the buffer to the current utterance: audio before a "start" is
+    dropped, each "end" hands over exactly the samples up to it, and between utterances
+    only a short pre-roll is kept, so silence never fills the MAX_UTTERANCE_S ring.
+    """
+    _ids = itertools.count()
+
+    def __init__(self, threshold=0.5, min_silence_duration_ms=100, speech_pad_ms=30,
+                 sample_rate=SAMPLE_RATE, max_utterance_s=MAX_UTTERANCE_S):
+        self.id = next(self._ids)
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.min_silence_samples = sample_rate * min_silence_duration_ms / 1000
+        self.speech_pad_samples = sample_rate * speech_pad_ms / 1000
+        self.audio = PCMRingBuffer(max_utterance_s, sample_rate)
+        self.events = []
+        self.future = None
+        self.reset_states()
+
+    def reset_states(self):
+        self.state = torch.zeros(STATE_SHAPE)
+        self.context = torch.zeros(1, CONTEXT_SAMPLES)
+        self.triggered = False
+        self.temp_end = 0
+        self.temp_end_at = 0
+        self.current_sample = 0
+        self.last_prob = 0.0
+        self.audio.clear()
+
+    def step(self, speech_prob: float):
+        """
+        Advance the start/end state machine by one window (mirrors silero's VADIterator).
+        Besides "start"/"end" it reports "pause" when the probability first drops and
+        "resume" when speech comes back before the silence is confirmed.
+        """
+        window = WINDOW_SAMPLES
+        self.current_sample += window
+        self.last_prob = speech_prob
+        at = self.audio.framed  # end of the window just stepped, in buffer positions
+
+        if speech_prob >= self.threshold and self.temp_end:
+            # Speech resumed before the silence was confirmed
+            self.temp_end = 0
+            return {"resume": round(self.current_sample / self.sample_rate, 1), "at": at}
+
+        if speech_prob >= self.threshold and not self.triggered:
+            self.triggered = True
+            speech_start = max(0, self.current_sample - self.speech_pad_samples - window)
+            return {"start": round(speech_start / self.sample_rate, 1),
+                    "at": max(0, int(at - self.speech_pad_samples - window))}
+
+        if speech_prob < self.threshold - 0.15 and self.triggered:
+            if not self.temp_end:
+                # Probable end of speech: the probability just dropped, silence not yet confirmed
+                self.temp_end = self.current_sample
+                self.temp_end_at = at
+                if self.min_silence_samples > 0:
+                    return {"pause": round(self.temp_end / self.sample_rate, 1), "at": at}
+            if self.current_sample - self.temp_end < self.min_silence_samples:
+                return None
+            speech_end = self.temp_end + self.speech_pad_samples - window
+            self.temp_end = 0
+            self.triggered = False
+            return {"end": round(speech_end / self.sample_rate, 1),
+                    "at": int(self.temp_end_at + self.speech_pad_samples - window)}
+
+        return None
+
+    def cut_at(self, event: dict):
+        """
+        Apply one event to the buffer: "start" drops the audio in front of the speech, "end"
+        returns the utterance up to it (int16 PCM bytes) and drops it. None for other events.
+        """
+        if "start" in event:
+            self.audio.discard_before(event["at"])
+        elif "end" in event:
+            pcm = self.audio.samples(end=event["at"]).tobytes()
+            self.audio.discard_before(event["at"])
+            return pcm or None  # empty when the cap already flushed the whole utterance
+        return None
+
+    def trim_idle(self):
+        """Between utterances keep only the pre-roll a later "start" can reach back into."""
+        if not self.triggered:
+            self.audio.discard_before(self.audio.framed - int(self.speech_pad_samples) - WINDOW_SAMPLES)
+
+    def take_overflow(self):
+        """The utterance so far (PCM bytes, then dropped) once it hit the buffer cap, else None."""
+        if not self.audio.full:
+            return None
+        pcm = self.audio.samples(end=self.audio.framed).tobytes()
+        self.audio.discard_before(self.audio.framed)
+        return pcm
+
+    def cut(self, events: list) -> list:
+        """
+        The utterances (PCM bytes) completed by one `process()` batch of events, in order,
+        including one cut at the MAX_UTTERANCE_S cap; the buffer keeps only what follows.
+        """
+        utterances = [pcm for pcm in map(self.cut_at, events) if pcm is not None]
+        self.trim_idle()
+        overflow = self.take_overflow()
+        if overflow is not None:
+            utterances.append(overflow)
+        return utterances
+
+
+class EnergyGate:
+    """
+    Cheap NumPy pre-gate in front of silero. A window is treated as silence (speech
+    probability 0, no neural inference) when its RMS level is below `floor_db` dBFS,
+    or below `noise_db` with a zero-crossing rate above `zcr_max` (low-level hiss/wind).
+    Set VAD_GATE=0 to disable.
+    """
+
+    def __init__(self, floor_db: float = float(os.environ.get("VAD_GATE_FLOOR_DB", "-55")),
+                 noise_db: float = float(os.environ.get("VAD_GATE_NOISE_DB", "-45")),
+                 zcr_max: float = float(os.environ.get("VAD_GATE_ZCR_MAX", "0.35")),
+                 enabled: bool = os.environ.get("VAD_GATE", "1") != "0"):
+        self.floor_db = floor_db
+        self.noise_db = noise_db
+        self.zcr_max = zcr_max
+        self.enabled = enabled
+
+    def silent(self, windows: np.ndarray) -> np.ndarray:
+        """Boolean mask over a (batch, WINDOW_SAMPLES) float32 array."""
+        if not self.enabled:
+            return np.zeros(len(windows), dtype=bool)
+        rms = np.sqrt(np.einsum("ij,ij->i", windows, windows) / windows.shape[1])
+        rms_db = 20 * np.log10(rms + 1e-10)
+        signs = np.signbit(windows)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (windows.shape[1] - 1)
+        return (rms_db < self.floor_db) | ((rms_db < self.noise_db) & (zcr > self.zcr_max))
+
+
+class BatchedVADScheduler:
+    """
+    Collects pending 512-sample windows from every open VADStream and runs them
+    through the single silero model in one batched forward pass, on a dedicated
+    worker thread so the event loop never blocks on torch.
+
+    Each batch takes at most one window per stream (the recurrent state is
+    sequential), so a session that sent a long chunk simply rides along for
+    several consecutive batches. Windows are converted from the streams' int16
+    ring buffers directly into a preallocated batch tensor, and windows the
+    EnergyGate marks as silent never reach the model.
+    """
+
+    def __init__(self, model=None, max_batch: int = 64, max_wait_ms: float = 5.0,
+                 sample_rate: int = SAMPLE_RATE, gate: EnergyGate = None, model_loader=None):
+        # Either a loaded model, or a loader called on the VAD worker thread at first use
+        self._model = model
+        self._model_loader = model_loader
+        self.gate = gate if gate is not None else EnergyGate()
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.sample_rate = sample_rate
+        self._batch = torch.zeros(max_batch, WINDOW_SAMPLES)
+        self._active = {}  # stream.id -> stream, insertion ordered for round-robin fairness
+        self._wake = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vad")
+        # Counters for /metrics-style introspection (batches = model calls)
+        self.batches = 0
+        self.windows = 0
+        self.gated = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self._model_loader()
+        return self._model
+
+    def open_stream(self, **vad_kwargs) -> VADStream:
+        return VADStream(sample_rate=self.sample_rate, **vad_kwargs)
+
+    def close_stream(self, stream: VADStream):
+        self._active.pop(stream.id, None)
+        if stream.future is not None and not stream.future.done():
+            stream.future.cancel()
+        stream.future = None
+
+    async def process(self, stream: VADStream) -> list:
+        """
+        Run every complete window written to `stream.audio` since the last call and
+        wait for the resulting VAD events, in order ([{"start": s}, {"pause": s}, {"end": s}, ...]).
+        """
+        if not stream.audio.pending_windows:
+            return []
+        self._ensure_running()
+        stream.events = []
+        stream.future = asyncio.get_running_loop().create_future()
+        self._active[stream.id] = stream
+        self._wake.set()
+        return await stream.future
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if self.max_wait_s:
+                await asyncio.sleep(self.max_wait_s)  # let other sessions' chunks join the batch
+
+            while self._active:
+                streams = list(self._active.values())[:self.max_batch]
+                batch = self._batch.numpy()
+                for i, s in enumerate(streams):
+                    s.audio.fill_window(batch[i])
+                n = len(streams)
+                silent = self.gate.silent(batch[:n])
+                voiced = np.flatnonzero(~silent)
+                probs = np.zeros(n, dtype=np.float32)
+                states = contexts = None
+                try:
+                    if len(voiced):
+                        index = torch.from_numpy(voiced)
+                        windows = self._batch[:n] if len(voiced) == n else self._batch[index]
+                        voiced_probs, states, contexts = await loop.run_in_executor(
+                            self._executor, self._infer, windows,
+                            torch.cat([streams[i].state for i in voiced], dim=1),
+                            torch.cat([streams[i].context for i in voiced], dim=0))
+                        probs[voiced] = voiced_probs.numpy()
+                except Exception as e:
+                    print(f"  ⚠  VAD batch error: {e}")
+                    for s in streams:
+                        self._active.pop(s.id, None)
+                        s.audio.clear()
+                        if s.future is not None and not s.future.done():
+                            s.future.set_exception(e)
+                    continue
+
+                if len(voiced):
+                    self.batches += 1  # silero forward passes; an all-gated batch makes none
+                self.windows += n
+                self.gated += n - len(voiced)
+                slot = {int(i): j for j, i in enumerate(voiced)}
+                for i, s in enumerate(streams):
+                    if s.id not in self._active:
+                        continue  # closed while the batch was running
+                    if i in slot:
+                        s.state = states[:, slot[i]:slot[i] + 1]
+                        s.context = contexts[slot[i]:slot[i] + 1]
+                    else:
+                        # Gated as silence: keep the recurrent state, slide the context window
+                        s.context = torch.from_numpy(batch[i, -CONTEXT_SAMPLES:].copy()).unsqueeze(0)
+                    event = s.step(float(probs[i]))
+                    if event:
+                        s.events.append(event)
+                    # Round-robin: move served streams to the back of the line
+                    del self._active[s.id]
+                    if s.audio.pending_windows:
+                        self._active[s.id] = s
+                    elif s.future is not None and not s.future.done():
+                        s.future.set_result(s.events)
+
+    def _infer(self, windows, states, contexts):
+        """One batched silero forward pass with the per-stream recurrent state swapped in."""
+        with torch.inference_mode():
+            self.model._state = states
+            self.model._context = contexts
+            self.model._last_sr = self.sample_rate
+            self.model._last_batch_size = windows.shape[0]
+            out = self.model(windows, self.sample_rate)
+            return out.reshape(-1).clone(), self.model._state.clone(), self.model._context.clone()
@@ -1,8 +1,13 @@
 import torch
 import os
+import numpy as np
 from lightglue import LightGlue, SuperPoint
-from lightglue.utils import load_image, rbd
-from google.adk.tools import FunctionTool
+from lightglue.utils import load_image
+from google.adk.tools import FunctionTool, ToolContext
+from tools.registry import registry
+from tools.frame_store import frame_store
+from tools.anchor_index import AnchorIndex, ZONE_SHORTLIST_K, global_descriptor
+from tools.anchor_cache import EXTRACTOR_CONFIG, load_anchor_features
 # from google_adk import Tool
 
 class VisualZoneLocator():
@@ -19,8 +24,10 @@ class VisualZoneLocator():
 
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         
-        self.extractor = SuperPoint(max_num_keypoints=1024).eval().to(self.device)
-        self.matcher = LightGlue(features='superpoint').eval().to(self.device)
+        self.extractor = SuperPoint(max_num_keypoints=EXTRACTOR_CONFIG['max_num_keypoints']).eval().to(self.device)
+        # Point pruning (width) assumes a batch of one and early exit (depth) is decided for the
+        # whole batch, so both are off: every anchor in the batch gets the full network
+        self.matcher = LightGlue(features='superpoint', depth_confidence=-1, width_confidence=-1).eval().to(self.device)
         
         # 2. Map and Pre-extract Anchor Features
         self.anchor_dict = {
@@ -38,14 +45,81 @@ class VisualZoneLocator():
         self._initialize_anchors(self.anchor_dir)
 
     def _initialize_anchors(self, anchor_dir):
-        print(f"--- Pre-extracting features for {len(self.anchor_dict)} anchors ---")
-        for filename, zone_name in self.anchor_dict.items():
-            path = os.path.join(anchor_dir, filename)
-            if os.path.exists(path):
-                img, _, _ = load_image(path)
-                feat = self.extractor.extract(img.to(self.device).unsqueeze(0))
-                self.anchor_feat[zone_name] = feat
-        print("--- Anchor initialization complete ---")
+        # Features come from the on-disk cache (tools/anchor_cache.py); only anchors that are
+        # new or changed are extracted. Keyed by filename: several anchors can show the same zone
+        features, extracted = load_anchor_features(anchor_dir, self.anchor_dict, self.extractor, self.device)
+        for filename, feats in features.items():
+            self.anchor_feat[filename] = {
+                'keypoints': torch.from_numpy(feats['keypoints']).to(self.device)[None],
+                'keypoint_scores': torch.from_numpy(feats['scores']).to(self.device)[None],
+                'descriptors': torch.from_numpy(feats['descriptors']).to(self.device)[None],
+                'image_size': torch.from_numpy(feats['image_size']).to(self.device)[None],
+            }
+        if extracted:
+            print(f"  🧩 Extracted features for {extracted} new or changed anchors (cached for next start)")
+        self._stack_anchors()
+
+    def _stack_anchors(self):
+        """
+        Groups the anchors by keypoint count and stacks every group into one batch
+        (keypoints [N, M, 2], descriptors [N, M, D], image_size [N, 2]). Nothing is padded:
+        LightGlue has no keypoint mask, so padded rows would take part in its attention and
+        change the matches of the real ones. Anchors at the extractor's keypoint cap (the
+        usual case) all land in one group.
+        """
+        self.anchor_files = list(self.anchor_feat)
+        self.anchor_buckets = {}  # keypoint count -> {'files': [...], 'keypoints': ..., ...}
+        self.anchor_slot = {}  # filename -> (keypoint count, row in that bucket)
+        if not self.anchor_files:
+            self.anchor_index = None
+            return
+        feats = [self.anchor_feat[f] for f in self.anchor_files]
+        self.anchor_index = AnchorIndex(np.stack([self._global_descriptor(f) for f in feats]))
+        for filename, f in zip(self.anchor_files, feats):
+            bucket = self.anchor_buckets.setdefault(f['keypoints'].shape[1], {'files': []})
+            self.anchor_slot[filename] = (f['keypoints'].shape[1], len(bucket['files']))
+            bucket['files'].append(filename)
+        for bucket in self.anchor_buckets.values():
+            for key in ('keypoints', 'descriptors', 'image_size'):
+                bucket[key] = torch.cat([self.anchor_feat[f][key] for f in bucket['files']])
+
+    @staticmethod
+    def _global_descriptor(feats) -> np.ndarray:
+        scores = feats.get('keypoint_scores')
+        return global_descriptor(feats['descriptors'][0].cpu().numpy(),
+                                 None if scores is None else scores[0].cpu().numpy())
+
+    def match_zones(self, feats1, k: int = ZONE_SHORTLIST_K) -> dict:
+        """
+        Shortlists the k anchors whose global descriptor is closest to the query's, matches the
+        query against them in one LightGlue forward pass per keypoint count (usually a single
+        one) and returns {zone: match count} for the shortlisted zones, a zone scoring its best
+        anchor.
+        """
+        if not self.anchor_buckets:
+            return {}
+        files = self.anchor_files
+        if 0 < k < len(files):
+            files = [files[i] for i in self.anchor_index.search(self._global_descriptor(feats1), k)]
+        rows = {}
+        for filename in files:
+            count, row = self.anchor_slot[filename]
+            rows.setdefault(count, []).append(row)
+
+        zone_counts = {}
+        for count, selected in rows.items():
+            bucket = self.anchor_buckets[count]
+            index = torch.as_tensor(selected, device=self.device)
+            anchors = {key: bucket[key].index_select(0, index) for key in ('keypoints', 'descriptors', 'image_size')}
+            n = len(selected)
+            query = {key: feats1[key].expand(n, *feats1[key].shape[1:]) for key in ('keypoints', 'descriptors', 'image_size')}
+            with torch.inference_mode():
+                matches01 = self.matcher({'image0': anchors, 'image1': query})
+                counts = (matches01['matches0'] > -1).sum(dim=1).tolist()
+            for row, num_matches in zip(selected, counts):
+                zone = self.anchor_dict[bucket['files'][row]]
+                zone_counts[zone] = max(zone_counts.get(zone, 0), int(num_matches))
+        return zone_counts
 
     def run(self, query_path: str) -> str:
         """
@@ -55,20 +129,42 @@ class VisualZoneLocator():
             query_path: The file path to the query image to be analyzed.
         """
         image1, _, _ = load_image(query_path)
-        feats1 = self.extractor.extract(image1.to(self.device).unsqueeze(0))
+        return self.run_image(image1)
+
+    def run_image(self, image1) -> str:
+        """Same as run(), for an already decoded image tensor [3, H, W]."""
+        with torch.inference_mode():
+            feats1 = self.extractor.extract(image1.to(self.device).unsqueeze(0))
         
         best_score = 0
         best_zone = "Unknown"
 
-        for zone, feats in self.anchor_feat.items():
-            matches01 = self.matcher({'image0': feats, 'image1': feats1})
-            num_matches = len(rbd(matches01)['matches'])
+        for zone, num_matches in self.match_zones(feats1).items():
             if num_matches > best_score:
                 best_score = num_matches
                 best_zone = zone
 
         return f"The image most likely belongs to the zone: {best_zone} (Confidence Score: {best_score})"
 
-# Instantiate the tool for use in your agent
-locator_instance = VisualZoneLocator()
-locate_zone = FunctionTool(func=locator_instance.run)
\ No newline at end of file
+# The locator (SuperPoint + LightGlue + anchor features) is built on first use or by the
+# registry warm-up, not at import time
+registry.register("zone_locator", VisualZoneLocator, critical=False)
+
+def run(tool_context: ToolContext, query_path: str = "") -> str:
+    """
+    Analyzes the current camera frame (or the image at query_path) and returns the best matching zone name.
+
+    Args:
+        query_path: Optional file path to an image to analyze instead of the current camera frame.
+    """
+    locator = registry.get("zone_locator")
+    if query_path and os.path.exists(query_path):
+        return locator.run(query_path)
+    # The session's latest frame from memory: decoded once and shared with the photo upload
+    image = frame_store.tensor((tool_context.user_id, tool_context.session.id))
+    if image is None:
+        return "No camera frame available right now."
+    return locator.run_image(image)
+
+# Keeps the tool name ("run") and description the agent already uses
+locate_zone = FunctionTool(func=run)
\ No newline at end of file
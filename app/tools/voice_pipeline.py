@@ -0,0 +1,148 @@
+"""Pipelined, full-duplex voice loop used by /ws/inspect."""
+
+import asyncio
+import base64
+
+from app.tools.tts import SentenceChunker
+from tools.admission import Overloaded
+
+
+class VoicePipeline:
+    """
+    Runs the STT -> agent -> TTS loop for one live connection.
+
+    - `submit_utterance(pcm)` starts STT right away, so utterance N+1 is transcribed
+      while the agent is still answering utterance N. Transcripts reach the agent in order.
+    - Agent text is streamed to the client as {"type": "agent_text_delta"} pieces and cut into
+      sentences; each sentence is synthesized while the agent keeps generating and sent as
+      {"type": "agent_audio"} in order. {"type": "agent_text"} carries the full reply at the end.
+    - `barge_in()` cancels the in-flight agent turn and its TTS as soon as the technician
+      starts talking again.
+    - A turn shed by admission control is reported as {"type": "overloaded", ...}; any other
+      STT, agent or TTS failure as {"type": "error", "stage": "stt" | "agent", "message": ...}.
+
+    `agent_stream(text)` is an async generator of reply text deltas.
+    """
+
+    def __init__(self, transcribe_pcm, agent_stream, tts, send_json):
+        self.transcribe_pcm = transcribe_pcm  # async (pcm bytes) -> str
+        self.agent_stream = agent_stream
+        self.tts = tts
+        self.send_json = send_json
+        self._utterances = asyncio.Queue()  # STT tasks, in arrival order
+        self._turn = None
+        self._worker = None
+
+    @property
+    def speaking(self) -> bool:
+        """True while an agent turn (text or audio) is still in flight."""
+        return self._turn is not None and not self._turn.done()
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    def submit_utterance(self, pcm: bytes):
+        self._utterances.put_nowait(asyncio.create_task(self.transcribe_pcm(pcm)))
+
+    def submit_transcript(self, text: str):
+        done = asyncio.get_running_loop().create_future()
+        done.set_result(text)
+        self._utterances.put_nowait(done)
+
+    async def barge_in(self):
+        if not self.speaking:
+            return
+        self._turn.cancel()
+        await asyncio.wait({self._turn})
+        await self.send_json({"type": "barge_in"})
+
+    async def close(self):
+        tasks = [t for t in (self._worker, self._turn) if t is not None]
+        while not self._utterances.empty():
+            tasks.append(self._utterances.get_nowait())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def _report(self, message: dict):
+        """Send a status / error message; a client that is already gone is only logged."""
+        try:
+            await self.send_json(message)
+        except Exception as e:
+            print(f"  ⚠  Could not send {message.get('type')} to the voice client: {e}")
+
+    async def _run(self):
+        while True:
+            stt_task = await self._utterances.get()
+            try:
+                await self._handle(stt_task)
+            except Exception as e:
+                # Never let one utterance end the worker: later ones would queue forever
+                print(f"  ⚠  Voice pipeline error: {e}")
+
+    async def _handle(self, stt_task):
+        await asyncio.wait({stt_task})
+        if stt_task.cancelled():
+            return
+        error = stt_task.exception()
+        if error is not None:
+            if isinstance(error, Overloaded):
+                await self._report({"type": "overloaded", **error.as_dict()})
+            else:
+                print(f"  ⚠  STT error: {error}")
+                await self._report({"type": "error", "stage": "stt", "message": str(error)})
+            return
+        transcript = stt_task.result()
+        if not transcript:
+            return
+        print(f"📝 You said: {transcript}")
+        await self.send_json({"type": "user_transcript", "text": transcript})
+        self._turn = asyncio.create_task(self._agent_turn(transcript))
+        # asyncio.wait (not await) so a barge-in cancelling the turn does not stop the loop
+        await asyncio.wait({self._turn})
+
+    async def _agent_turn(self, transcript: str):
+        sentences = asyncio.Queue()
+        speaker = asyncio.create_task(self._speak(sentences))
+        chunker = SentenceChunker()
+        reply = []
+        try:
+            async for delta in self.agent_stream(transcript):
+                reply.append(delta)
+                await self.send_json({"type": "agent_text_delta", "text": delta})
+                for sentence in chunker.feed(delta):
+                    sentences.put_nowait(sentence)
+            for sentence in chunker.flush():
+                sentences.put_nowait(sentence)
+            sentences.put_nowait(None)
+
+            agent_reply = "".join(reply)
+            print(f"🤖 Agent: {agent_reply}")
+            await self.send_json({"type": "agent_text", "text": agent_reply})
+            await speaker
+        except Overloaded as e:
+            await self._report({"type": "overloaded", **e.as_dict()})
+        except Exception as e:
+            # Agent or TTS failure: tell the client instead of going silent
+            print(f"  ⚠  Voice turn error: {e}")
+            await self._report({"type": "error", "stage": "agent", "message": str(e)})
+        finally:
+            speaker.cancel()
+
+    async def _speak(self, sentences: asyncio.Queue):
+        seq = 0
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                return
+            audio, mime_type = await self.tts.synthesize(sentence)
+            if audio:
+                await self.send_json({
+                    "type": "agent_audio",
+                    "seq": seq,
+                    "text": sentence,
+                    "mime_type": mime_type,
+                    "data": base64.b64encode(audio).decode("utf-8"),
+                })
+                seq += 1
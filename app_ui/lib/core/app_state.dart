@@ -321,13 +321,17 @@ class AppState extends ChangeNotifier {
     notifyListeners();
   }
 
-  /// Kick off periodic frame capture → upload so the backend always has a
-  /// recent `current_frame.jpg` for vision analysis.
+  /// Kick off periodic frame capture → /ws/frames so the backend always has
+  /// a recent frame of this session for vision analysis, at the rate its
+  /// frame_config advice asks for.
   void _startPeriodicFrameUpload() {
     final b = backend;
     if (b is! HttpBackend) return;
+    final sessionId = liveReport?.sessionId;
+    final frames = b.frameStream(sessionId);
     cameraHandle.startPeriodicCapture(
-      onFrame: (path) => b.uploadFrame(path),
+      onFrame: (path) => b.streamFrame(path, sessionId: sessionId),
+      nextInterval: () => frames.interval,
     );
   }
 
@@ -0,0 +1,100 @@
+import 'dart:convert';
+import 'dart:io';
+
+import 'package:flutter/foundation.dart';
+
+/// Persistent camera-frame uplink to the backend's `/ws/frames` endpoint.
+///
+/// Every frame is sent as a 4-byte big-endian length followed by the JPEG
+/// bytes, over one WebSocket instead of one multipart request per frame.
+/// The server paces the client with `frame_config` messages
+/// (`{fps, quality, max_bytes}`) that follow how often the session's frames
+/// are actually read: [interval] tracks the advised fps, and frames over
+/// [maxBytes] are skipped rather than sent (the server would close the
+/// stream on them).
+///
+/// The socket is opened on the first [send] and reopened on the next one
+/// after a drop, so a flaky connection costs at most one frame.
+class FrameStream {
+  final Uri uri;
+  final Duration connectTimeout;
+
+  WebSocket? _socket;
+  Future<WebSocket?>? _connecting;
+
+  /// Latest advice from the server (defaults until the first frame_config).
+  /// [quality] is for capture paths that encode the JPEG themselves; the
+  /// camera plugin's takePicture always uses the platform encoder.
+  double fps = 1 / 3;
+  int quality = 85;
+  int maxBytes = 4 * 1024 * 1024;
+
+  FrameStream(this.uri, {this.connectTimeout = const Duration(seconds: 10)});
+
+  /// Delay between captures at the advised frame rate.
+  Duration get interval =>
+      Duration(milliseconds: fps > 0 ? (1000 / fps).round() : 1000);
+
+  /// Sends one JPEG frame. Returns false if it was skipped or the backend
+  /// is unreachable.
+  Future<bool> send(Uint8List jpeg) async {
+    if (jpeg.isEmpty || jpeg.length > maxBytes) {
+      debugPrint('📷 Frame of ${jpeg.length} bytes skipped (max $maxBytes)');
+      return false;
+    }
+    final socket = _socket ?? await (_connecting ??= _connect());
+    if (socket == null) return false;
+
+    final packet = Uint8List(4 + jpeg.length);
+    ByteData.view(packet.buffer).setUint32(0, jpeg.length, Endian.big);
+    packet.setRange(4, packet.length, jpeg);
+    socket.add(packet);
+    return true;
+  }
+
+  Future<void> close() async {
+    final socket = _socket;
+    _socket = null;
+    await socket?.close();
+  }
+
+  Future<WebSocket?> _connect() async {
+    try {
+      final socket = await WebSocket.connect(uri.toString()).timeout(connectTimeout);
+      socket.listen(
+        _onMessage,
+        onDone: () => _drop(socket),
+        onError: (Object e) {
+          debugPrint('📷 Frame stream error: $e');
+          _drop(socket);
+        },
+        cancelOnError: true,
+      );
+      _socket = socket;
+      debugPrint('📷 Frame stream connected: $uri');
+      return socket;
+    } catch (e) {
+      debugPrint('📷 Frame stream unavailable: $e');
+      return null;
+    } finally {
+      _connecting = null;
+    }
+  }
+
+  void _drop(WebSocket socket) {
+    if (identical(_socket, socket)) _socket = null;
+  }
+
+  void _onMessage(dynamic message) {
+    if (message is! String) return;
+    final json = jsonDecode(message) as Map<String, dynamic>;
+    switch (json['type']) {
+      case 'frame_config':
+        fps = (json['fps'] as num?)?.toDouble() ?? fps;
+        quality = (json['quality'] as num?)?.toInt() ?? quality;
+        maxBytes = (json['max_bytes'] as num?)?.toInt() ?? maxBytes;
+      case 'error':
+        debugPrint('📷 Frame stream rejected: ${json['message']}');
+    }
+  }
+}
@@ -1,10 +1,13 @@
+import 'dart:async';
 import 'dart:convert';
 import 'dart:io';
+import 'dart:math';
 
 import 'package:flutter/foundation.dart';
 import 'package:http/http.dart' as http;
 
 import 'backend_port.dart';
+import 'frame_stream.dart';
 import 'models.dart';
 
 /// HTTP-based implementation of [BackendPort] targeting the FastAPI backend.
@@ -13,7 +16,9 @@ import 'models.dart';
 ///   POST /chat   — generator agent (inspection)
 ///   POST /review — reviewer agent  (reports)
 ///
-/// Frame uploads go to port 8001 (data_stream server) when available.
+/// Periodic camera frames stream over the /ws/frames WebSocket (see
+/// [FrameStream]); explicit photos are uploaded with an awaited
+/// POST /upload-frame so they are stored before the turn that uses them.
 class HttpBackend implements BackendPort {
   final String baseUrl;
   final http.Client _client;
@@ -32,20 +37,96 @@ class HttpBackend implements BackendPort {
         'Accept': 'application/json',
       };
 
-  /// Best-effort upload of an image frame to the backend server so the
-  /// vision tool can read it from disk at `data/stream/current_frame.jpg`.
-  Future<bool> uploadFrame(String filePath) async {
+  int _requestSeq = 0;
+
+  /// Identifies this app install to the backend's admission control, which
+  /// limits concurrent model calls per device (`user_id` is shared by every
+  /// technician's app).
+  final String _deviceId =
+      'dev_${Random.secure().nextInt(1 << 32).toRadixString(16)}'
+      '${DateTime.now().microsecondsSinceEpoch.toRadixString(16)}';
+
+  String _newRequestId() =>
+      'req_${DateTime.now().microsecondsSinceEpoch}_${_requestSeq++}';
+
+  /// POSTs one `/chat` turn with a fresh `request_id`. Timeouts, dropped
+  /// connections and 503 (load shedding) are retried with the same id, so
+  /// the backend answers a retried turn from the first attempt instead of
+  /// running it twice.
+  Future<http.Response> _postTurn(Map<String, dynamic> body,
+      {int attempts = 2}) async {
+    final payload = jsonEncode({
+      ...body,
+      'request_id': _newRequestId(),
+      'device_id': _deviceId,
+    });
+    for (var attempt = 1;; attempt++) {
+      try {
+        final resp = await _client
+            .post(_uri('/chat'), headers: _jsonHeaders, body: payload)
+            .timeout(timeout);
+        if (resp.statusCode != 503 || attempt >= attempts) return resp;
+        final retryAfter = int.tryParse(resp.headers['retry-after'] ?? '') ?? 1;
+        await Future.delayed(Duration(seconds: retryAfter));
+      } on TimeoutException {
+        if (attempt >= attempts) rethrow;
+      } on SocketException {
+        if (attempt >= attempts) rethrow;
+      }
+    }
+  }
+
+  FrameStream? _frames;
+  String? _framesSessionId;
+
+  /// The frame uplink of [sessionId], replacing the previous session's one.
+  FrameStream frameStream(String? sessionId) {
+    final current = _frames;
+    if (current != null && _framesSessionId == sessionId) return current;
+    current?.close();
+    final base = Uri.parse(baseUrl);
+    final stream = FrameStream(base.replace(
+      scheme: base.scheme == 'https' ? 'wss' : 'ws',
+      path: '/ws/frames',
+      queryParameters: {
+        if (sessionId != null) 'user_id': 'operator',
+        if (sessionId != null) 'session_id': sessionId,
+      },
+    ));
+    _frames = stream;
+    _framesSessionId = sessionId;
+    return stream;
+  }
+
+  /// Upload of an explicitly captured photo. Awaited until the backend has
+  /// stored it as the session's latest frame, so the /chat turn that follows
+  /// (vision tool, defect photo) is guaranteed to see this photo.
+  Future<bool> uploadFrame(String filePath, {String? sessionId}) async {
     try {
-      final uploadBase = baseUrl.replaceAll(RegExp(r':\d+$'), ':8000');
-      final request = http.MultipartRequest(
-          'POST', Uri.parse('$uploadBase/upload-frame'));
+      final request = http.MultipartRequest('POST', _uri('/upload-frame'));
       request.files.add(await http.MultipartFile.fromPath('file', filePath));
+      if (sessionId != null) {
+        request.fields['user_id'] = 'operator';
+        request.fields['session_id'] = sessionId;
+      }
       final streamed = await _client.send(request).timeout(
           const Duration(seconds: 10));
       final resp = await http.Response.fromStream(streamed);
       return resp.statusCode >= 200 && resp.statusCode < 300;
     } catch (e) {
-      debugPrint('Frame upload failed (data_stream may not be running): $e');
+      debugPrint('Frame upload failed: $e');
+      return false;
+    }
+  }
+
+  /// Best-effort periodic frame over the session's /ws/frames stream (not
+  /// acknowledged: use [uploadFrame] for photos a turn depends on).
+  Future<bool> streamFrame(String filePath, {String? sessionId}) async {
+    try {
+      final bytes = await File(filePath).readAsBytes();
+      return await frameStream(sessionId).send(bytes);
+    } catch (e) {
+      debugPrint('Frame stream send failed: $e');
       return false;
     }
   }
@@ -56,19 +137,12 @@ class HttpBackend implements BackendPort {
   Future<SessionStartResult> createSession(String machineId) async {
     final sessionId = 'sess_${DateTime.now().millisecondsSinceEpoch}';
 
-    final resp = await _client
-        .post(
-          _uri('/chat'),
-          headers: _jsonHeaders,
-          body: jsonEncode({
-            'user_id': 'operator',
-            'session_id': sessionId,
-            'text':
-                'Starting pre-operation inspection for machine $machineId. '
-                'Guide me through the walk-around.',
-          }),
-        )
-        .timeout(timeout);
+    final resp = await _postTurn({
+      'user_id': 'operator',
+      'session_id': sessionId,
+      'text': 'Starting pre-operation inspection for machine $machineId. '
+          'Guide me through the walk-around.',
+    });
     _checkStatus(resp);
 
     final json = jsonDecode(resp.body) as Map<String, dynamic>;
@@ -100,7 +174,7 @@ class HttpBackend implements BackendPort {
     String messageText = text ?? '';
 
     if (imageFilePath != null) {
-      final uploaded = await uploadFrame(imageFilePath);
+      final uploaded = await uploadFrame(imageFilePath, sessionId: sessionId);
       if (messageText.isEmpty) {
         messageText = uploaded
             ? 'I just took a photo at zone $zoneId. '
@@ -121,17 +195,11 @@ class HttpBackend implements BackendPort {
       messageText = 'Continuing inspection at zone $zoneId. What should I check next?';
     }
 
-    final resp = await _client
-        .post(
-          _uri('/chat'),
-          headers: _jsonHeaders,
-          body: jsonEncode({
-            'user_id': 'operator',
-            'session_id': sessionId,
-            'text': messageText,
-          }),
-        )
-        .timeout(timeout);
+    final resp = await _postTurn({
+      'user_id': 'operator',
+      'session_id': sessionId,
+      'text': messageText,
+    });
     _checkStatus(resp);
 
     final json = jsonDecode(resp.body) as Map<String, dynamic>;
@@ -152,7 +220,7 @@ class HttpBackend implements BackendPort {
     String? zoneId,
   }) async {
     if (kind == MediaKind.photo) {
-      await uploadFrame(filePath);
+      await uploadFrame(filePath, sessionId: sessionId);
     }
 
     return const MediaProcessResult(
@@ -177,6 +245,7 @@ class HttpBackend implements BackendPort {
           headers: _jsonHeaders,
           body: jsonEncode({
             'user_id': 'manager',
+            'device_id': _deviceId,
             'session_id': sessionId,
             'text': query,
           }),
@@ -202,6 +271,7 @@ class HttpBackend implements BackendPort {
           headers: _jsonHeaders,
           body: jsonEncode({
             'user_id': 'manager',
+            'device_id': _deviceId,
             'session_id': 'review_edit',
             'text': 'Update report $reportId: $instruction',
           }),
@@ -249,7 +319,10 @@ class HttpBackend implements BackendPort {
   // ── Cleanup ────────────────────────────────────────────────────────────
 
   @override
-  void dispose() => _client.close();
+  void dispose() {
+    _frames?.close();
+    _client.close();
+  }
 
   // ── Helpers ────────────────────────────────────────────────────────────
 
@@ -12,12 +12,12 @@ typedef FrameUploadCallback = Future<void> Function(String filePath);
 /// [CameraPreviewCard] calls [attach]/[detach] as the controller comes and
 /// goes; [AppState] calls [captureFrame] when the backend requests a photo.
 ///
-/// Call [startPeriodicCapture] to begin streaming frames to the backend at a
-/// fixed interval (default every 3 seconds).
+/// Call [startPeriodicCapture] to begin streaming frames to the backend,
+/// every 3 seconds or at the pace the backend advises ([nextInterval]).
 class LiveCameraHandle {
   CameraController? _controller;
   Timer? _periodicTimer;
-  bool _capturing = false;
+  bool _periodicActive = false;
 
   void attach(CameraController controller) {
     _controller = controller;
@@ -32,7 +32,7 @@ class LiveCameraHandle {
 
   bool get isReady => _controller?.value.isInitialized ?? false;
 
-  bool get isPeriodicCaptureActive => _periodicTimer?.isActive ?? false;
+  bool get isPeriodicCaptureActive => _periodicActive;
 
   /// Grab a single JPEG frame from the live preview and return its path,
   /// or `null` if the camera isn't available.
@@ -51,36 +51,45 @@ class LiveCameraHandle {
 
   /// Begin periodically capturing frames and forwarding them to [onFrame].
   ///
-  /// [interval] controls how often a frame is grabbed (default 3 s).
-  /// If a previous capture is still in flight the tick is skipped so we
-  /// never queue up work faster than the camera / network can handle.
+  /// [interval] controls how often a frame is grabbed (default 3 s), unless
+  /// [nextInterval] is given: it is asked before every capture, so the rate
+  /// can follow the backend's frame_config advice. The next capture is only
+  /// scheduled once the previous one is sent, so we never queue up work
+  /// faster than the camera / network can handle.
   void startPeriodicCapture({
     required FrameUploadCallback onFrame,
     Duration interval = const Duration(seconds: 3),
+    Duration Function()? nextInterval,
   }) {
     stopPeriodicCapture();
     debugPrint('📷 Periodic capture started (every ${interval.inSeconds}s)');
+    _periodicActive = true;
 
-    _periodicTimer = Timer.periodic(interval, (_) async {
-      if (_capturing || !isReady) return;
-      _capturing = true;
-      try {
-        final path = await captureFrame();
-        if (path != null) {
-          await onFrame(path);
+    void schedule() {
+      if (!_periodicActive) return;
+      _periodicTimer = Timer(nextInterval?.call() ?? interval, () async {
+        try {
+          if (isReady) {
+            final path = await captureFrame();
+            if (path != null && _periodicActive) {
+              await onFrame(path);
+            }
+          }
+        } finally {
+          schedule();
         }
-      } finally {
-        _capturing = false;
-      }
-    });
+      });
+    }
+
+    schedule();
   }
 
   /// Stop the periodic capture timer.
   void stopPeriodicCapture() {
-    if (_periodicTimer != null) {
-      _periodicTimer!.cancel();
-      _periodicTimer = null;
-      debugPrint('📷 Periodic capture stopped');
-    }
+    final wasActive = _periodicActive;
+    _periodicActive = false;
+    _periodicTimer?.cancel();
+    _periodicTimer = null;
+    if (wasActive) debugPrint('📷 Periodic capture stopped');
   }
 }
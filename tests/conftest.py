@@ -0,0 +1,16 @@
+"""
+Test setup: the app is run from the repo root with both `.` and `app/` importable
+(main.py imports `app.tools.*` as well as the shared `tools.*` singletons, see
+app/gunicorn_conf.py), so the tests use the same paths.
+
+Run from the repo root:
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "app")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from tools.admission import AdmissionController, Overloaded
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+def controller(**kwargs):
+    options = dict(max_concurrency=1, tenant_limit=4, reserved_voice=0, max_queue=8,
+                   deadlines_s={"voice": 1.0, "chat": 1.0, "review": 1.0})
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+async def hold(admission, release, tenant="t", priority="chat", log=None, name=None):
+    async with admission.admit(tenant, priority):
+        if log is not None:
+            log.append(name or priority)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    async def main():
+        admission, release, log = controller(), asyncio.Event(), []
+        holder = asyncio.create_task(hold(admission, release))
+        await settle()
+        waiters = [asyncio.create_task(hold(admission, release, priority=p, log=log, name=n))
+                   for p, n in (("review", "review"), ("chat", "chat-1"), ("voice", "voice"), ("chat", "chat-2"))]
+        await settle()
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return log, admission.as_dict()
+
+    log, stats = run(main())
+    assert log == ["voice", "chat-1", "chat-2", "review"]
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+
+
+def test_full_queue_sheds_the_new_call_of_equal_or_lower_priority():
+    async def main():
+        admission, release = controller(max_queue=1), asyncio.Event()
+        holder = asyncio.create_task(hold(admission, release))
+        await settle()
+        queued = asyncio.create_task(hold(admission, release, priority="chat"))
+        await settle()
+        with pytest.raises(Overloaded) as shed:
+            async with admission.admit("t", "review"):
+                pass
+        release.set()
+        await asyncio.gather(holder, queued)
+        return shed.value, admission.shed
+
+    error, shed = run(main())
+    assert (error.reason, error.priority) == ("queue_full", "review")
+    assert shed["review"] == 1 and shed["chat"] == 0
+
+
+def test_full_queue_preempts_a_lower_priority_waiter():
+    async def main():
+        admission, release = controller(max_queue=1), asyncio.Event()
+        holder = asyncio.create_task(hold(admission, release))
+        await settle()
+        review = asyncio.create_task(hold(admission, release, priority="review"))
+        await settle()
+        voice = asyncio.create_task(hold(admission, release, priority="voice"))
+        await settle()
+        release.set()
+        return await asyncio.gather(holder, review, voice, return_exceptions=True)
+
+    _, review, voice = run(main())
+    assert isinstance(review, Overloaded) and review.reason == "preempted"
+    assert voice is None
+
+
+def test_waiter_past_its_deadline_is_shed():
+    async def main():
+        admission = controller(deadlines_s={"voice": 1.0, "chat": 0.05, "review": 1.0})
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(admission, release))
+        await settle()
+        with pytest.raises(Overloaded) as shed:
+            async with admission.admit("t", "chat"):
+                pass
+        release.set()
+        await holder
+        return shed.value, admission.as_dict()
+
+    error, stats = run(main())
+    assert error.reason == "deadline"
+    assert error.as_dict()["retry_after_s"] == 0.05
+    assert stats["queued"] == 0 and stats["in_flight"] == 0
+
+
+def test_busy_tenant_does_not_block_other_tenants():
+    async def main():
+        admission, release, log = controller(max_concurrency=4, tenant_limit=1), asyncio.Event(), []
+        busy = asyncio.create_task(hold(admission, release, tenant="device-a", log=log, name="a-1"))
+        await settle()
+        second = asyncio.create_task(hold(admission, release, tenant="device-a", log=log, name="a-2"))
+        other = asyncio.create_task(hold(admission, release, tenant="device-b", log=log, name="b-1"))
+        await settle()
+        admitted_before_release = list(log)
+        release.set()
+        await asyncio.gather(busy, second, other)
+        return admitted_before_release, log
+
+    before, after = run(main())
+    assert before == ["a-1", "b-1"]
+    assert after == ["a-1", "b-1", "a-2"]
+
+
+def test_reserved_slots_only_admit_voice():
+    async def main():
+        admission, release, log = controller(max_concurrency=2, reserved_voice=1), asyncio.Event(), []
+        chat = asyncio.create_task(hold(admission, release, tenant="a", log=log, name="chat-1"))
+        await settle()
+        queued = asyncio.create_task(hold(admission, release, tenant="b", log=log, name="chat-2"))
+        voice = asyncio.create_task(hold(admission, release, tenant="c", priority="voice", log=log))
+        await settle()
+        admitted_before_release = list(log)
+        release.set()
+        await asyncio.gather(chat, queued, voice)
+        return admitted_before_release
+
+    assert run(main()) == ["chat-1", "voice"]
+
+
+def test_context_tags_calls_with_tenant_and_priority():
+    async def main():
+        admission, release, log = controller(), asyncio.Event(), []
+        holder = asyncio.create_task(hold(admission, release))
+        await settle()
+
+        async def tagged(tenant, priority):
+            with admission.context(tenant, priority):
+                async with admission.admit():
+                    log.append(priority)
+
+        waiters = [asyncio.create_task(tagged("x", "review")), asyncio.create_task(tagged("y", "voice"))]
+        await settle()
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return log, admission.admitted
+
+    log, admitted = run(main())
+    assert log == ["voice", "review"]
+    assert admitted == {"voice": 1, "chat": 1, "review": 1}
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+
+from app.tools import anchor_cache
+from app.tools.anchor_cache import AnchorFeatureCache, file_digest, load_anchor_features
+
+
+def features(n=5, dim=4):
+    rng = np.random.default_rng(n)
+    return {"keypoints": rng.random((n, 2)) * 100, "scores": rng.random(n),
+            "descriptors": rng.random((n, dim)), "image_size": np.array([640.0, 480.0])}
+
+
+def fake_extractor(monkeypatch):
+    """Counts extractions; the features depend on the image bytes, like the real extractor's."""
+    calls = []
+
+    def extract(extractor, path, device):
+        calls.append(os.path.basename(path))
+        with open(path, "rb") as f:
+            return features(n=len(f.read()))
+
+    monkeypatch.setattr(anchor_cache, "extract_features", extract)
+    return calls
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return path.name
+
+
+def test_entries_round_trip_memory_mapped(tmp_path):
+    cache = AnchorFeatureCache(str(tmp_path))
+    stored = features()
+    cache.store("abc", stored, source="frame_0018.jpg")
+    loaded = cache.load("abc")
+    assert isinstance(loaded["descriptors"], np.memmap)
+    for key in ("keypoints", "scores", "descriptors", "image_size"):
+        np.testing.assert_allclose(loaded[key], stored[key], rtol=1e-6)
+    assert cache.load("missing") is None
+
+
+def test_incomplete_entries_are_misses(tmp_path):
+    cache = AnchorFeatureCache(str(tmp_path))
+    cache.store("abc", features())
+    os.remove(os.path.join(cache.path, "abc.json"))  # crashed before the sidecar was renamed in
+    assert cache.load("abc") is None
+
+
+def test_anchors_are_keyed_by_content(tmp_path, monkeypatch):
+    calls = fake_extractor(monkeypatch)
+    anchors = tmp_path / "anchors"
+    anchors.mkdir()
+    cache = AnchorFeatureCache(str(tmp_path / "cache"))
+    write(anchors / "a.jpg", b"front view")
+    write(anchors / "b.jpg", b"rear view!!")
+
+    _, extracted = load_anchor_features(str(anchors), ["a.jpg", "b.jpg", "gone.jpg"], None, "cpu", cache)
+    assert extracted == 2 and calls == ["a.jpg", "b.jpg"]
+
+    (anchors / "a.jpg").rename(anchors / "renamed.jpg")
+    write(anchors / "b.jpg", b"rear view, retaken")
+    loaded, extracted = load_anchor_features(str(anchors), ["renamed.jpg", "b.jpg"], None, "cpu", cache)
+    assert extracted == 1 and calls[2:] == ["b.jpg"]  # the renamed anchor came from the cache
+    assert loaded["renamed.jpg"]["keypoints"].shape == (len(b"front view"), 2)
+
+
+def test_a_new_extractor_config_gets_its_own_directory(tmp_path):
+    default = AnchorFeatureCache(str(tmp_path))
+    other = AnchorFeatureCache(str(tmp_path), config={"features": "superpoint", "max_num_keypoints": 2048})
+    default.store("abc", features())
+    assert default.path != other.path
+    assert other.load("abc") is None
+
+
+def test_prune_drops_stale_entries_and_old_configs_only(tmp_path):
+    old = AnchorFeatureCache(str(tmp_path), config={"features": "superpoint", "max_num_keypoints": 512})
+    old.store("abc", features())
+    cache = AnchorFeatureCache(str(tmp_path))
+    cache.store("keep", features())
+    cache.store("stale", features())
+    (tmp_path / "notes").mkdir()  # the root may hold other things: never touched
+    (tmp_path / "v1-notadigest").mkdir()
+
+    removed = cache.prune({"keep"})
+    assert removed == 2  # stale.npy + stale.json
+    assert sorted(os.listdir(cache.path)) == ["keep.json", "keep.npy"]
+    assert sorted(os.listdir(tmp_path)) == sorted(["notes", "v1-notadigest", os.path.basename(cache.path)])
+
+
+def test_file_digest_follows_content(tmp_path):
+    a = tmp_path / "a.jpg"
+    a.write_bytes(b"x" * (3 << 20))  # spans several read blocks
+    b = tmp_path / "b.jpg"
+    b.write_bytes(b"x" * (3 << 20))
+    assert file_digest(str(a)) == file_digest(str(b))
+    b.write_bytes(b"x" * (3 << 20) + b"y")
+    assert file_digest(str(a)) != file_digest(str(b))
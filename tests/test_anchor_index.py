@@ -0,0 +1,39 @@
+import numpy as np
+
+from app.tools.anchor_index import AnchorIndex, global_descriptor
+
+
+def local_descriptors(seed, n=200, dim=32):
+    return np.random.default_rng(seed).standard_normal((n, dim), dtype=np.float32)
+
+
+def test_global_descriptor_is_a_unit_vector():
+    vector = global_descriptor(local_descriptors(0))
+    assert vector.shape == (32,) and abs(np.linalg.norm(vector) - 1) < 1e-5
+    assert not global_descriptor(np.zeros((0, 32))).any()
+
+
+def test_scores_weight_the_pooling():
+    descriptors = np.eye(2, dtype=np.float32)
+    vector = global_descriptor(descriptors, scores=[3.0, 1.0])
+    assert vector[0] > vector[1] > 0
+    np.testing.assert_allclose(global_descriptor(descriptors), [2 ** -0.5, 2 ** -0.5], rtol=1e-6)
+
+
+def test_search_ranks_the_matching_anchor_first():
+    anchors = [local_descriptors(seed) for seed in range(10)]
+    index = AnchorIndex(np.stack([global_descriptor(d) for d in anchors]))
+    # Another view of anchor 7: a subset of its keypoints plus a little noise
+    view = anchors[7][:120] + np.random.default_rng(99).normal(0, 0.02, (120, 32)).astype(np.float32)
+    query = global_descriptor(view)
+    shortlist = index.search(query, k=3)
+    assert len(shortlist) == 3 and shortlist[0] == 7
+    assert index.search(query, k=0).tolist()[0] == 7
+    assert sorted(index.search(query, k=50).tolist()) == list(range(10))
+
+
+def test_shortlist_is_ordered_best_first():
+    index = AnchorIndex(np.array([[1.0, 0.0], [0.6, 0.8], [0.0, 1.0], [0.8, 0.6]]))
+    assert index.search(np.array([1.0, 0.0]), k=2).tolist() == [0, 3]
+    assert index.search(np.array([0.0, 1.0]), k=3).tolist() == [2, 1, 3]
+    assert len(index) == 4
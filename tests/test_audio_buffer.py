@@ -0,0 +1,79 @@
+import numpy as np
+
+from app.tools.audio_buffer import INT16_SCALE, PCMRingBuffer
+
+RATE = 1000  # small rings keep the wrap-around cases readable
+
+
+def ring(seconds=1.0, window=100):
+    return PCMRingBuffer(max_seconds=seconds, sample_rate=RATE, window_samples=window)
+
+
+def pcm(start, n):
+    return np.arange(start, start + n, dtype=np.int16).tobytes()
+
+
+def test_writes_behave_like_a_bytearray():
+    buffer = ring()
+    buffer.write(pcm(0, 300))
+    buffer.write(pcm(300, 200))
+    assert len(buffer) == 1000
+    assert bytes(buffer) == pcm(0, 500)
+    assert buffer.seconds == 0.5 and not buffer.full
+    buffer.clear()
+    assert len(buffer) == 0 and bytes(buffer) == b""
+
+
+def test_odd_byte_chunks_are_reassembled():
+    data = pcm(0, 50)
+    buffer = ring()
+    for i in range(0, len(data), 7):
+        buffer.write(data[i:i + 7])
+    assert bytes(buffer) == data
+
+
+def test_overflow_keeps_the_newest_audio_across_the_wrap():
+    buffer = ring()
+    buffer.write(pcm(0, 700))
+    buffer.write(pcm(700, 600))
+    assert buffer.full
+    assert bytes(buffer) == pcm(300, 1000)
+    assert (buffer.start, buffer.end) == (300, 1300)
+    buffer.write(pcm(0, 2500))  # a single chunk larger than the ring
+    assert bytes(buffer) == pcm(1500, 1000)
+
+
+def test_windows_are_framed_in_order_as_float32():
+    buffer = ring()
+    out = np.empty(100, dtype=np.float32)
+    buffer.write(pcm(0, 250))
+    assert buffer.pending_windows == 2
+    assert buffer.fill_window(out)
+    np.testing.assert_array_equal(out, np.arange(100, dtype=np.float32) * INT16_SCALE)
+    assert buffer.fill_window(out) and buffer.framed == 200
+    assert not buffer.fill_window(out)
+    assert buffer.pending_windows == 0
+
+
+def test_window_that_wraps_the_ring_is_contiguous():
+    buffer = ring()
+    out = np.empty(100, dtype=np.float32)
+    buffer.write(pcm(0, 950))
+    buffer.discard_before(950)  # framed jumps to 950, the next window wraps
+    buffer.write(pcm(950, 100))
+    assert buffer.fill_window(out)
+    np.testing.assert_array_equal(out, np.arange(950, 1050, dtype=np.float32) * INT16_SCALE)
+
+
+def test_positions_survive_cuts():
+    buffer = ring()
+    buffer.write(pcm(0, 1200))  # full: holds 200..1200
+    assert buffer.full
+    assert buffer.samples(start=100, end=250).tolist() == list(range(200, 250))
+    buffer.discard_before(600)
+    assert not buffer.full and buffer.start == 600 and buffer.framed == 600
+    buffer.discard_before(400)  # never rewinds
+    assert buffer.start == 600
+    assert bytes(buffer) == pcm(600, 600)
+    buffer.clear()
+    assert buffer.start == buffer.end == buffer.framed == 1200
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.tools import audio_codecs
+from app.tools.audio_codecs import (
+    IMAADPCMDecoder, PCM16Decoder, ULawDecoder, _adpcm_decode, _ulaw_table, make_decoder,
+)
+
+ALL_BYTES = bytes(range(256))
+
+
+@pytest.fixture
+def no_audioop(monkeypatch):
+    """Force the NumPy / pure Python fallbacks (the only path on Python 3.13+)."""
+    monkeypatch.setattr(audio_codecs, "audioop", None)
+    monkeypatch.setattr(ULawDecoder, "_table", None)
+
+
+def test_make_decoder_picks_the_codec_case_insensitively():
+    assert make_decoder().name == "pcm16"
+    assert make_decoder("").name == "pcm16"
+    assert make_decoder("ULAW").name == "ulaw"
+    assert make_decoder("adpcm").name == "adpcm"
+
+
+def test_make_decoder_returns_a_fresh_decoder_per_session():
+    assert make_decoder("adpcm") is not make_decoder("adpcm")
+
+
+def test_make_decoder_rejects_unknown_codecs():
+    with pytest.raises(ValueError, match="Unsupported codec 'mp3'"):
+        make_decoder("mp3")
+
+
+def test_pcm16_passes_audio_through():
+    data = np.arange(-5, 5, dtype=np.int16).tobytes()
+    assert PCM16Decoder().decode(data) == data
+
+
+def test_ulaw_reference_values(no_audioop):
+    pcm = np.frombuffer(ULawDecoder().decode(bytes([0x00, 0x7F, 0x80, 0xFF])), dtype=np.int16)
+    assert pcm.tolist() == [-32124, 0, 32124, 0]
+
+
+def test_ulaw_decodes_one_sample_per_byte(no_audioop):
+    assert len(ULawDecoder().decode(ALL_BYTES)) == 2 * len(ALL_BYTES)
+
+
+def test_ulaw_fallback_matches_audioop():
+    audioop = pytest.importorskip("audioop")
+    expected = np.frombuffer(audioop.ulaw2lin(ALL_BYTES, 2), dtype=np.int16)
+    assert np.array_equal(_ulaw_table(), expected)
+
+
+def test_adpcm_carries_its_state_across_frames(no_audioop):
+    data = np.random.default_rng(0).integers(0, 256, 400, dtype=np.uint8).tobytes()
+    whole = IMAADPCMDecoder().decode(data)
+    decoder = IMAADPCMDecoder()
+    chunked = b"".join(decoder.decode(data[i:i + 37]) for i in range(0, len(data), 37))
+    assert chunked == whole
+    assert len(whole) == 4 * len(data)  # two 16-bit samples per byte
+
+
+def test_adpcm_fallback_matches_audioop():
+    audioop = pytest.importorskip("audioop")
+    data = np.random.default_rng(1).integers(0, 256, 1000, dtype=np.uint8).tobytes()
+    pcm, state = _adpcm_decode(data, None)
+    expected_pcm, expected_state = audioop.adpcm2lin(data, 2, None)
+    assert pcm == expected_pcm
+    assert state == tuple(expected_state)
+
+
+def test_adpcm_decodes_a_tone_round_trip():
+    audioop = pytest.importorskip("audioop")
+    tone = (8000 * np.sin(2 * np.pi * 440 * np.arange(1600) / 16000)).astype(np.int16)
+    encoded, _ = audioop.lin2adpcm(tone.tobytes(), 2, None)
+    decoded = np.frombuffer(IMAADPCMDecoder().decode(encoded), dtype=np.int16)
+    assert np.abs(decoded[200:].astype(np.int32) - tone[200:]).max() < 1000
@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.tools.audio_prep import AudioPreparer
+
+RATE = 16000
+
+
+def loud_regions(audio, model, sampling_rate, speech_pad_ms):
+    """Stand-in for silero's get_speech_timestamps: one region per run of non-zero samples."""
+    loud = np.concatenate([[0], (audio.numpy() != 0).astype(np.int8), [0]])
+    edges = np.flatnonzero(np.diff(loud))
+    return [{"start": int(s), "end": int(e)} for s, e in zip(edges[::2], edges[1::2])]
+
+
+def preparer():
+    return AudioPreparer(model=object(), get_speech_timestamps=loud_regions, audio_format="wav")
+
+
+def pcm(*parts):
+    """("speech" | "pause", seconds) pairs -> int16 PCM bytes."""
+    return np.concatenate([np.full(int(s * RATE), 1000 if kind == "speech" else 0, dtype=np.int16)
+                           for kind, s in parts]).tobytes()
+
+
+def seconds(wav):
+    return (len(wav) - 44) / 2 / RATE
+
+
+def test_long_pauses_do_not_count_towards_the_segment_length():
+    # 4 s of speech in total, spread over 40 s: one segment
+    segments = preparer().prepare_segments(
+        pcm(("speech", 1), ("pause", 12), ("speech", 1), ("pause", 12), ("speech", 2)), segment_s=10)
+    assert len(segments) == 1
+    assert abs(seconds(segments[0][0]) - (4 + 2 * 0.15)) < 0.01
+
+
+def test_segments_are_cut_at_pauses_once_the_speech_fills_one():
+    segments = preparer().prepare_segments(
+        pcm(("speech", 6), ("pause", 1), ("speech", 3), ("pause", 1), ("speech", 4)), segment_s=10)
+    assert [round(seconds(audio), 2) for audio, _ in segments] == [9.15, 4.0]
+    assert all(mime_type == "audio/wav" for _, mime_type in segments)
+
+
+def test_silence_gives_no_segments():
+    assert preparer().prepare_segments(pcm(("pause", 3))) == []
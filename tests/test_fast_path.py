@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("firebase_admin")  # tools.inspection_state -> tools.firebase_ops
+
+from google.adk.sessions import InMemorySessionService
+
+from app.tools.fast_path import FastPath, UtteranceParser
+from tools import inspection_state as inspection
+
+TIRES = "tires_wheels_stem_caps_lug_nuts"
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+def runner():
+    """Just what the fast path touches of an ADK Runner."""
+    return SimpleNamespace(app_name="app", agent=SimpleNamespace(name="generator"),
+                           session_service=InMemorySessionService())
+
+
+@pytest.mark.parametrize("text, components, status, comment", [
+    ("Tires good", [TIRES], "GREEN", ""),
+    ("the tyres and the fuel tank look fine", [TIRES, "fuel_tank"], "GREEN", ""),
+    ("engine oil seeping, monitor", ["engine_oil"], "YELLOW", "Seeping"),
+    ("cab air filter dirty", ["cab_air_filter"], "YELLOW", "Dirty"),
+    ("fuel tank failed", ["fuel_tank"], "RED", ""),
+])
+def test_component_utterances(text, components, status, comment):
+    parsed = UtteranceParser().parse(text)
+    assert parsed["intent"] == "component"
+    assert [key for _, key in parsed["components"]] == components
+    assert (parsed["status"], parsed["comment"]) == (status, comment)
+
+
+def test_bulk_green_section():
+    assert UtteranceParser().parse("whole ground section is OK") == {
+        "intent": "section", "sections": ["GROUND"], "status": "GREEN"}
+    assert UtteranceParser().parse("everything in the cab looks good")["sections"] == ["CAB_EXTERIOR", "CAB_INTERIOR"]
+
+
+@pytest.mark.parametrize("text", [
+    "tires good but the left front is cut",  # unknown content words
+    "oil looks good",                        # ambiguous component
+    "tires good fuel tank leaking",          # two statuses
+    "ground section failed",                 # bulk updates are GREEN only
+    "tires",                                 # no status
+    "",
+])
+def test_unsure_utterances_go_to_the_agent(text):
+    assert UtteranceParser().parse(text) is None
+
+
+def test_handled_turn_updates_state_and_history():
+    async def main():
+        r = runner()
+        reply = await FastPath(enabled=True).try_handle(r, "operator", "s1", "tires good")
+        session = await r.session_service.get_session(app_name="app", user_id="operator", session_id="s1")
+        return reply, session
+
+    reply, session = run(main())
+    assert reply == "Got it, tires good. What's next?"
+    assert inspection.get_component(session.state, "GROUND", TIRES) == {"status": "GREEN", "comments": ""}
+    assert [e.author for e in session.events] == ["user", "generator"]
+
+
+def test_bulk_green_keeps_flagged_items():
+    async def main():
+        r, fast_path = runner(), FastPath(enabled=True)
+        await fast_path.try_handle(r, "operator", "s1", "fuel tank leaking")
+        await fast_path.try_handle(r, "operator", "s1", "whole ground section is good")
+        session = await r.session_service.get_session(app_name="app", user_id="operator", session_id="s1")
+        return session.state
+
+    state = run(main())
+    assert inspection.get_component(state, "GROUND", "fuel_tank") == {"status": "RED", "comments": "Leaking"}
+    assert inspection.get_component(state, "GROUND", TIRES)["status"] == "GREEN"
+
+
+def test_flagged_items_get_the_session_photo():
+    uploads = []
+
+    def uploader(serial_number, component, frame_key):
+        uploads.append((serial_number, component, frame_key))
+        return {"success": True, "url": f"https://example.invalid/{component}.jpg"}
+
+    async def main():
+        r = runner()
+        reply = await FastPath(photo_uploader=uploader, enabled=True).try_handle(r, "operator", "s1", "fuel tank failed")
+        session = await r.session_service.get_session(app_name="app", user_id="operator", session_id="s1")
+        return reply, session.state
+
+    reply, state = run(main())
+    assert reply == "Noted, fuel tank marked fail. What's the reason?"
+    assert uploads == [("unknown", "fuel_tank", ("operator", "s1"))]
+    assert state[inspection.photo_key("fuel_tank")] == "https://example.invalid/fuel_tank.jpg"
+
+
+def test_submitted_or_disabled_sessions_fall_through():
+    async def main():
+        r = runner()
+        session = await r.session_service.create_session(
+            app_name="app", user_id="operator", session_id="done", state={"inspection.report_id": "r1"})
+        submitted = await FastPath(enabled=True).try_handle(r, "operator", session.id, "tires good")
+        disabled = await FastPath(enabled=False).try_handle(r, "operator", "s2", "tires good")
+        return submitted, disabled
+
+    assert run(main()) == (None, None)
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from tools.frame_store import ANONYMOUS, FrameStore
+
+ALICE = ("operator", "sess_alice")
+BOB = ("operator", "sess_bob")
+
+
+def test_sessions_never_see_each_others_frames():
+    store = FrameStore(shared=False)
+    store.put(ALICE, b"alice")
+    store.put(ANONYMOUS, b"anonymous")
+    assert store.latest(ALICE).data == b"alice"
+    assert store.latest(BOB) is None
+    assert store.latest(ANONYMOUS).data == b"anonymous"
+
+
+def test_anonymous_fallback_is_opt_in():
+    store = FrameStore(shared=False, anonymous_fallback=True)
+    store.put(ANONYMOUS, b"anonymous")
+    assert store.latest(BOB).data == b"anonymous"
+    store.put(BOB, b"bob")
+    assert store.latest(BOB).data == b"bob"
+
+
+def test_reads_only_see_fresh_frames():
+    store = FrameStore(shared=False, max_age_s=5, ttl_s=600)
+    frame = store.put(ALICE, b"old")
+    frame.received_at = time.time() - 30  # kept for the TTL, but too old to be "current"
+    assert store.latest(ALICE) is None
+    assert store.as_dict()["stale_reads"] == 1
+    store.put(ALICE, b"new")
+    assert store.latest(ALICE).data == b"new"
+
+
+def test_latest_frame_replaces_the_previous_one():
+    store = FrameStore(shared=False)
+    first = store.put(ALICE, b"one")
+    second = store.put(ALICE, b"two")
+    assert second.seq > first.seq
+    assert store.latest(ALICE).data == b"two"
+    assert store.as_dict()["superseded"] == 1
+
+
+def test_shared_frames_are_seen_by_other_workers(tmp_path):
+    # Two stores stand in for two gunicorn workers sharing FRAME_SHARED_DIR
+    upload_worker = FrameStore(shared=True, shared_dir=str(tmp_path))
+    turn_worker = FrameStore(shared=True, shared_dir=str(tmp_path))
+
+    async def upload(data):
+        return await upload_worker.aput(ALICE, data)
+
+    asyncio.run(upload(b"first"))
+    assert turn_worker.latest(ALICE).data == b"first"
+    asyncio.run(upload(b"second"))
+    assert turn_worker.latest(ALICE).data == b"second"
+    assert turn_worker.latest(BOB) is None
+    # Reads on one worker pace the uploads handled by another
+    assert upload_worker.read_rate(ALICE)[1] is not None
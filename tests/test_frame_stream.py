@@ -0,0 +1,40 @@
+import pytest
+
+from tools.frame_stream import LENGTH, FrameUnpacker
+
+
+def packed(*frames) -> bytes:
+    return b"".join(LENGTH.pack(len(f)) + f for f in frames)
+
+
+def test_several_frames_in_one_message():
+    assert FrameUnpacker().feed(packed(b"one", b"two", b"three")) == [b"one", b"two", b"three"]
+
+
+def test_frame_split_across_messages():
+    unpacker = FrameUnpacker()
+    data = packed(b"first frame", b"second")
+    assert unpacker.feed(data[:2]) == []  # partial length prefix
+    assert unpacker.feed(data[2:9]) == []
+    assert unpacker.feed(data[9:20]) == [b"first frame"]
+    assert unpacker.feed(data[20:]) == [b"second"]
+
+
+def test_incomplete_tail_is_kept_for_the_next_message():
+    unpacker = FrameUnpacker()
+    data = packed(b"a", b"bb")
+    assert unpacker.feed(data[:-1]) == [b"a"]
+    assert unpacker.feed(data[-1:]) == [b"bb"]
+    assert unpacker.feed(b"") == []
+
+
+def test_zero_length_is_rejected():
+    with pytest.raises(ValueError, match="Invalid frame length 0"):
+        FrameUnpacker().feed(LENGTH.pack(0))
+
+
+def test_oversized_frame_is_rejected_before_it_is_buffered():
+    unpacker = FrameUnpacker(max_bytes=8)
+    assert unpacker.feed(packed(b"12345678")) == [b"12345678"]
+    with pytest.raises(ValueError, match="Invalid frame length 9"):
+        unpacker.feed(LENGTH.pack(9))
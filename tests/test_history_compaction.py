@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("firebase_admin")  # tools.inspection_state -> tools.firebase_ops
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from app.tools.history_compaction import HistoryCompactor
+from app.tools.session_store import PersistentSessionService
+from tools import inspection_state as inspection
+
+COMPONENTS = ["fuel_tank", "air_tank", "hydraulic_tank", "steps_handholds", "underneath_machine", "loader_frame_arms"]
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+def runner(db_path):
+    return SimpleNamespace(app_name="app", agent=SimpleNamespace(name="generator"),
+                           session_service=PersistentSessionService(db_path=db_path))
+
+
+async def inspect(r, components):
+    """One user turn and one agent reply per component, the reply recording it GREEN."""
+    service = r.session_service
+    session = await service.get_session(app_name="app", user_id="u", session_id="s") \
+        or await service.create_session(app_name="app", user_id="u", session_id="s")
+    for key in components:
+        await service.append_event(session, Event(
+            invocation_id=key, author="user",
+            content=types.Content(role="user", parts=[types.Part(text=f"{key} good " * 20)])))
+        delta = {}
+        inspection.set_component(delta, "GROUND", key, "GREEN")
+        await service.append_event(session, Event(
+            invocation_id=key, author="generator", actions=EventActions(state_delta=delta),
+            content=types.Content(role="model", parts=[types.Part(text=f"Got it, {key} good.")])))
+
+
+def texts(session):
+    return [e.content.parts[0].text for e in session.events]
+
+
+def test_history_under_the_budget_is_left_alone(tmp_path):
+    async def main():
+        r = runner(str(tmp_path / "sessions.db"))
+        await inspect(r, COMPONENTS[:2])
+        return await HistoryCompactor(budget_tokens=10_000, keep_turns=1).maybe_compact(r, "u", "s")
+
+    assert run(main()) is False
+
+
+def test_compaction_keeps_the_last_turns_behind_a_summary_across_a_reload(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+
+    async def compact():
+        r = runner(db_path)
+        await inspect(r, COMPONENTS)
+        compactor = HistoryCompactor(budget_tokens=100, keep_turns=2)
+        return await compactor.maybe_compact(r, "u", "s"), compactor.as_dict()
+
+    async def reload():
+        return await runner(db_path).session_service.get_session(app_name="app", user_id="u", session_id="s")
+
+    compacted, stats = run(compact())
+    session = run(reload())
+    assert compacted and stats["compactions"] == 1 and stats["events_dropped"] == 8
+    assert len(session.events) == 5
+    assert texts(session)[0].startswith("[Earlier conversation compacted.")
+    assert "Recorded: 6 GREEN, 0 YELLOW, 0 RED." in texts(session)[0]
+    assert texts(session)[1:] == [f"{key} good " * 20 for key in COMPONENTS[4:5]] + [
+        f"Got it, {COMPONENTS[4]} good.", f"{COMPONENTS[5]} good " * 20, f"Got it, {COMPONENTS[5]} good."]
+    # The dropped events' state deltas were folded into the session row
+    assert all(inspection.get_component(session.state, "GROUND", key) for key in COMPONENTS)
+
+
+def test_a_second_compaction_replaces_the_first_summary(tmp_path):
+    async def main():
+        r = runner(str(tmp_path / "sessions.db"))
+        compactor = HistoryCompactor(budget_tokens=100, keep_turns=1)
+        await inspect(r, COMPONENTS[:3])
+        await compactor.maybe_compact(r, "u", "s")
+        await inspect(r, COMPONENTS[3:])
+        await compactor.maybe_compact(r, "u", "s")
+        return await runner(str(tmp_path / "sessions.db")).session_service.get_session(
+            app_name="app", user_id="u", session_id="s")
+
+    session = run(main())
+    summaries = [t for t in texts(session) if t.startswith("[Earlier conversation compacted.")]
+    assert len(summaries) == 1 and len(session.events) == 3
+    assert "Recorded: 6 GREEN" in summaries[0]
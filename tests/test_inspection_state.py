@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("firebase_admin")  # tools.inspection_state -> tools.firebase_ops
+
+from tools import inspection_state as inspection
+
+TIRES = "tires_wheels_stem_caps_lug_nuts"
+
+
+def test_components_resolve_with_or_without_their_section():
+    assert inspection.resolve_component("Fuel Tank") == ("GROUND", "fuel_tank")
+    assert inspection.resolve_component("handholds", "cab exterior") == ("CAB_EXTERIOR", "handholds")
+    assert inspection.resolve_component("flux_capacitor") == (None, None)
+    assert inspection.normalize_status(" yellow ") == "YELLOW"
+    assert inspection.normalize_status("amber") is None
+
+
+def test_every_field_is_its_own_state_key():
+    state = {}
+    inspection.set_component(state, "GROUND", TIRES, "GREEN")
+    inspection.set_header(state, "serial_number", "CAT0950M")
+    assert state == {f"inspection.sections.GROUND.{TIRES}": {"status": "GREEN", "comments": ""},
+                     "inspection.header.serial_number": "CAT0950M"}
+    assert inspection.get_component(state, "GROUND", TIRES)["status"] == "GREEN"
+    assert inspection.get_component(state, "GROUND", "fuel_tank") is None
+
+
+def test_progress_tracks_recorded_flagged_and_remaining_items():
+    state = {}
+    total = sum(len(keys) for keys in inspection.SECTIONS.values())
+    inspection.set_component(state, "GROUND", TIRES, "GREEN")
+    inspection.set_component(state, "GROUND", "fuel_tank", "RED")
+    inspection.set_component(state, "ENGINE", "engine_oil", "YELLOW", "Seeping")
+    summary = inspection.progress(state)
+    assert summary["recorded"] == {"GREEN": 1, "YELLOW": 1, "RED": 1}
+    assert summary["flagged"] == {"fuel_tank": "RED: (comment needed)", "engine_oil": "YELLOW: Seeping"}
+    assert summary["remaining_count"] == total - 3
+    assert "fuel_tank" not in summary["remaining"]["GROUND"]
+    assert inspection.missing_comments(state) == ["fuel_tank"]
+
+
+def test_report_fills_unrecorded_items_and_collects_photos():
+    state = {}
+    inspection.set_component(state, "GROUND", "fuel_tank", "RED", "Leaking")
+    inspection.set_header(state, "serial_number", "CAT0950M")
+    state[inspection.photo_key("fuel_tank")] = "https://example.invalid/fuel.jpg"
+    report = inspection.build_report(state)
+    assert report["header"]["serial_number"] == "CAT0950M"
+    assert report["header"]["machine_hours"] == 0
+    assert report["sections"]["GROUND"]["fuel_tank"] == {"status": "RED", "comments": "Leaking"}
+    assert report["sections"]["GROUND"][TIRES] == {"status": "YELLOW", "comments": "DID NOT RECORD"}
+    assert set(report["sections"]) == set(inspection.SECTIONS)
+    assert inspection.photo_links(state) == {"fuel_tank": "https://example.invalid/fuel.jpg"}
@@ -0,0 +1,23 @@
+from tools.registry import ModelRegistry
+
+
+def broken():
+    raise RuntimeError("no credentials")
+
+
+def test_non_critical_failure_degrades_without_blocking_readiness():
+    registry = ModelRegistry()
+    registry.register("silero_vad", lambda: "model")
+    registry.register("firestore", broken, critical=False, per_process=True)
+    registry.load_all()
+    assert registry.ready
+    assert registry.degraded == ["firestore"]
+    assert registry.status()["firestore"]["status"] == "error"
+
+
+def test_critical_failure_blocks_readiness():
+    registry = ModelRegistry()
+    registry.register("silero_vad", broken)
+    registry.load_all()
+    assert not registry.ready
+    assert registry.degraded == []
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from app.tools.review_cache import ReviewCache, names_serials, normalize_query
+
+HISTORY = [("fetch_machine_history", {"serial_number": "CAT-0950M"})]
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+def cache(versions=None, **kwargs):
+    versions = {} if versions is None else versions
+    return ReviewCache(lambda serial: versions.get(serial, 1), **kwargs), versions
+
+
+def test_questions_are_normalized():
+    assert normalize_query("  What's the STATUS of CAT-0950M?? ") == "what s the status of cat-0950m"
+
+
+@pytest.mark.parametrize("query, serials, named", [
+    ("How are the tires on CAT-0950M?", ["CAT-0950M"], True),
+    ("compare cat-0950m and CAT-0777", ["CAT-0950M", "CAT-0777"], True),
+    ("compare CAT-0950M with the other one", ["CAT-0950M", "CAT-0777"], False),
+    ("what about its tires?", ["CAT-0950M"], False),
+    ("status of CAT-0950M2", ["CAT-0950M"], False),  # a longer serial is not this one
+    ("status of XCAT-0950M", ["CAT-0950M"], False),
+])
+def test_a_question_must_name_every_serial_it_read(query, serials, named):
+    assert names_serials(query, serials) is named
+
+
+def test_self_contained_answers_are_shared():
+    async def main():
+        reviews, _ = cache()
+        await reviews.put("How are the tires on CAT-0950M?", "All green.", HISTORY)
+        return await reviews.get("how are the tires on cat-0950m"), reviews.as_dict()
+
+    answer, stats = run(main())
+    assert answer == "All green."
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_context_dependent_write_and_history_free_turns_are_not_cached():
+    async def main():
+        reviews, _ = cache()
+        await reviews.put("Give me an executive summary", "CAT-0950M is fine.", HISTORY)
+        await reviews.put("Mark CAT-0950M tires red", "Done.",
+                          HISTORY + [("update_past_report", {"serial_number": "CAT-0950M"})])
+        await reviews.put("What does YELLOW mean?", "Monitor.", [])
+        await reviews.put("How is CAT-0950M?", "", HISTORY)
+        return reviews.as_dict()["entries"]
+
+    assert run(main()) == 0
+
+
+def test_a_new_inspection_invalidates_the_answer():
+    async def main():
+        reviews, versions = cache()
+        await reviews.put("How is CAT-0950M?", "Fine.", HISTORY)
+        versions["CAT-0950M"] = 2  # save_inspection_report bumped the history version
+        return await reviews.get("How is CAT-0950M?"), reviews.as_dict()
+
+    answer, stats = run(main())
+    assert answer is None
+    assert (stats["entries"], stats["stale"], stats["misses"]) == (0, 1, 1)
+
+
+def test_expired_and_least_recent_entries_are_dropped():
+    async def main():
+        reviews, _ = cache(max_entries=2)
+        for serial in ("CAT-1", "CAT-2", "CAT-3"):
+            await reviews.put(f"How is {serial}?", serial, [("fetch_machine_history", {"serial_number": serial})])
+        kept = [await reviews.get(f"How is {serial}?") for serial in ("CAT-1", "CAT-2", "CAT-3")]
+        expiring, _ = cache(ttl_s=0)
+        await expiring.put("How is CAT-0950M?", "Fine.", HISTORY)
+        await asyncio.sleep(0.01)
+        return kept, await expiring.get("How is CAT-0950M?")
+
+    kept, expired = run(main())
+    assert kept == [None, "CAT-2", "CAT-3"]
+    assert expired is None
@@ -0,0 +1,215 @@
+import asyncio
+
+from app.tools.session_queue import SessionWorkQueue
+
+KEY = ("operator", "sess_1")
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+def recorder(log):
+    """work(text) factory: logs the turn and answers "<text>#<turn number>"."""
+    def work(text, delay=0.01):
+        async def turn():
+            log.append(text)
+            await asyncio.sleep(delay)
+            return f"{text}#{len(log)}"
+        return turn
+    return work
+
+
+def test_turns_of_a_session_run_in_order_one_at_a_time():
+    log, running, overlap = [], set(), []
+
+    def work(text):
+        async def turn():
+            overlap.append(bool(running))
+            running.add(text)
+            log.append(text)
+            await asyncio.sleep(0.01)
+            running.discard(text)
+            return text
+        return turn
+
+    async def main():
+        queue = SessionWorkQueue()
+        return await asyncio.gather(*(queue.submit(KEY, t, work(t)) for t in ("a", "b", "c")))
+
+    assert run(main()) == ["a", "b", "c"]
+    assert log == ["a", "b", "c"]
+    assert not any(overlap)
+
+
+def test_sessions_run_concurrently():
+    async def main():
+        queue = SessionWorkQueue()
+        both_started = asyncio.Event()
+        started = []
+
+        def work(name):
+            async def turn():
+                started.append(name)
+                if len(started) == 2:
+                    both_started.set()
+                await both_started.wait()  # deadlocks if the sessions were serialized
+                return name
+            return turn
+
+        return await asyncio.gather(queue.submit(("u", "s1"), "x", work("s1")),
+                                    queue.submit(("u", "s2"), "x", work("s2")))
+
+    assert run(main()) == ["s1", "s2"]
+
+
+def test_repeated_text_is_not_merged_with_an_older_turn():
+    # "yes", "tires good", "yes": the second "yes" answers a different question
+    log = []
+    work = recorder(log)
+
+    async def main():
+        queue = SessionWorkQueue()
+        return await asyncio.gather(*(queue.submit(KEY, t, work(t)) for t in ("yes", "tires good", "yes")))
+
+    assert run(main()) == ["yes#1", "tires good#2", "yes#3"]
+    assert log == ["yes", "tires good", "yes"]
+
+
+def test_double_send_merges_with_the_newest_queued_turn():
+    log = []
+    work = recorder(log)
+
+    async def main():
+        queue = SessionWorkQueue()
+        first = asyncio.create_task(queue.submit(KEY, "start", work("start", delay=0.05)))
+        await asyncio.sleep(0)
+        results = await asyncio.gather(queue.submit(KEY, "Tires  good", work("tires good")),
+                                       queue.submit(KEY, "tires good", work("tires good")))
+        return await first, results, queue.deduplicated
+
+    first, results, deduplicated = run(main())
+    assert first == "start#1"
+    assert results == ["tires good#2", "tires good#2"]
+    assert log == ["start", "tires good"]
+    assert deduplicated == 1
+
+
+def test_same_text_after_the_dedup_window_runs_again():
+    log = []
+    work = recorder(log)
+
+    async def main():
+        queue = SessionWorkQueue(text_dedup_window_s=0)
+        first = asyncio.create_task(queue.submit(KEY, "start", work("start", delay=0.05)))
+        await asyncio.sleep(0.01)
+        results = await asyncio.gather(queue.submit(KEY, "yes", work("yes")),
+                                       queue.submit(KEY, "yes", work("yes")))
+        await first
+        return results
+
+    assert run(main()) == ["yes#2", "yes#3"]
+
+
+def test_retry_with_the_same_request_id_shares_the_first_run():
+    log = []
+    work = recorder(log)
+
+    async def main():
+        queue = SessionWorkQueue()
+        concurrent = await asyncio.gather(queue.submit(KEY, "hello", work("hello"), request_id="r1"),
+                                          queue.submit(KEY, "hello", work("hello"), request_id="r1"))
+        late_retry = await queue.submit(KEY, "hello", work("hello"), request_id="r1")
+        fresh = await queue.submit(KEY, "hello", work("hello"), request_id="r2")
+        return concurrent, late_retry, fresh
+
+    concurrent, late_retry, fresh = run(main())
+    assert concurrent == ["hello#1", "hello#1"]
+    assert late_retry == "hello#1"
+    assert fresh == "hello#2"
+    assert log == ["hello", "hello"]
+
+
+def test_queued_turn_of_a_disconnected_caller_is_dropped():
+    log = []
+    work = recorder(log)
+
+    async def gone():
+        return True
+
+    async def main():
+        queue = SessionWorkQueue()
+        first = asyncio.create_task(queue.submit(KEY, "a", work("a", delay=0.05)))
+        await asyncio.sleep(0)
+        stale = asyncio.create_task(queue.submit(KEY, "b", work("b"), abandoned=gone))
+        await asyncio.sleep(0)
+        latest = await queue.submit(KEY, "c", work("c"))
+        await first
+        return latest, await asyncio.gather(stale, return_exceptions=True), queue.cancelled_obsolete
+
+    latest, (stale,), cancelled = run(main())
+    assert latest == "c#2"
+    assert isinstance(stale, asyncio.CancelledError)
+    assert cancelled == 1
+    assert log == ["a", "c"]
+
+
+def test_submit_while_the_queue_drains_is_not_orphaned():
+    # The session's worker finishes and drops its drained queue while a new submit is still
+    # awaiting the obsolescence check of a queued entry; the new turn must still run.
+    log = []
+    work = recorder(log)
+    checks = []
+
+    async def slow_first_check():
+        checks.append(1)
+        if len(checks) == 1:
+            await asyncio.sleep(0.1)
+        return False
+
+    async def main():
+        queue = SessionWorkQueue()
+        first = asyncio.create_task(queue.submit(KEY, "a", work("a")))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(queue.submit(KEY, "b", work("b"), abandoned=slow_first_check))
+        await asyncio.sleep(0)
+        late = await queue.submit(KEY, "c", work("c"))
+        return await first, await queued, late, queue.as_dict()
+
+    first, queued, late, stats = run(main())
+    assert (first, queued, late) == ("a#1", "b#2", "c#3")
+    assert stats["active_sessions"] == 0 and stats["queued"] == 0
+
+
+def test_slot_holds_the_session_turn():
+    log = []
+    work = recorder(log)
+
+    async def main():
+        queue = SessionWorkQueue()
+        async with queue.slot(KEY):
+            turn = asyncio.create_task(queue.submit(KEY, "a", work("a")))
+            await asyncio.sleep(0.02)
+            log.append("slot")
+        return await turn
+
+    assert run(main()) == "a#2"
+    assert log == ["slot", "a"]
+
+
+def test_request_result_is_shared_through_the_store(tmp_path):
+    # Two queues stand in for two workers sharing one session DB
+    from app.tools.session_store import PersistentSessionService
+
+    log = []
+    work = recorder(log)
+
+    async def main():
+        store = PersistentSessionService(db_path=str(tmp_path / "sessions.db"), shared=True)
+        first, second = SessionWorkQueue(store=store), SessionWorkQueue(store=store)
+        answer = await first.submit(KEY, "hello", work("hello"), request_id="r1")
+        retried = await second.submit(KEY, "hello", work("hello"), request_id="r1")
+        return answer, retried
+
+    assert run(main()) == ("hello#1", "hello#1")
+    assert log == ["hello"]
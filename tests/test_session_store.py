@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import time
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from app.tools import session_store
+from app.tools.session_store import PersistentSessionService
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+def store(tmp_path, **kwargs):
+    return PersistentSessionService(db_path=str(tmp_path / "sessions.db"), **kwargs)
+
+
+def event(text, **state_delta):
+    return Event(author="user", invocation_id="inv",
+                 content=types.Content(role="user", parts=[types.Part(text=text)]),
+                 actions=EventActions(state_delta=state_delta))
+
+
+def texts(session):
+    return [e.content.parts[0].text for e in session.events]
+
+
+def test_sessions_survive_a_restart(tmp_path):
+    async def write():
+        sessions = store(tmp_path)
+        session = await sessions.create_session(app_name="app", user_id="u", session_id="s",
+                                                state={"serial": "CAT123", "temp:draft": 1})
+        await sessions.append_event(session, event("tires good", tires="GREEN"))
+        await sessions.append_event(session, event("fuel tank leaking", fuel="RED", **{"temp:scratch": 2}))
+
+    async def read():
+        return await store(tmp_path).get_session(app_name="app", user_id="u", session_id="s")
+
+    run(write())
+    session = run(read())
+    assert texts(session) == ["tires good", "fuel tank leaking"]
+    assert session.state == {"serial": "CAT123", "tires": "GREEN", "fuel": "RED"}
+
+
+def test_hot_tier_is_bounded(tmp_path):
+    async def main():
+        sessions = store(tmp_path, cache_size=2)
+        for sid in ("a", "b", "c"):
+            await sessions.create_session(app_name="app", user_id="u", session_id=sid)
+        evicted = await sessions.get_session(app_name="app", user_id="u", session_id="a")
+        return list(sessions._hot), evicted
+
+    hot, evicted = run(main())
+    assert [key[2] for key in hot] == ["c", "a"]
+    assert evicted is not None and evicted.id == "a"  # reloaded from disk
+
+
+def test_idle_sessions_are_swept(tmp_path):
+    async def main():
+        sessions = store(tmp_path, ttl_hours=1, sweep_interval_s=0)
+        old = await sessions.create_session(app_name="app", user_id="u", session_id="old")
+        old.last_update_time = time.time() - 7200
+        await sessions.append_event(old, event("hello").model_copy(update={"timestamp": time.time() - 7200}))
+        await sessions.create_session(app_name="app", user_id="u", session_id="new")
+        listed = await sessions.list_sessions(app_name="app", user_id="u")
+        return sorted(s.id for s in listed.sessions), await sessions.get_session(
+            app_name="app", user_id="u", session_id="old")
+
+    ids, old = run(main())
+    assert ids == ["new"] and old is None
+
+
+def test_hot_copy_is_refreshed_after_another_worker_appends(tmp_path):
+    async def main():
+        first, second = store(tmp_path, shared=True), store(tmp_path, shared=True)
+        session = await first.create_session(app_name="app", user_id="u", session_id="s")
+        cached = await second.get_session(app_name="app", user_id="u", session_id="s")
+        await first.append_event(session, event("tires good", tires="GREEN"))
+        return cached, await second.get_session(app_name="app", user_id="u", session_id="s")
+
+    cached, fresh = run(main())
+    assert texts(cached) == []
+    assert texts(fresh) == ["tires good"] and fresh.state == {"tires": "GREEN"}
+
+
+async def overlapping(store, keys):
+    """Holds turn_lock for each key concurrently; returns how many holders ever overlapped."""
+    holders, overlaps = [], []
+
+    async def turn(key):
+        async with store.turn_lock(key):
+            overlaps.append(len(holders))
+            holders.append(key)
+            await asyncio.sleep(0.01)
+            holders.remove(key)
+
+    await asyncio.gather(*(turn(k) for k in keys))
+    return max(overlaps)
+
+
+def test_turn_lock_serializes_a_session_within_one_worker(tmp_path):
+    store = PersistentSessionService(db_path=str(tmp_path / "sessions.db"), shared=True)
+    key = ("app", "operator", "sess_1")
+    assert run(overlapping(store, [key] * 3)) == 0
+    assert not store._byte_locks
+
+
+def test_turn_lock_serializes_keys_whose_offsets_collide(tmp_path, monkeypatch):
+    same_byte = hashlib.sha1(b"same byte").digest()
+
+    class Colliding:
+        def __init__(self, data):
+            pass
+
+        def digest(self):
+            return same_byte
+
+    monkeypatch.setattr(session_store.hashlib, "sha1", Colliding)
+    store = PersistentSessionService(db_path=str(tmp_path / "sessions.db"), shared=True)
+    assert run(overlapping(store, [("app", "u", "a"), ("app", "u", "b")])) == 0
+
+
+def test_turn_lock_lets_other_sessions_run_concurrently(tmp_path):
+    store = PersistentSessionService(db_path=str(tmp_path / "sessions.db"), shared=True)
+    assert run(overlapping(store, [("app", "u", "a"), ("app", "u", "b")])) == 1
@@ -0,0 +1,122 @@
+import asyncio
+
+from app.tools.stt import PartialTranscriber, SpeculationStats, SpeculativeTranscriber
+
+SECOND = 16000 * 2  # bytes of 16 kHz int16 PCM
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+def fake_stt(log, delay=0.0, fail=False):
+    async def transcribe_pcm(pcm):
+        log.append(len(pcm))
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("shed")
+        return f"{len(pcm) / SECOND:.1f}s"
+    return transcribe_pcm
+
+
+def test_partials_are_paced_and_numbered():
+    async def main():
+        calls, sent = [], []
+
+        async def send_json(message):
+            sent.append(message)
+
+        partials = PartialTranscriber(fake_stt(calls), send_json, interval_s=0.05, min_audio_s=0.5)
+        partials.reset()
+        partials.maybe_emit(bytearray(SECOND))  # before the first interval: nothing
+        await asyncio.sleep(0.06)
+        partials.maybe_emit(bytearray(SECOND // 4))  # too little audio yet
+        partials.maybe_emit(bytearray(SECOND))
+        partials.maybe_emit(bytearray(2 * SECOND))  # one partial in flight at a time
+        await asyncio.sleep(0.06)
+        partials.maybe_emit(bytearray(2 * SECOND))
+        await partials._task
+        return calls, sent
+
+    calls, sent = run(main())
+    assert calls == [SECOND, 2 * SECOND]
+    assert [(m["text"], m["seq"], m["type"]) for m in sent] == [("1.0s", 1, "partial"), ("2.0s", 2, "partial")]
+
+
+def test_close_drops_the_in_flight_partial():
+    async def main():
+        calls, sent = [], []
+
+        async def send_json(message):
+            sent.append(message)
+
+        partials = PartialTranscriber(fake_stt(calls, delay=1), send_json, interval_s=0)
+        partials.maybe_emit(bytearray(SECOND))
+        await asyncio.sleep(0)
+        await partials.close()
+        await asyncio.sleep(0)
+        return calls, sent
+
+    calls, sent = run(main())
+    assert calls == [SECOND] and sent == []
+
+
+def test_failed_partial_is_silent():
+    async def main():
+        sent = []
+
+        async def send_json(message):
+            sent.append(message)
+
+        partials = PartialTranscriber(fake_stt([], fail=True), send_json, interval_s=0)
+        partials.maybe_emit(bytearray(SECOND))
+        await partials._task
+        return sent
+
+    assert run(main()) == []
+
+
+def test_speculation_is_handed_over_when_silence_is_confirmed():
+    async def main():
+        calls, stats = [], SpeculationStats()
+        speculation = SpeculativeTranscriber(fake_stt(calls, delay=0.01), stats=stats)
+        assert await speculation.take() is None
+        speculation.start(bytearray(SECOND))
+        assert speculation.active
+        text = await speculation.take()
+        return text, speculation.active, stats.as_dict()
+
+    text, active, stats = run(main())
+    assert text == "1.0s" and not active
+    assert (stats["started"], stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0, 1.0)
+
+
+def test_resumed_speech_cancels_the_speculation():
+    async def main():
+        calls, stats = [], SpeculationStats()
+        speculation = SpeculativeTranscriber(fake_stt(calls, delay=1), stats=stats)
+        speculation.start(bytearray(SECOND))
+        await asyncio.sleep(0)
+        await speculation.cancel()
+        speculation.start(bytearray(2 * SECOND))  # the next pause of the same utterance
+        text = await asyncio.wait_for(speculation.take(), timeout=2)
+        await speculation.cancel(miss=False)  # nothing left to cancel
+        return calls, text, stats.as_dict()
+
+    calls, text, stats = run(main())
+    assert calls == [SECOND, 2 * SECOND] and text == "2.0s"
+    assert (stats["started"], stats["hits"], stats["misses"]) == (2, 1, 1)
+    assert stats["miss_rate"] == 0.5
+
+
+def test_restarting_replaces_the_running_speculation():
+    async def main():
+        speculation = SpeculativeTranscriber(fake_stt([], delay=0.01), stats=SpeculationStats())
+        speculation.start(bytearray(SECOND))
+        first = speculation._task
+        speculation.start(bytearray(3 * SECOND))
+        text = await speculation.take()
+        await asyncio.sleep(0)
+        return first.cancelled(), text
+
+    assert run(main()) == (True, "3.0s")
@@ -0,0 +1,104 @@
+import math
+
+import pytest
+
+pytest.importorskip("firebase_admin")  # tools.inspection_state -> tools.firebase_ops
+
+from tools.trends import COMPONENTS, MISSING, STATUS_CODES, analyze_history, status_matrix
+
+TIRES = "tires_wheels_stem_caps_lug_nuts"
+FUEL = "fuel_tank"
+
+
+def report(timestamp, hours=None, **components):
+    items = {}
+    for key, value in components.items():
+        status, _, comment = value.partition(":")
+        items[key] = {"status": status, "comments": comment}
+    return {"header": {"timestamp": timestamp, "machine_hours": hours}, "sections": {"GROUND": items}}
+
+
+def test_empty_history():
+    assert analyze_history([]) == {"reports": 0}
+
+
+def test_status_matrix_marks_unrecorded_components_missing():
+    matrix, times, hours = status_matrix([report("2024-01-01T08:00:00", 1000, **{TIRES: "RED"})])
+    row = COMPONENTS.index(TIRES)
+    assert matrix[row, 0] == STATUS_CODES["RED"]
+    assert matrix[COMPONENTS.index(FUEL), 0] == MISSING
+    assert hours[0] == 1000.0 and not math.isnan(times[0])
+
+
+def test_did_not_record_placeholder_is_missing_not_yellow():
+    matrix, _, _ = status_matrix([report("2024-01-01", 1000, **{TIRES: "YELLOW:DID NOT RECORD"})])
+    assert matrix[COMPONENTS.index(TIRES), 0] == MISSING
+
+    summary = analyze_history([
+        report("2024-01-01", 1000, **{TIRES: "GREEN"}),
+        report("2024-02-01", 1100, **{TIRES: "YELLOW:DID NOT RECORD"}),
+        report("2024-03-01", 1200, **{TIRES: "GREEN"}),
+    ])
+    assert summary["components"] == {}
+    assert summary["current"]["YELLOW"] == 0
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (1200, 1200.0), ("1200", 1200.0), ("1,200 hrs", 1200.0), ("1200.5 h", 1200.5), (None, None), ("n/a", None),
+])
+def test_machine_hours_are_parsed_defensively(raw, expected):
+    _, _, hours = status_matrix([report("2024-01-01", raw)])
+    assert (math.isnan(hours[0]) if expected is None else hours[0] == expected)
+
+
+def test_degradation_streak_and_hours_since_green():
+    # Reports arrive out of order; the analysis sorts them by timestamp
+    summary = analyze_history([
+        report("2024-03-01", "1,300 hrs", **{TIRES: "RED:cut in the sidewall", FUEL: "GREEN"}),
+        report("2024-01-01", 1000, **{TIRES: "GREEN", FUEL: "GREEN"}),
+        report("2024-02-01", 1150, **{TIRES: "YELLOW", FUEL: "GREEN"}),
+    ])
+    assert summary["reports"] == 3
+    assert summary["from"] == "2024-01-01" and summary["to"] == "2024-03-01"
+    assert summary["machine_hours"] == {"first": 1000.0, "latest": 1300.0}
+    assert summary["newly_degraded"] == [TIRES]
+    assert summary["always_green"] == 1
+    assert list(summary["components"]) == [TIRES]
+
+    tires = summary["components"][TIRES]
+    assert tires["status"] == "RED"
+    assert tires["trend"] == "degrading"
+    assert tires["degradations"] == 2 and tires["improvements"] == 0
+    assert tires["streak"] == 1
+    assert tires["hours_since_green"] == 300.0
+    assert tires["non_green_share"] == 0.67
+    assert tires["latest_comment"] == "cut in the sidewall"
+    assert "never_green" not in tires
+
+
+def test_gaps_carry_the_last_recorded_status_forward():
+    summary = analyze_history([
+        report("2024-01-01", 1000, **{TIRES: "YELLOW"}),
+        report("2024-02-01", 1100),
+        report("2024-03-01", 1200, **{TIRES: "GREEN"}),
+    ])
+    tires = summary["components"][TIRES]
+    assert tires["status"] == "GREEN"
+    assert tires["trend"] == "improving"
+    assert tires["improvements"] == 1
+    assert "never_green" not in tires
+    assert tires["non_green_share"] == 0.5  # 1 of the 2 recorded inspections
+
+
+def test_component_filter_reports_a_green_component_too():
+    summary = analyze_history([report("2024-01-01", 1000, **{FUEL: "GREEN"})], component=FUEL)
+    assert summary["components"][FUEL]["status"] == "GREEN"
+    assert analyze_history([report("2024-01-01", 1000)], component="not_a_component")["components"] == {}
+
+
+def test_reports_without_a_header_are_summarized():
+    headerless = {"sections": {"GROUND": {TIRES: {"status": "RED", "comments": ""}}}}
+    summary = analyze_history([headerless, report("2024-01-01", 1000, **{TIRES: "GREEN"})])
+    assert summary["reports"] == 2
+    assert None in (summary["from"], summary["to"])
+    assert analyze_history([headerless])["from"] is None
@@ -0,0 +1,154 @@
+import asyncio
+
+import numpy as np
+import torch
+
+from app.tools.audio_buffer import SAMPLE_RATE, WINDOW_SAMPLES
+from app.tools.vad import BatchedVADScheduler, EnergyGate, VADStream
+
+CHUNK = SAMPLE_RATE // 10  # 100 ms
+
+
+class LoudnessModel:
+    """Stand-in for silero: speech probability 0.9 for loud windows, 0.05 otherwise."""
+
+    def __init__(self):
+        self.calls = 0
+        self.batch_sizes = []
+
+    def __call__(self, windows, sample_rate):
+        self.calls += 1
+        self.batch_sizes.append(windows.shape[0])
+        self._state = self._state + 1  # marks the recurrent state of every stream it saw
+        rms = windows.pow(2).mean(dim=1).sqrt()
+        return torch.where(rms > 0.1, 0.9, 0.05).unsqueeze(1)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.int16)
+
+
+def speech(seconds, seed=0):
+    return (np.random.default_rng(seed).standard_normal(int(seconds * SAMPLE_RATE)) * 8000).astype(np.int16)
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=30))
+
+
+async def segment(pcm: np.ndarray, chunk: int = CHUNK, **scheduler_options):
+    """Stream `pcm` through the scheduler the way /ws/inspect does; returns the utterances."""
+    scheduler = BatchedVADScheduler(model=LoudnessModel(), max_wait_ms=0, **scheduler_options)
+    stream = scheduler.open_stream()
+    utterances = []
+    for i in range(0, len(pcm), chunk):
+        stream.audio.write(pcm[i:i + chunk].tobytes())
+        utterances += stream.cut(await scheduler.process(stream))
+    scheduler.close_stream(stream)
+    return utterances, stream
+
+
+def step_through(probs, **stream_options):
+    """Steps a stream window by window the way the scheduler does; returns the non-None events."""
+    stream = VADStream(**stream_options)
+    window = np.empty(WINDOW_SAMPLES, dtype=np.float32)
+    stream.audio.write(silence(len(probs) * WINDOW_SAMPLES / SAMPLE_RATE).tobytes())
+    events = []
+    for prob in probs:
+        stream.audio.fill_window(window)
+        event = stream.step(prob)
+        if event is not None:
+            events.append(event)
+    return events, stream
+
+
+def test_step_reports_start_pause_resume_and_end():
+    events, stream = step_through([0.1, 0.9, 0.9, 0.2, 0.9, 0.4, 0.2, 0.2, 0.2, 0.2, 0.2])
+    assert [next(iter(e)) for e in events] == ["start", "pause", "resume", "pause", "end"]
+    start, end = events[0], events[-1]
+    pad = 480  # speech_pad_ms=30
+    assert start["at"] == 2 * WINDOW_SAMPLES - pad - WINDOW_SAMPLES
+    assert events[3]["at"] == 7 * WINDOW_SAMPLES  # 0.4 sits in the hysteresis band: still speech
+    assert end["at"] == 7 * WINDOW_SAMPLES + pad - WINDOW_SAMPLES
+    assert start["start"] == round(start["at"] / SAMPLE_RATE, 1)
+    assert not stream.triggered
+
+
+def test_step_without_a_silence_window_ends_at_once():
+    events, _ = step_through([0.9, 0.9, 0.1], min_silence_duration_ms=0)
+    assert [next(iter(e)) for e in events] == ["start", "end"]
+
+
+def test_silence_shorter_than_the_minimum_does_not_end_speech():
+    events, stream = step_through([0.9, 0.1, 0.1, 0.9, 0.9])
+    assert [next(iter(e)) for e in events] == ["start", "pause", "resume"]
+    assert stream.triggered
+
+
+def test_long_silence_before_speech_gives_exactly_one_utterance():
+    # Silence past the 30 s ring, then a 2 s utterance that straddles the point where a
+    # buffer holding the silence would fill up (60 s)
+    utterances, stream = run(segment(np.concatenate([silence(59), speech(2), silence(1)])))
+    assert len(utterances) == 1
+    seconds = len(utterances[0]) / 2 / SAMPLE_RATE
+    assert 2.0 <= seconds <= 2.2  # the speech plus the VAD's padding, no leading silence
+    assert not stream.audio.full
+
+
+def test_idle_buffer_keeps_only_a_pre_roll():
+    _, stream = run(segment(silence(40)))
+    assert stream.audio.seconds < 0.1
+
+
+def test_every_utterance_of_one_batch_is_kept():
+    # One large message whose events are start, end, start: the second utterance must keep its
+    # beginning even though the first one is cut out of the buffer in the same batch
+    pcm = np.concatenate([silence(1), speech(1, seed=1), silence(1), speech(1.5, seed=2), silence(1)])
+    utterances, _ = run(segment(pcm, chunk=int(4 * SAMPLE_RATE)))
+    assert [round(len(u) / 2 / SAMPLE_RATE) for u in utterances] == [1, 2]
+    assert 1.5 <= len(utterances[1]) / 2 / SAMPLE_RATE <= 1.7
+
+
+def tone(seconds, hz, dbfs):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * hz * t) * 32767 * 10 ** (dbfs / 20) * np.sqrt(2)).astype(np.int16)
+
+
+def windows(pcm):
+    return (pcm[:len(pcm) // WINDOW_SAMPLES * WINDOW_SAMPLES].astype(np.float32) / 32768).reshape(-1, WINDOW_SAMPLES)
+
+
+def test_energy_gate_drops_silence_and_hiss_but_keeps_quiet_voice():
+    gate = EnergyGate(floor_db=-55, noise_db=-45, zcr_max=0.35)
+    hiss = (np.random.default_rng(0).standard_normal(WINDOW_SAMPLES) * 32768 * 10 ** (-50 / 20)).astype(np.int16)
+    batch = np.concatenate([windows(silence(0.04)), windows(tone(0.04, 200, -60)), windows(hiss),
+                            windows(tone(0.04, 200, -50)), windows(tone(0.04, 200, -20))])
+    assert gate.silent(batch).tolist() == [True, True, True, False, False]
+    assert not EnergyGate(enabled=False).silent(batch).any()
+
+
+def test_gated_windows_skip_the_model_and_keep_their_state():
+    async def main():
+        model = LoudnessModel()
+        scheduler = BatchedVADScheduler(model=model, max_wait_ms=0)
+        quiet, loud = scheduler.open_stream(), scheduler.open_stream()
+        quiet_state = quiet.state.clone()
+        quiet.audio.write(silence(WINDOW_SAMPLES / SAMPLE_RATE).tobytes())
+        loud.audio.write(speech(WINDOW_SAMPLES / SAMPLE_RATE).tobytes())
+        await asyncio.gather(scheduler.process(quiet), scheduler.process(loud))
+        mixed = (model.batch_sizes, quiet.state.equal(quiet_state), loud.state.equal(quiet_state + 1))
+
+        faint = tone(3 * WINDOW_SAMPLES / SAMPLE_RATE, 200, -60)
+        quiet.audio.write(faint.tobytes())
+        await scheduler.process(quiet)  # an all-silent batch makes no model call
+        counters = (scheduler.batches, scheduler.windows, scheduler.gated)
+        context = quiet.context.clone()
+        scheduler.close_stream(quiet)
+        scheduler.close_stream(loud)
+        return mixed, counters, context, faint
+
+    (batch_sizes, quiet_kept, loud_advanced), counters, context, faint = run(main())
+    assert batch_sizes == [1] and quiet_kept and loud_advanced
+    assert counters == (1, 5, 4)
+    # The gated stream's context still slides over its own audio
+    np.testing.assert_allclose(context[0].numpy(), faint[-64:] / 32768)
@@ -0,0 +1,67 @@
+import pytest
+import torch
+
+pytest.importorskip("lightglue")
+
+from tools.vision_tools import VisualZoneLocator
+
+
+class ContextMatcher:
+    """
+    Stand-in for LightGlue whose matches, like its attention, depend on every keypoint of the
+    batch row: descriptors are centred on the row mean before mutual nearest-neighbour matching.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, data):
+        self.calls += 1
+        d0, d1 = data['image0']['descriptors'], data['image1']['descriptors']
+        d0 = d0 - d0.mean(dim=1, keepdim=True)
+        d1 = d1 - d1.mean(dim=1, keepdim=True)
+        sim = torch.einsum('bmd,bnd->bmn', d0, d1)
+        best0, best1 = sim.argmax(dim=2), sim.argmax(dim=1)
+        mutual = best1.gather(1, best0) == torch.arange(d0.shape[1])
+        return {'matches0': torch.where(mutual, best0, -1)}
+
+
+def features(n, seed):
+    g = torch.Generator().manual_seed(seed)
+    return {'keypoints': torch.rand(1, n, 2, generator=g) * 100,
+            'keypoint_scores': torch.rand(1, n, generator=g),
+            'descriptors': torch.rand(1, n, 32, generator=g),
+            'image_size': torch.tensor([[100.0, 100.0]])}
+
+
+def locator(keypoint_counts):
+    zone_locator = VisualZoneLocator.__new__(VisualZoneLocator)
+    zone_locator.device = torch.device("cpu")
+    zone_locator.matcher = ContextMatcher()
+    zone_locator.anchor_dict = {f"a{i}.jpg": f"zone_{i}" for i in range(len(keypoint_counts))}
+    zone_locator.anchor_feat = {f"a{i}.jpg": features(n, seed=i) for i, n in enumerate(keypoint_counts)}
+    zone_locator._stack_anchors()
+    return zone_locator
+
+
+def test_batched_matching_equals_per_anchor_matching_for_short_anchors():
+    zone_locator = locator([40, 40, 12, 40, 25])  # two anchors below the keypoint count of the rest
+    query = features(30, seed=99)
+    query['descriptors'][0, :20] = zone_locator.anchor_feat["a2.jpg"]['descriptors'][0, :12].repeat(2, 1)[:20]
+
+    batched = zone_locator.match_zones(query, k=0)
+    assert zone_locator.matcher.calls == 3  # one pass per keypoint count, not per anchor
+
+    expected = {}
+    for filename, zone in zone_locator.anchor_dict.items():
+        anchor = {key: zone_locator.anchor_feat[filename][key] for key in ('keypoints', 'descriptors', 'image_size')}
+        matches = zone_locator.matcher({'image0': anchor, 'image1': query})['matches0']
+        expected[zone] = int((matches > -1).sum())
+    assert batched == expected
+    assert batched["zone_2"] > 0
+
+
+def test_shortlist_only_matches_the_selected_anchors():
+    zone_locator = locator([40, 12, 40])
+    zone_counts = zone_locator.match_zones(features(30, seed=7), k=2)
+    assert len(zone_counts) == 2
@@ -0,0 +1,64 @@
+import asyncio
+
+from app.tools.voice_pipeline import VoicePipeline
+
+
+class SilentTTS:
+    async def synthesize(self, sentence):
+        return b"", None
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+async def drive(transcribe_pcm, agent_stream, send_json, utterances):
+    pipeline = VoicePipeline(transcribe_pcm, agent_stream, SilentTTS(), send_json)
+    pipeline.start()
+    for pcm in utterances:
+        pipeline.submit_utterance(pcm)
+    await asyncio.sleep(0.1)
+    await pipeline.close()
+
+
+def test_failures_are_reported_to_the_client():
+    sent = []
+
+    async def send_json(message):
+        sent.append(message)
+
+    async def transcribe_pcm(pcm):
+        if pcm == b"bad":
+            raise RuntimeError("stt down")
+        return "tires good"
+
+    async def agent_stream(text):
+        yield "Noted."
+        raise RuntimeError("llm down")
+
+    run(drive(transcribe_pcm, agent_stream, send_json, [b"bad", b"ok"]))
+    assert sent[0] == {"type": "error", "stage": "stt", "message": "stt down"}
+    assert sent[1] == {"type": "user_transcript", "text": "tires good"}
+    assert sent[-1] == {"type": "error", "stage": "agent", "message": "llm down"}
+
+
+def test_a_failed_report_does_not_stop_later_utterances():
+    sent, failures = [], []
+
+    async def send_json(message):
+        if message["type"] == "error" and not failures:
+            failures.append(message)
+            raise ConnectionError("client went away")
+        sent.append(message)
+
+    async def transcribe_pcm(pcm):
+        if pcm == b"bad":
+            raise RuntimeError("stt down")
+        return pcm.decode()
+
+    async def agent_stream(text):
+        yield f"ok {text}."
+
+    run(drive(transcribe_pcm, agent_stream, send_json, [b"bad", b"one", b"two"]))
+    assert failures
+    assert [m["text"] for m in sent if m["type"] == "agent_text"] == ["ok one.", "ok two."]